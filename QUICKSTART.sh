@@ -9,6 +9,8 @@ echo "📦 TO RUN:"
 echo "   python3 cli.py"
 echo "   or"
 echo "   ./cli.py"
+echo "   python3 cli.py -c \"cmd1 && cmd2\"   (batch mode)"
+echo "   python3 cli.py script.hero          (run a script)"
 echo ""
 echo "🎯 ESSENTIAL COMMANDS:"
 echo "   help          - Show all commands"
@@ -36,7 +38,7 @@ echo ""
 echo "🔍 TEXT TOOLS:"
 echo "   grep <p> <f>  - Search in file"
 echo "   head <f> [n]  - First n lines"
-echo "   tail <f> [n]  - Last n lines"
+echo "   tail <f> [n]  - Last n lines (-f to follow)"
 echo "   wc <file>     - Count lines/words"
 echo "   diff <f1> <f2> - Compare files"
 echo "   sort <file>   - Sort lines"
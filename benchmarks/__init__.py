@@ -0,0 +1 @@
+"""Benchmark suite for the hero built-ins; run with ``python -m benchmarks``."""
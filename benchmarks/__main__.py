@@ -0,0 +1,64 @@
+"""Command line for the benchmark suite.
+
+    python -m benchmarks                          run everything on the small preset
+    python -m benchmarks --preset full --save base.json
+    python -m benchmarks --compare base.json      exit 1 on regressions
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from . import harness, workloads
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark hero built-ins on synthetic workloads.")
+    parser.add_argument("--preset", choices=sorted(workloads.PRESETS), default="small",
+                        help="workload sizes (full: 1 GB log, 100k small files)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "hero-bench"),
+                        help="where workloads are generated and kept between runs")
+    parser.add_argument("--only", help="comma-separated benchmarks to run: "
+                        + ",".join(harness.BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark (best wall time)")
+    parser.add_argument("--save", metavar="FILE", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="flag regressions against a baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown counted as a regression (default 0.2)")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else None
+    unknown = set(names or []) - set(harness.BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+
+    paths = workloads.ensure(os.path.join(args.workdir, args.preset), args.preset)
+    print(f"running on '{args.preset}' workloads ({harness.syscall_source()} syscall counts)")
+    current = harness.run(paths, names, args.repeat)
+    current["meta"]["preset"] = args.preset
+
+    baseline = harness.load(args.compare) if args.compare else None
+    print()
+    print(harness.format_table(current, baseline))
+
+    if args.save:
+        harness.save(current, args.save)
+        print(f"\nsaved baseline to {args.save}")
+
+    if baseline is not None:
+        if baseline.get("meta", {}).get("preset") != args.preset:
+            print(f"\nwarning: baseline was recorded with preset "
+                  f"'{baseline.get('meta', {}).get('preset')}'", file=sys.stderr)
+        regressions = harness.compare(current, baseline, args.threshold)
+        if regressions:
+            print("\nregressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nno regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
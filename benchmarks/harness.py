@@ -0,0 +1,216 @@
+"""Run hero built-ins against the synthetic workloads and compare baselines.
+
+Every run happens in a fresh interpreter so that peak RSS belongs to one
+command and no cache from an earlier run is reused.  The child builds a
+non-interactive CommandHero, sends output to /dev/null and times only the
+command itself.  Peak RSS is the child's ``VmHWM`` (``ru_maxrss`` outside
+Linux).  Syscalls are counted with ``strace -f -c`` when it is installed.
+Otherwise the read and write syscall counters in ``/proc/self/io`` are
+sampled around the command, so the counts are only comparable with
+baselines from the same source.
+"""
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+# Command templates; {names} come from workloads.paths() plus {scratch},
+# an empty directory created for each run.
+BENCHMARKS: Dict[str, str] = {
+    "ls": "ls -l {wide}",
+    "ls-R": "ls -R {deep}",
+    "find": "find '*.log' {many}",
+    "du": "du {many}",
+    "grep": "grep -c ERROR {log}",
+    "grep-r": "grep -r -l needle {many}",
+    "cat": "cat {log}",
+    "wc": "wc {log}",
+    "sort": "sort {sortfile}",
+    "tail": "tail {log} 1000",
+    "diff": "diff {diff_a} {diff_b}",
+    "cp": "cp {many} {scratch}/copy",
+    "tree": "tree {deep} 1000",
+}
+
+# A change counts as a regression only past both the relative threshold and
+# these absolute floors, so noise on tiny numbers is not reported.
+NOISE_FLOOR = {"wall": 0.005, "rss_kb": 1024, "syscalls": 50}
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import json, os, sys, time
+from command_hero import CommandHero
+
+def peak_rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+def io_syscalls():
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["syscr"]) + int(fields["syscw"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+hero = CommandHero(interactive=False)
+result = sys.stdout
+sys.stdout = open(os.devnull, "w")
+before = io_syscalls()
+start = time.perf_counter()
+status = hero.run_line(sys.argv[1]) if sys.argv[1] else 0
+sys.stdout.flush()
+wall = time.perf_counter() - start
+after = io_syscalls()
+result.write(json.dumps({"wall": wall, "status": status, "rss_kb": peak_rss_kb(),
+                         "io_syscalls": None if before is None else after - before}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [_ROOT, env.get("PYTHONPATH")]))
+    # Keep disk-usage and index caches out of the user's home directory.
+    env["HOME"] = tempfile.gettempdir()
+    return env
+
+
+def _run_child(line: str) -> Dict:
+    """Run one command in a fresh interpreter and return its measurements."""
+    proc = subprocess.run([sys.executable, "-c", _CHILD, line], cwd=_ROOT, env=_env(),
+                          stdout=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"benchmark child failed for {line!r} (status {proc.returncode})")
+    result = json.loads(proc.stdout)
+    # Status 1 is a result, not a failure: diff found differences, grep no match
+    if result["status"] > 1:
+        raise RuntimeError(f"{line!r} exited with status {result['status']}")
+    return result
+
+
+def _strace_calls(line: str) -> Optional[int]:
+    """Total syscalls made by a child running ``line``, via strace -c."""
+    if not shutil.which("strace"):
+        return None
+    with tempfile.NamedTemporaryFile("r", suffix=".strace") as out:
+        subprocess.run(["strace", "-f", "-c", "-o", out.name, sys.executable, "-c", _CHILD, line],
+                       cwd=_ROOT, env=_env(), stdout=subprocess.DEVNULL, check=True)
+        for row in out.read().splitlines():
+            if row.rstrip().endswith("total"):
+                numbers = re.findall(r"\d+(?:\.\d+)?", row)
+                return int(numbers[3]) if len(numbers) > 3 else None
+    return None
+
+
+def syscall_source() -> str:
+    return "strace" if shutil.which("strace") else "proc-io"
+
+
+def run(paths: Dict[str, str], names: Optional[List[str]] = None, repeat: int = 3,
+        log=print) -> Dict:
+    """Run the selected benchmarks ``repeat`` times each and return a result document."""
+    names = names or list(BENCHMARKS)
+    use_strace = syscall_source() == "strace"
+    baseline_calls = _strace_calls("") if use_strace else None
+    results = {}
+    for name in names:
+        walls, rss, calls = [], [], []
+        for _ in range(repeat):
+            scratch = tempfile.mkdtemp(prefix="hero-bench-")
+            try:
+                line = BENCHMARKS[name].format(scratch=scratch, **paths)
+                result = _run_child(line)
+                walls.append(result["wall"])
+                rss.append(result["rss_kb"])
+                if not use_strace and result["io_syscalls"] is not None:
+                    calls.append(result["io_syscalls"])
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+        if use_strace:
+            scratch = tempfile.mkdtemp(prefix="hero-bench-")
+            try:
+                total = _strace_calls(BENCHMARKS[name].format(scratch=scratch, **paths))
+                if total is not None and baseline_calls is not None:
+                    calls.append(total - baseline_calls)
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+        results[name] = {
+            "command": BENCHMARKS[name],
+            "wall": min(walls),
+            "wall_runs": walls,
+            "rss_kb": max(rss),
+            "syscalls": min(calls) if calls else None,
+        }
+        log(f"  {name:<8} {min(walls) * 1000:10.1f} ms")
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "syscall_source": syscall_source(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.2) -> List[str]:
+    """Describe every metric that got worse than ``baseline`` by more than ``threshold``."""
+    regressions = []
+    same_source = (current["meta"].get("syscall_source") ==
+                   baseline.get("meta", {}).get("syscall_source"))
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        for metric, floor in NOISE_FLOOR.items():
+            if metric == "syscalls" and not same_source:
+                continue
+            old, new = base.get(metric), cur.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > floor:
+                change = (new - old) / old * 100 if old else float("inf")
+                regressions.append(f"{name}: {metric} {old:g} -> {new:g} (+{change:.0f}%)")
+    return regressions
+
+
+def format_table(current: Dict, baseline: Optional[Dict] = None) -> str:
+    """Results as a text table, with the wall time change against ``baseline``."""
+    rows = [f"{'benchmark':<10} {'wall ms':>10} {'peak MB':>9} {'syscalls':>10} {'vs base':>8}"]
+    for name, cur in current["results"].items():
+        change = ""
+        base = (baseline or {}).get("results", {}).get(name)
+        if base and base.get("wall"):
+            change = f"{(cur['wall'] - base['wall']) / base['wall'] * 100:+.0f}%"
+        calls = "-" if cur["syscalls"] is None else str(cur["syscalls"])
+        rows.append(f"{name:<10} {cur['wall'] * 1000:10.1f} {cur['rss_kb'] / 1024:9.1f} "
+                    f"{calls:>10} {change:>8}")
+    return "\n".join(rows)
+
+
+def load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(document: Dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
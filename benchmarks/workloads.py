@@ -0,0 +1,151 @@
+"""Synthetic files and trees for the benchmark suite.
+
+Workloads are generated once into a work directory and reused while the
+manifest there matches the requested preset, since building a 1 GB log
+takes longer than most of the benchmarks that read it.
+"""
+import json
+import os
+import random
+import shutil
+from typing import Dict
+
+# Bump when generated content changes so old work directories are rebuilt.
+VERSION = 1
+
+MB = 1024 * 1024
+
+PRESETS: Dict[str, Dict[str, int]] = {
+    # For tests of the harness itself.
+    "tiny": {"log_bytes": 1 * MB, "sort_bytes": 256 * 1024, "diff_lines": 2000,
+             "many_files": 200, "many_dirs": 10, "wide_files": 200, "deep_levels": 16},
+    "small": {"log_bytes": 64 * MB, "sort_bytes": 8 * MB, "diff_lines": 20000,
+              "many_files": 5000, "many_dirs": 50, "wide_files": 5000, "deep_levels": 64},
+    "full": {"log_bytes": 1024 * MB, "sort_bytes": 128 * MB, "diff_lines": 200000,
+             "many_files": 100000, "many_dirs": 1000, "wide_files": 50000, "deep_levels": 256},
+}
+
+_LEVELS = ["DEBUG", "INFO", "INFO", "INFO", "WARN", "ERROR"]
+_PATHS = ["/api/v1/items", "/api/v1/users", "/login", "/static/app.js", "/health"]
+
+
+def _log_line(rng: random.Random, n: int) -> str:
+    return (f"2024-05-{1 + n % 28:02d}T{n % 24:02d}:{n % 60:02d}:{rng.randrange(60):02d}."
+            f"{rng.randrange(1000):03d} {rng.choice(_LEVELS):<5} [worker-{rng.randrange(32)}] "
+            f"request id={rng.randrange(10**9)} path={rng.choice(_PATHS)}/{rng.randrange(5000)} "
+            f"took={rng.randrange(1, 2000)}ms\n")
+
+
+def _write_log(path: str, size: int, rng: random.Random) -> None:
+    """Write ``size`` bytes of log lines, repeating a generated 4 MB block."""
+    block = "".join(_log_line(rng, n) for n in range(40000)).encode()
+    with open(path, "wb") as f:
+        written = 0
+        while written < size:
+            chunk = block[:size - written]
+            f.write(chunk)
+            written += len(chunk)
+
+
+def _write_sort_input(path: str, size: int, rng: random.Random) -> None:
+    """Unique, unordered lines so sort does real work on every line."""
+    with open(path, "w") as f:
+        written = n = 0
+        while written < size:
+            line = _log_line(rng, n)
+            f.write(line)
+            written += len(line)
+            n += 1
+
+
+def _write_diff_pair(a_path: str, b_path: str, lines: int, rng: random.Random) -> None:
+    """Two files that differ in about 1% of lines (edits, inserts, deletes)."""
+    a = [_log_line(rng, n) for n in range(lines)]
+    b = []
+    for line in a:
+        roll = rng.random()
+        if roll < 0.003:
+            continue  # Deleted
+        if roll < 0.006:
+            b.append(_log_line(rng, lines))  # Inserted
+        if roll > 0.996:
+            line = line.replace(" took=", " took=9")  # Edited
+        b.append(line)
+    with open(a_path, "w") as f:
+        f.writelines(a)
+    with open(b_path, "w") as f:
+        f.writelines(b)
+
+
+def _write_many(root: str, files: int, dirs: int, rng: random.Random) -> None:
+    """Small files (up to 4 KB) spread over ``dirs`` directories; some contain 'needle'."""
+    for d in range(dirs):
+        os.makedirs(os.path.join(root, f"d{d:04d}"), exist_ok=True)
+    filler = "lorem ipsum dolor sit amet " * 160
+    for i in range(files):
+        size = rng.randrange(64, 4096)
+        text = filler[:size]
+        if i % 97 == 0:
+            text += "\nneedle\n"
+        ext = ".txt" if i % 3 else ".log"
+        with open(os.path.join(root, f"d{i % dirs:04d}", f"f{i:06d}{ext}"), "w") as f:
+            f.write(text)
+
+
+def _write_wide(root: str, files: int) -> None:
+    os.makedirs(root, exist_ok=True)
+    for i in range(files):
+        with open(os.path.join(root, f"entry{i:06d}.dat"), "w") as f:
+            f.write("x")
+
+
+def _write_deep(root: str, levels: int) -> None:
+    path = root
+    for level in range(levels):
+        os.makedirs(path, exist_ok=True)
+        for i in range(4):
+            with open(os.path.join(path, f"file{i}.txt"), "w") as f:
+                f.write(f"level {level}\n")
+        path = os.path.join(path, f"level{level + 1:03d}")
+
+
+def paths(workdir: str) -> Dict[str, str]:
+    """Names usable in benchmark command templates, mapped to paths."""
+    return {
+        "log": os.path.join(workdir, "big.log"),
+        "sortfile": os.path.join(workdir, "unsorted.txt"),
+        "diff_a": os.path.join(workdir, "diff_a.txt"),
+        "diff_b": os.path.join(workdir, "diff_b.txt"),
+        "many": os.path.join(workdir, "many"),
+        "wide": os.path.join(workdir, "wide"),
+        "deep": os.path.join(workdir, "deep"),
+    }
+
+
+def ensure(workdir: str, preset: str, log=print) -> Dict[str, str]:
+    """Generate the workloads for ``preset`` unless already present; return paths()."""
+    sizes = PRESETS[preset]
+    manifest_path = os.path.join(workdir, "manifest.json")
+    manifest = {"version": VERSION, "preset": preset, "sizes": sizes}
+    try:
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                return paths(workdir)
+    except (OSError, ValueError):
+        pass
+
+    if os.path.isdir(workdir):
+        shutil.rmtree(workdir)
+    os.makedirs(workdir)
+    p = paths(workdir)
+    rng = random.Random(1234)
+    log(f"generating '{preset}' workloads in {workdir} ...")
+    _write_log(p["log"], sizes["log_bytes"], rng)
+    _write_sort_input(p["sortfile"], sizes["sort_bytes"], rng)
+    _write_diff_pair(p["diff_a"], p["diff_b"], sizes["diff_lines"], rng)
+    _write_many(p["many"], sizes["many_files"], sizes["many_dirs"], rng)
+    _write_wide(p["wide"], sizes["wide_files"])
+    _write_deep(p["deep"], sizes["deep_levels"])
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    return p
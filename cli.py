@@ -1,18 +1,78 @@
 #!/usr/bin/env python3
-"""Command Line Hero - A feature-rich text-based CLI."""
+"""Command Line Hero - A feature-rich text-based CLI.
+
+Usage:
+    cli.py                  interactive prompt
+    cli.py -c "cmd; cmd"    run commands and exit with the last status
+    cli.py script.hero      run a script file line by line
+    cli.py --startup-profile
+                            report startup time and the slowest imports
+    cli.py --profile DIR ...
+                            write a cProfile dump per built-in call to DIR
+"""
+import os
+import sys
+
 from command_hero import CommandHero
 
 
-def main():
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv and argv[0] in ("-h", "--help"):
+        print(__doc__.strip())
+        return 0
+
+    if argv and argv[0] == "--startup-profile":
+        from command_hero import startup
+        total = startup.cold_start_ms()
+        try:
+            print(startup.report(total))
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader (| head) has gone; keep the flush at exit from failing too
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 141
+        return 0 if total <= startup.STARTUP_BUDGET_MS else 1
+
+    profile_dir = None
+    if argv and argv[0] == "--profile":
+        if len(argv) < 2:
+            print("hero: --profile: option requires a directory", file=sys.stderr)
+            return 2
+        profile_dir, argv = argv[1], argv[2:]
+
+    if argv and argv[0] == "-c":
+        if len(argv) < 2:
+            print("hero: -c: option requires an argument", file=sys.stderr)
+            return 2
+        hero = CommandHero(interactive=False, profile_dir=profile_dir)
+        return hero.run_script(argv[1].splitlines(), "-c")
+
+    if argv:
+        try:
+            script = open(argv[0], "r", encoding="utf-8")
+        except OSError as e:
+            print(f"hero: {argv[0]}: {e.strerror}", file=sys.stderr)
+            return 127
+        with script:
+            hero = CommandHero(interactive=False, profile_dir=profile_dir)
+            return hero.run_script(script, argv[0])
+
+    if not sys.stdin.isatty():
+        hero = CommandHero(interactive=False, profile_dir=profile_dir)
+        return hero.run_script(sys.stdin, "stdin")
+
     print("🚀 Welcome to Command Line Hero!")
     print("Type 'help' for available commands, 'exit' to quit.\n")
-    
-    hero = CommandHero()
+
+    hero = CommandHero(profile_dir=profile_dir)
     try:
-        hero.cmdloop()
+        return hero.cmdloop()
     except KeyboardInterrupt:
         print("\n\n👋 Exiting Command Line Hero. Goodbye!")
+        return 130
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
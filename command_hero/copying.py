@@ -0,0 +1,353 @@
+"""Copy engine behind the ``cp`` and ``mv`` built-ins.
+
+File data never passes through Python when the kernel can move it: a copy
+first tries a reflink clone (``FICLONE``, on btrfs and XFS the new file
+shares extents with the old one), then ``os.copy_file_range``, then
+``os.sendfile``, and only then a plain read/write loop.  Each method falls
+back to the next one when the kernel or filesystem refuses it.
+
+A tree is planned up front with ``os.scandir``.  Directories are created
+first, then small files are copied concurrently on a thread pool while
+large files are streamed one at a time on the calling thread, in chunks so
+that a progress bar can follow them.  Directory modes and times are applied
+last, so read-only directories can still be filled.
+"""
+import errno
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, TextIO, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Files at least this large are streamed on the calling thread with progress.
+LARGE_FILE = 16 * 1024 * 1024
+
+# Bytes handed to the kernel per copy_file_range/sendfile call.
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Copies smaller than this finish too quickly to need a progress bar.
+PROGRESS_MIN_BYTES = 64 * 1024 * 1024
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+# Errors meaning "this copy method does not work here", not "the copy failed".
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                errno.ENOTTY, errno.ENOTSOCK, errno.EBADF, errno.ETXTBSY,
+                getattr(errno, "ENOTSUP", errno.EOPNOTSUPP)}
+
+
+def _size(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}TB"
+
+
+class Progress:
+    """Throughput and ETA bar for a copy, redrawn in place on a terminal."""
+
+    def __init__(self, total: int, stream: TextIO, interval: float = 0.1):
+        self.total = total
+        self.done = 0
+        self.current = ""
+        self._stream = stream
+        self._interval = interval
+        self._start = time.monotonic()
+        self._drawn = self._start  # First draw after one interval
+        self._visible = False
+        self._lock = threading.Lock()
+
+    def add(self, n: int) -> None:
+        with self._lock:
+            self.done += n
+            now = time.monotonic()
+            if now - self._drawn >= self._interval:
+                self._drawn = now
+                self._visible = True
+                self._draw(now)
+
+    def _draw(self, now: float) -> None:
+        elapsed = max(now - self._start, 1e-6)
+        rate = self.done / elapsed
+        fraction = self.done / self.total if self.total else 1.0
+        eta = (self.total - self.done) / rate if rate else 0
+        bar = "#" * int(fraction * 20)
+        line = (f"{fraction * 100:3.0f}% [{bar:<20}] {_size(self.done)}/{_size(self.total)} "
+                f"{_size(rate)}/s ETA {int(eta) // 60}:{int(eta) % 60:02d} {self.current}")
+        try:
+            width = os.get_terminal_size(self._stream.fileno()).columns
+        except (OSError, ValueError):
+            width = 80
+        self._stream.write("\r" + line[:width - 1].ljust(width - 1))
+        self._stream.flush()
+
+    def finish(self) -> None:
+        with self._lock:
+            if self._visible:
+                self._stream.write("\r\033[K")
+                self._stream.flush()
+
+
+class CopyResult:
+    """What a copy did; ``errors`` holds one message per path that failed."""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.errors: List[str] = []
+        self._lock = threading.Lock()
+
+    def copied(self, size: int) -> None:
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+
+    def failed(self, message: str) -> None:
+        with self._lock:
+            self.errors.append(message)
+
+
+def _clone(src_fd: int, dst_fd: int) -> bool:
+    """Make ``dst_fd`` share ``src_fd``'s extents; False if the filesystem can't."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        return False
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+
+def _sendfile(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+# In order of preference; copy_file_range is Python 3.8+ on Linux
+_KERNEL_METHODS = []
+if hasattr(os, "copy_file_range"):
+    _KERNEL_METHODS.append(_copy_file_range)
+if hasattr(os, "sendfile"):
+    _KERNEL_METHODS.append(_sendfile)
+
+
+def copy_data(src_fd: int, dst_fd: int, size: int,
+              progress: Optional[Callable[[int], None]] = None) -> None:
+    """Copy the contents of ``src_fd`` (``size`` bytes per fstat) into ``dst_fd``."""
+    report = progress or (lambda n: None)
+    if size and _clone(src_fd, dst_fd):
+        report(size)
+        return
+
+    offset = 0
+    if size:
+        for method in _KERNEL_METHODS:
+            try:
+                while offset < size:
+                    n = method(src_fd, dst_fd, offset, min(CHUNK_SIZE, size - offset))
+                    if n == 0:
+                        return  # The file shrank while we copied it
+                    offset += n
+                    report(n)
+                return
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+
+    # Plain loop; also covers files whose size is unknown, such as /proc files
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    while True:
+        chunk = os.read(src_fd, 1024 * 1024)
+        if not chunk:
+            return
+        view = memoryview(chunk)
+        while view:
+            view = view[os.write(dst_fd, view):]
+        report(len(chunk))
+
+
+def copy_file(src: str, dst: str, st: Optional[os.stat_result] = None,
+              progress: Optional[Callable[[int], None]] = None) -> int:
+    """Copy one file with its mode and times, like ``shutil.copy2``; return its size."""
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        st = st or os.fstat(src_fd)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            copy_data(src_fd, dst_fd, st.st_size, progress)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    os.chmod(dst, stat.S_IMODE(st.st_mode))
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return st.st_size
+
+
+def up_to_date(st: os.stat_result, dst: str) -> bool:
+    """True if ``dst`` has the source's size and modification time (to the second)."""
+    try:
+        other = os.stat(dst)
+    except OSError:
+        return False
+    return (stat.S_ISREG(other.st_mode) and other.st_size == st.st_size
+            and int(other.st_mtime) == int(st.st_mtime))
+
+
+class _Plan:
+    """Everything a copy will create, gathered before any data moves."""
+
+    def __init__(self):
+        self.dirs: List[Tuple[str, str, os.stat_result]] = []
+        self.files: List[Tuple[str, str, os.stat_result]] = []
+        self.links: List[Tuple[str, str]] = []
+
+    def add(self, src: str, dst: str, result: CopyResult, follow: bool = True) -> None:
+        try:
+            st = os.stat(src) if follow else os.lstat(src)
+        except OSError as e:
+            result.failed(f"{src}: {e.strerror}")
+            return
+        if stat.S_ISLNK(st.st_mode):
+            self.links.append((src, dst))
+        elif stat.S_ISDIR(st.st_mode):
+            self._walk(src, dst, st, result)
+        elif stat.S_ISREG(st.st_mode):
+            self.files.append((src, dst, st))
+        else:
+            result.failed(f"{src}: not a regular file")
+
+    def _walk(self, src: str, dst: str, st: os.stat_result, result: CopyResult) -> None:
+        stack = [(src, dst, st)]
+        while stack:
+            src, dst, st = stack.pop()
+            self.dirs.append((src, dst, st))
+            try:
+                with os.scandir(src) as it:
+                    entries = list(it)
+            except OSError as e:
+                result.failed(f"{src}: {e.strerror}")
+                continue
+            for entry in entries:
+                target = os.path.join(dst, entry.name)
+                try:
+                    if entry.is_symlink():
+                        self.links.append((entry.path, target))
+                    elif entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, target, entry.stat(follow_symlinks=False)))
+                    elif entry.is_file(follow_symlinks=False):
+                        self.files.append((entry.path, target, entry.stat(follow_symlinks=False)))
+                    else:
+                        result.failed(f"{entry.path}: not a regular file")
+                except OSError as e:
+                    result.failed(f"{entry.path}: {e.strerror}")
+
+
+def copy(pairs: List[Tuple[str, str]], update: bool = False,
+         progress_stream: Optional[TextIO] = None, workers: Optional[int] = None,
+         follow: bool = True) -> CopyResult:
+    """Copy each ``(source, destination)`` pair, recursing into directories.
+
+    With ``update`` files whose destination already has the same size and
+    mtime are skipped.  ``progress_stream`` (a terminal) gets a progress bar
+    when there is enough data to copy.  ``follow=False`` copies a symlink
+    given as a source as a link rather than what it points to.
+    """
+    result = CopyResult()
+    plan = _Plan()
+    for src, dst in pairs:
+        plan.add(src, dst, result, follow)
+
+    for src, dst, st in plan.dirs:
+        try:
+            os.makedirs(dst, exist_ok=True)
+        except OSError as e:
+            result.failed(f"{dst}: {e.strerror}")
+
+    for src, dst in plan.links:
+        try:
+            if os.path.lexists(dst):
+                os.unlink(dst)
+            os.symlink(os.readlink(src), dst)
+        except OSError as e:
+            result.failed(f"{dst}: {e.strerror}")
+
+    files = plan.files
+    if update:
+        files = [item for item in files if not up_to_date(item[2], item[1])]
+        result.skipped = len(plan.files) - len(files)
+    small = [item for item in files if item[2].st_size < LARGE_FILE]
+    large = [item for item in files if item[2].st_size >= LARGE_FILE]
+
+    total = sum(item[2].st_size for item in files)
+    progress = None
+    if progress_stream is not None and total >= PROGRESS_MIN_BYTES:
+        progress = Progress(total, progress_stream)
+
+    def copy_one(item, report=None) -> None:
+        src, dst, st = item
+        try:
+            result.copied(copy_file(src, dst, st, report))
+        except OSError as e:
+            result.failed(f"{src}: {e.strerror or e}")
+            return
+        if report is None and progress is not None:
+            progress.add(st.st_size)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers or min(16, (os.cpu_count() or 1) * 4)) as pool:
+            pending = [pool.submit(copy_one, item) for item in small]
+            try:
+                for item in large:
+                    if progress is not None:
+                        progress.current = os.path.basename(item[0])
+                    copy_one(item, progress.add if progress is not None else None)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+    finally:
+        if progress is not None:
+            progress.finish()
+
+    # Children first, so a read-only parent does not block its subdirectories
+    for src, dst, st in reversed(plan.dirs):
+        try:
+            os.chmod(dst, stat.S_IMODE(st.st_mode))
+            os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+        except OSError:
+            pass
+    return result
+
+
+def move(src: str, dst: str, progress_stream: Optional[TextIO] = None) -> CopyResult:
+    """Rename ``src`` to ``dst``, copying and deleting when they are on different filesystems."""
+    try:
+        os.rename(src, dst)
+        return CopyResult()
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    result = copy([(src, dst)], progress_stream=progress_stream, follow=False)
+    if not result.errors:
+        if os.path.isdir(src) and not os.path.islink(src):
+            shutil.rmtree(src)
+        else:
+            os.unlink(src)
+    return result
@@ -1,15 +1,41 @@
+import codecs
+import io
 import os
+import re
 import sys
-import shlex
-import subprocess
-import readline
-import glob
+import itertools
 import stat
-import datetime
-import shutil
-import difflib
-from typing import Callable, Dict, List, Optional
-from pathlib import Path
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from . import lazy, lexer, metrics, streams
+
+# Imported on first use; see lazy.py
+cProfile = lazy.module("cProfile")
+datetime = lazy.module("datetime")
+futures = lazy.module("concurrent.futures")
+pathlib = lazy.module("pathlib")
+shutil = lazy.module("shutil")
+signal = lazy.module("signal")
+subprocess = lazy.module("subprocess")
+copying = lazy.module("command_hero.copying")
+diffing = lazy.module("command_hero.diffing")
+decompress = lazy.module("command_hero.decompress")
+deleting = lazy.module("command_hero.deleting")
+dircache = lazy.module("command_hero.dircache")
+diskusage = lazy.module("command_hero.diskusage")
+dupes = lazy.module("command_hero.dupes")
+fileio = lazy.module("command_hero.fileio")
+globbing = lazy.module("command_hero.globbing")
+jobs = lazy.module("command_hero.jobs")
+pathhash = lazy.module("command_hero.pathhash")
+pathindex = lazy.module("command_hero.pathindex")
+process = lazy.module("command_hero.process")
+search = lazy.module("command_hero.search")
+sorting = lazy.module("command_hero.sorting")
 
 
 class CommandHero:
@@ -28,12 +54,95 @@ class CommandHero:
         'dim': '\033[2m',
     }
 
-    def __init__(self, base_dir: str = None):
-        """Create a CommandHero CLI instance."""
+    # Built-in commands and the methods implementing them
+    COMMANDS = {
+        "help": "_help",
+        "ls": "_ls",
+        "pwd": "_pwd",
+        "cd": "_cd",
+        "cat": "_cat",
+        "echo": "_echo",
+        "clear": "_clear",
+        "history": "_history_cmd",
+        "touch": "_touch",
+        "rm": "_rm",
+        "mkdir": "_mkdir",
+        "rmdir": "_rmdir",
+        "mv": "_mv",
+        "cp": "_cp",
+        "head": "_head",
+        "tail": "_tail",
+        "grep": "_grep",
+        "wc": "_wc",
+        "find": "_find",
+        "updatedb": "_updatedb",
+        "tree": "_tree",
+        "du": "_du",
+        "diff": "_diff",
+        "edit": "_edit",
+        "vim": "_vim",
+        "nano": "_nano",
+        "sort": "_sort",
+        "env": "_env",
+        "which": "_which",
+        "hash": "_hash",
+        "dupes": "_dupes",
+        "jobs": "_jobs_cmd",
+        "fg": "_fg",
+        "bg": "_bg",
+        "kill": "_kill",
+        "wait": "_wait",
+        "time": "_time",
+        "stats": "_stats_cmd",
+        "cache": "_cache_cmd",
+        "set": "_set",
+        "alias": "_alias_cmd",
+        "unalias": "_unalias",
+        "exit": "_exit",
+        "quit": "_exit",
+    }
+
+    def __init__(self, base_dir: str = None, interactive: bool = True,
+                 profile_dir: Optional[str] = None):
+        """Create a CommandHero CLI instance.
+        
+        ``interactive=False`` (scripts and ``-c``) skips readline and history.
+        With ``profile_dir`` every built-in runs under cProfile and leaves a
+        pstats file there.
+        """
         self.base_dir = base_dir or os.path.abspath(os.getcwd())
+        self._interactive = interactive
         self._running = True
         self._history: List[str] = []
         self._env_vars: Dict[str, str] = {}
+        self._last_status = 0
+        # Per-thread flag set by _error() so failed built-ins exit non-zero
+        self._builtin_state = threading.local()
+        
+        # Latency of every command, for 'stats'; optional cProfile output
+        self._stats = metrics.CommandStats()
+        self._profile_dir = profile_dir
+        self._profile_seq = itertools.count(1)
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        
+        # Executables on $PATH, scanned once and looked up by name
+        self._path_hash = pathhash.CommandHash()
+        
+        # Pipelines started with '&', numbered for jobs/fg/bg/kill/wait;
+        # the table is created with the first job
+        self._job_table: Optional["jobs.JobTable"] = None
+        
+        # Directory listings shared by ls, tree, find, du and completion;
+        # created on first use
+        self._dir_cache_obj: Optional["dircache.DirCache"] = None
+        
+        # Shell options changed with 'set -o NAME' / 'set +o NAME'
+        self._options: Dict[str, bool] = {"noglob": False}
+        
+        # Tab completion state: candidates for the current (line, text)
+        self._completion_key: Optional[tuple] = None
+        self._completion_matches: List[str] = []
         
         # Built-in command aliases
         self._aliases: Dict[str, str] = {
@@ -44,48 +153,19 @@ class CommandHero:
             "~": "cd ~",
         }
         
-        # Command registry
-        self._commands: Dict[str, Callable[[List[str]], None]] = {
-            "help": self._help,
-            "ls": self._ls,
-            "pwd": self._pwd,
-            "cd": self._cd,
-            "cat": self._cat,
-            "echo": self._echo,
-            "clear": self._clear,
-            "history": self._history_cmd,
-            "touch": self._touch,
-            "rm": self._rm,
-            "mkdir": self._mkdir,
-            "rmdir": self._rmdir,
-            "mv": self._mv,
-            "cp": self._cp,
-            "head": self._head,
-            "tail": self._tail,
-            "grep": self._grep,
-            "wc": self._wc,
-            "find": self._find,
-            "tree": self._tree,
-            "du": self._du,
-            "diff": self._diff,
-            "edit": self._edit,
-            "vim": self._vim,
-            "nano": self._nano,
-            "sort": self._sort,
-            "env": self._env,
-            "which": self._which,
-            "alias": self._alias_cmd,
-            "unalias": self._unalias,
-            "exit": self._exit,
-            "quit": self._exit,
-        }
+        # Command registry: names map to methods, bound on first use
+        self._commands: Mapping[str, Callable[[List[str]], None]] = lazy.MethodTable(
+            self, self.COMMANDS)
         
         # Setup readline for tab completion and history
-        self._setup_readline()
+        if interactive:
+            self._setup_readline()
 
     def _setup_readline(self):
         """Configure readline for tab completion and reverse search."""
         try:
+            import readline
+            
             # Set history length
             readline.set_history_length(1000)
             
@@ -95,7 +175,7 @@ class CommandHero:
             
             # Reverse search (Ctrl+R) - already built into readline
             # Set completer delimiters
-            readline.set_completer_delims(' \t\n;')
+            readline.set_completer_delims(' \t\n;|&')
             
             # Try to load history from file
             history_file = os.path.expanduser("~/.hero_history")
@@ -106,15 +186,19 @@ class CommandHero:
 
     def _save_history(self):
         """Save command history to file."""
+        if not self._interactive:
+            return
         try:
+            import readline
             history_file = os.path.expanduser("~/.hero_history")
             readline.write_history_file(history_file)
         except Exception:
             pass
 
-    def cmdloop(self):
-        """Main command loop."""
+    def cmdloop(self) -> int:
+        """Main command loop; returns the last exit status."""
         while self._running:
+            self._notify_jobs()
             try:
                 cwd = os.path.relpath(os.getcwd(), self.base_dir)
                 if cwd == ".":
@@ -130,6 +214,10 @@ class CommandHero:
             except EOFError:
                 print()
                 break
+            except KeyboardInterrupt:
+                # Ctrl+C at the prompt only discards the line being typed
+                print()
+                continue
             
             line = line.strip()
             if not line:
@@ -138,68 +226,471 @@ class CommandHero:
             # Save to history
             self._history.append(line)
             
-            # Expand aliases
-            line = self._expand_alias(line)
-            
             # Parse and execute
             try:
-                parts = shlex.split(line)
-                if parts:
-                    cmd, args = parts[0], parts[1:]
-                    self.run_command(cmd, args)
+                self.run_line(line)
+            except KeyboardInterrupt:
+                # Ctrl+C stops the foreground command; background jobs keep running
+                print()
+                self._last_status = 130
             except ValueError as e:
                 print(f"Parse error: {e}")
             except Exception as e:
                 print(f"Error: {e}")
         
+        if self._job_table is not None:
+            self._job_table.cancel_all()
         self._save_history()
+        return self._last_status
 
-    def run_command(self, cmd: str, args: List[str]) -> None:
-        """Execute a command."""
+    def run_script(self, lines: Iterable[str], name: str = "hero") -> int:
+        """Run commands line by line, as for a script file or ``-c``.
+        
+        ``lines`` is consumed lazily, so a script file is streamed rather
+        than read whole. Stops at ``exit``; jobs still running at the end
+        are waited for and their output printed. Returns the last status.
+        """
+        for lineno, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self.run_line(line)
+            except KeyboardInterrupt:
+                self._last_status = 130
+                break
+            except ValueError as e:
+                print(f"{name}: line {lineno}: {e}", file=sys.stderr)
+                self._last_status = 2
+            except Exception as e:
+                print(f"{name}: line {lineno}: {e}", file=sys.stderr)
+                self._last_status = 1
+            if not self._running:
+                break
+        
+        if self._job_table is not None:
+            for job in list(self._job_table.jobs.values()):
+                job.follow(sys.stdout.write)
+        sys.stdout.flush()
+        return self._last_status
+
+    def run_line(self, line: str) -> int:
+        """Parse a command line, expand aliases and run its lists.
+        
+        Pipelines joined by ``&&``/``||`` form a chain; chains are separated by
+        ``;``, and a chain followed by ``&`` starts as a background job.
+        Returns the exit status of the last foreground chain, which is also
+        kept for ``$?``.
+        """
+        tokens = self._expand_alias(lexer.tokenize(line))
+        chain: List[tuple] = []
+        for pipeline, terminator in lexer.split_list(tokens):
+            chain.append((pipeline, terminator))
+            if terminator in ("&&", "||"):
+                continue
+            if terminator == "&":
+                self._start_job(chain)
+                self._last_status = 0
+            else:
+                self._last_status = self._run_chain(chain)
+            chain = []
+            if not self._running:
+                break
+        return self._last_status
+
+    def _run_chain(self, chain: List[tuple]) -> int:
+        """Run (pipeline, operator) pairs, skipping past failed ``&&``/succeeded ``||``.
+        
+        Variables are expanded just before each pipeline runs, so ``$?``
+        is the status of the pipeline before it, and globs just after, so
+        they see files created by earlier pipelines. Each stage's
+        redirections are split off its words here.
+        """
+        status = self._last_status
+        
+        def lookup(name: str) -> str:
+            return str(status) if name == "?" else self._lookup_variable(name)
+        
+        connector = ""
+        for pipeline, terminator in chain:
+            if (connector == "&&" and status != 0) or (connector == "||" and status == 0):
+                connector = terminator
+                continue
+            stages: List[List[str]] = []
+            redirects: List[List[tuple]] = []
+            for stage in lexer.split_pipeline(pipeline):
+                words, targets = lexer.split_redirects(stage)
+                argv = self._expand_words(words, lookup)
+                if argv or targets:
+                    stages.append(argv)
+                    redirects.append([(op, None if target is None else lexer.expand([target], lookup))
+                                      for op, target in targets])
+            if stages and stages[0][:1] == ["time"] and len(stages[0]) > 1:
+                # Like sh, a leading 'time' times the whole pipeline
+                stages[0] = stages[0][1:]
+                status = self._time_pipeline(stages, redirects)
+            else:
+                status = self._run_pipeline(stages, redirects) if stages else 0
+            connector = terminator
+        return status
+
+    def _expand_words(self, words: List[str], lookup: Callable[[str], str]) -> List[str]:
+        """Expand variables, then braces and glob patterns in unquoted words."""
+        if self._options["noglob"]:
+            return lexer.expand(words, lookup)
+        argv: List[str] = []
+        for word in words:
+            for text in lexer.expand([word], lookup):
+                if isinstance(word, lexer.Word) and not word.quoted and any(c in text for c in "*?[{"):
+                    argv.extend(globbing.expand(text, self._dir_cache.listdir))
+                else:
+                    argv.append(text)
+        return argv
+
+    def _start_job(self, chain: List[tuple]) -> "jobs.Job":
+        """Run a chain on a background thread with its output captured."""
+        def run(job: jobs.Job) -> int:
+            with streams.bound(None, job.output, job.output):
+                return self._run_chain(chain)
+        
+        command = " ".join(" ".join(pipeline) + (f" {op}" if op in ("&&", "||") else "")
+                           for pipeline, op in chain)
+        job = self._jobs.start(command, run)
+        print(f"[{job.id}] {command}")
+        return job
+
+    @property
+    def _jobs(self) -> "jobs.JobTable":
+        if self._job_table is None:
+            self._job_table = jobs.JobTable()
+        return self._job_table
+
+    @property
+    def _dir_cache(self) -> "dircache.DirCache":
+        if self._dir_cache_obj is None:
+            self._dir_cache_obj = dircache.DirCache()
+        return self._dir_cache_obj
+
+    def _notify_jobs(self):
+        """Report background jobs that finished since the last prompt."""
+        if self._job_table is None:
+            return
+        for job in self._jobs.finished():
+            if job.reported:
+                continue
+            job.reported = True
+            if job.output.empty():
+                self._jobs.remove(job)
+                print(f"[{job.id}]  {job.state:<10} {job.command}")
+            else:
+                print(f"[{job.id}]  {job.state:<10} {job.command}  "
+                      f"{self.COLORS['dim']}(output: fg %{job.id}){self.COLORS['reset']}")
+
+    def run_command(self, cmd: str, args: List[str]) -> int:
+        """Execute a command and return its exit status.
+        
+        Built-ins succeed unless they raise or return a non-zero int; anything
+        else is looked up on $PATH and run as an external program. Every
+        dispatch is timed for ``stats``.
+        """
+        start = time.perf_counter()
+        status = self._dispatch(cmd, args)
+        if status != 127:
+            self._stats.record(cmd, time.perf_counter() - start, failed=status != 0)
+        return status
+
+    def _dispatch(self, cmd: str, args: List[str]) -> int:
         fn = self._commands.get(cmd)
         if fn:
             try:
-                fn(args)
+                self._builtin_state.failed = False
+                status = self._call_builtin(cmd, fn, args)
+                if isinstance(status, int):
+                    return status
+                return 1 if self._builtin_state.failed else 0
+            except BrokenPipeError:
+                return 141  # The next stage of the pipeline stopped reading
             except Exception as e:
-                print(f"{self.COLORS['red']}Error: {e}{self.COLORS['reset']}")
+                self._error(f"Error: {e}")
+                return 1
+        
+        path = self._path_hash.lookup(cmd)
+        if path:
+            try:
+                return self._run_external(path, [cmd] + args)
+            except OSError as e:
+                self._error(f"Failed to run {cmd}: {e}")
+                return 126
+        
+        self._error(f"Unknown command: {cmd}")
+        print(f"Type 'help' for available commands.", file=sys.stderr)
+        return 127
+
+    def _call_builtin(self, cmd: str, fn: Callable[[List[str]], None], args: List[str]):
+        """Call a built-in, under cProfile when the session runs with --profile."""
+        if self._profile_dir is None:
+            return fn(args)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return fn(args)  # Another stage's profiler is active (Python 3.12+)
+        try:
+            return fn(args)
+        finally:
+            profiler.disable()
+            name = f"{next(self._profile_seq):04d}-{cmd}.pstats"
+            profiler.dump_stats(os.path.join(self._profile_dir, name))
+
+    def _run_external(self, path: str, argv: List[str]) -> int:
+        """Run an external program wired to the current stage's stdin/stdout.
+        
+        The child writes straight into the terminal or pipeline pipe; only when
+        stdout has no file descriptor (captured output) is it relayed in chunks.
+        Inside a background job the child leads its own process group and
+        reads /dev/null instead of the terminal.
+        """
+        job = jobs.current()
+        stdin = streams.piped_stdin()
+        devnull = None
+        if stdin is not None:
+            stdin_fd = stdin.fileno()
+        elif job is not None:
+            devnull = stdin_fd = os.open(os.devnull, os.O_RDONLY)
         else:
-            print(f"{self.COLORS['red']}Unknown command: {cmd}{self.COLORS['reset']}")
-            print(f"Type 'help' for available commands.")
-
-    def _expand_alias(self, line: str) -> str:
-        """Expand command aliases."""
-        parts = line.split(None, 1)
-        if not parts:
-            return line
-        cmd = parts[0]
-        rest = parts[1] if len(parts) > 1 else ""
-        if cmd in self._aliases:
-            expanded = self._aliases[cmd]
-            return f"{expanded} {rest}" if rest else expanded
-        return line
+            stdin_fd = None
+        sys.stdout.flush()
+        try:
+            stdout_fd = sys.stdout.fileno()
+        except (AttributeError, OSError, ValueError):
+            stdout_fd = None
+        # A redirected stderr is handed over; captured stderr stays on the terminal
+        sys.stderr.flush()
+        try:
+            stderr_fd = sys.stderr.fileno()
+        except (AttributeError, OSError, ValueError):
+            stderr_fd = None
+        
+        r, w = os.pipe() if stdout_fd is None else (None, stdout_fd)
+        try:
+            pid = process.spawn(path, argv, stdin_fd, w, new_group=job is not None,
+                                stderr_fd=stderr_fd)
+        except OSError:
+            if r is not None:
+                os.close(r)
+            raise
+        finally:
+            if r is not None:
+                os.close(w)
+            if devnull is not None:
+                os.close(devnull)
+        if job is not None:
+            job.add_process(pid)
+        if r is None:
+            return process.wait(pid)
+        
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while True:
+                chunk = os.read(r, 64 * 1024)
+                if not chunk:
+                    break
+                sys.stdout.write(decoder.decode(chunk))
+        finally:
+            os.close(r)
+            status = process.wait(pid)
+        return status
+
+    def _error(self, message: str) -> None:
+        """Print an error in red on stderr and mark the running built-in as failed."""
+        try:
+            sys.stdout.flush()  # Keep it after the output that came before it
+        except (OSError, ValueError):
+            pass
+        print(f"{self.COLORS['red']}{message}{self.COLORS['reset']}", file=sys.stderr)
+        self._builtin_state.failed = True
+
+    def _lookup_variable(self, name: str) -> str:
+        """Value of ``$name`` for command line expansion."""
+        if name == "?":
+            return str(self._last_status)
+        return os.environ.get(name, "")
+
+    def _run_pipeline(self, stages: List[List[str]],
+                      redirects: Optional[List[List[tuple]]] = None) -> int:
+        """Run pipeline stages concurrently, each stdout feeding the next stdin.
+        
+        ``redirects`` holds each stage's ``(operator, target)`` redirections.
+        """
+        redirects = redirects or [[] for _ in stages]
+        if len(stages) == 1:
+            return self._run_redirected(stages[0], redirects[0])
+        
+        threads = []
+        upstream = None
+        job = jobs.current()
+        # Ctrl+C reaches only this thread; the flag stops the other stages
+        foreground = jobs.Foreground() if job is None else None
+        with streams.installed(), foreground.interrupts() if foreground else nullcontext():
+            for argv, targets in zip(stages[:-1], redirects):
+                reader, writer = streams.open_pipe()
+                t = threading.Thread(target=self._run_stage,
+                                     args=(argv, upstream, writer, job, targets, foreground),
+                                     daemon=True)
+                t.start()
+                threads.append(t)
+                upstream = reader
+            try:
+                return self._run_stage(stages[-1], upstream, None, job, redirects[-1], foreground)
+            finally:
+                for t in threads:
+                    t.join()
+
+    def _run_stage(self, argv: List[str], stdin, stdout, job: Optional["jobs.Job"] = None,
+                   targets: Optional[List[tuple]] = None,
+                   foreground: Optional["jobs.Foreground"] = None) -> int:
+        """Run one pipeline stage, closing its pipe ends when it finishes."""
+        try:
+            with streams.bound(stdin, stdout), jobs.running_in(job, foreground):
+                return self._run_redirected(argv, targets or [])
+        finally:
+            # Closing stdout signals EOF downstream; closing stdin makes the
+            # upstream stage stop with a broken pipe instead of reading on.
+            for stream in (stdout, stdin):
+                if stream is not None:
+                    streams.close_quietly(stream)
+
+    def _run_redirected(self, argv: List[str], targets: List[tuple]) -> int:
+        """Run one command with its ``>``, ``>>``, ``2>``, ``2>>`` and ``2>&1`` applied.
+        
+        A redirection without a command (``> file``) just creates or
+        truncates the file.
+        """
+        if not targets:
+            return self.run_command(argv[0], argv[1:])
+        
+        stdout = stderr = None
+        opened: List["streams.FileWriter"] = []
+        try:
+            for op, words in targets:
+                if op == "2>&1":
+                    stderr = stdout or streams.current_stdout()
+                    continue
+                if len(words) != 1:
+                    self._error(f"hero: {' '.join(words) or 'redirect'}: ambiguous redirect")
+                    return 1
+                try:
+                    writer = streams.FileWriter(os.path.expanduser(words[0]), append=op.endswith(">>"))
+                except OSError as e:
+                    self._error(f"hero: {words[0]}: {e.strerror}")
+                    return 1
+                opened.append(writer)
+                if op.startswith("2"):
+                    stderr = writer
+                else:
+                    stdout = writer
+            if not argv:
+                return 0
+            with streams.bound(None, stdout, stderr):
+                return self.run_command(argv[0], argv[1:])
+        finally:
+            for writer in opened:
+                try:
+                    writer.close()
+                except OSError as e:
+                    self._error(f"hero: {writer.name}: {e.strerror}")
+
+    def _expand_alias(self, tokens: List[str]) -> List[str]:
+        """Expand command aliases at the start of each pipeline stage."""
+        expanded: List[str] = []
+        at_command = True
+        for tok in tokens:
+            if at_command and not isinstance(tok, lexer.Operator) and tok in self._aliases:
+                expanded.extend(lexer.tokenize(self._aliases[tok]))
+            else:
+                expanded.append(tok)
+            at_command = isinstance(tok, lexer.Operator) and tok not in lexer.REDIRECTIONS
+        return expanded
+
+    def _with_piped_file(self, args: List[str]) -> List[str]:
+        """Turn ``cmd [n]`` into ``cmd - [n]`` when input is piped in."""
+        if streams.piped_stdin() is not None and (not args or (len(args) == 1 and args[0].isdigit())):
+            return ["-"] + args
+        return args
+
+    def _input_lines(self, filepath: str, decompress_input: bool = True) -> Iterator[str]:
+        """Lazily yield lines from a file, or from piped input for '-'.
+        
+        Compressed files are decompressed as they are read.
+        """
+        if filepath == "-":
+            stdin = streams.piped_stdin()
+            if stdin is not None:
+                yield from stdin
+            return
+        with decompress.open_input(filepath, decompress_input) as raw:
+            yield from io.TextIOWrapper(raw, encoding="utf-8")
+
+    def _decompress_option(self, args: List[str]) -> Tuple[List[str], bool]:
+        """Strip -z/--no-decompress from args; return (args, whether to decompress)."""
+        rest = [a for a in args if a not in ("-z", "--no-decompress")]
+        return rest, len(rest) == len(args)
 
     def _completer(self, text: str, state: int) -> Optional[str]:
-        """Tab completion handler."""
-        line = readline.get_line_buffer()
-        parts = line.split()
-        
-        # Complete commands if at the beginning
-        if not parts or (len(parts) == 1 and not line.endswith(" ")):
-            commands = [cmd for cmd in self._commands.keys() if cmd.startswith(text)]
-            commands += [alias for alias in self._aliases.keys() if alias.startswith(text)]
-            commands = sorted(set(commands))
-            return commands[state] if state < len(commands) else None
-        
-        # Complete file/directory names
-        if text:
-            matches = glob.glob(text + "*")
-        else:
-            matches = glob.glob("*")
+        """Tab completion handler.
         
-        # Add trailing slash for directories
-        matches = [m + "/" if os.path.isdir(m) else m for m in matches]
+        readline calls this with state 0, 1, 2, ... until it returns None, so
+        the candidates are computed once per (line, text) and then indexed.
+        """
+        import readline
+        line = readline.get_line_buffer()
+        key = (line, readline.get_begidx(), text)
+        if state == 0 or key != self._completion_key:
+            self._completion_key = key
+            self._completion_matches = self._complete(line[:readline.get_begidx()], text)
+        matches = self._completion_matches
         return matches[state] if state < len(matches) else None
 
+    def _complete(self, before: str, text: str) -> List[str]:
+        """Return sorted completion candidates for ``text``."""
+        # Environment variable names
+        if text.startswith("$"):
+            return sorted("$" + name for name in os.environ if name.startswith(text[1:]))
+        
+        # Command names: built-ins, aliases and executables on $PATH
+        words = before.split()
+        if not words or before.rstrip().endswith(("|", "&", ";")):
+            if os.sep in text:
+                return [m for m in self._complete_path(text) if m.endswith("/") or os.access(m, os.X_OK)]
+            matches = {cmd for cmd in self._commands if cmd.startswith(text)}
+            matches.update(alias for alias in self._aliases if alias.startswith(text))
+            matches.update(self._path_executables(text))
+            return sorted(matches)
+        
+        return self._complete_path(text)
+
+    def _complete_path(self, text: str) -> List[str]:
+        """Complete a path relative to the directory part of ``text``."""
+        dirname, prefix = os.path.split(text)
+        directory = os.path.expanduser(dirname) if dirname else "."
+        show_hidden = prefix.startswith(".")
+        matches = []
+        for name, is_dir in self._list_dir(directory):
+            if name.startswith(prefix) and (show_hidden or not name.startswith(".")):
+                matches.append(os.path.join(dirname, name) + ("/" if is_dir else ""))
+        return matches
+
+    def _path_executables(self, prefix: str) -> List[str]:
+        """Names of executables on $PATH starting with ``prefix``."""
+        return self._path_hash.names(prefix)
+
+    def _list_dir(self, path: str) -> List[tuple]:
+        """Return sorted (name, is_dir) pairs for a directory, from the shared cache."""
+        try:
+            return [(entry.name, entry.is_dir()) for entry in self._dir_cache.listdir(path)]
+        except OSError:
+            return []
+
     # ===== COMMAND IMPLEMENTATIONS =====
 
     def _help(self, args: List[str]):
@@ -210,8 +701,9 @@ class CommandHero:
             "Navigation": ["cd", "pwd", "ls", "tree"],
             "File Operations": ["cat", "touch", "mkdir", "rm", "rmdir", "mv", "cp", "edit"],
             "Text Processing": ["echo", "head", "tail", "grep", "wc", "sort", "diff"],
-            "Search": ["find", "which"],
-            "System": ["clear", "history", "du", "env"],
+            "Search": ["find", "updatedb", "which", "hash", "dupes"],
+            "System": ["clear", "history", "du", "env", "set", "time", "stats", "cache"],
+            "Jobs": ["jobs", "fg", "bg", "kill", "wait"],
             "Aliases": ["alias", "unalias"],
             "Control": ["help", "exit", "quit"],
         }
@@ -227,56 +719,179 @@ class CommandHero:
         print(f"  • Press {self.COLORS['bold']}Tab{self.COLORS['reset']} for auto-completion")
         print(f"  • Press {self.COLORS['bold']}Ctrl+R{self.COLORS['reset']} for reverse search")
         print(f"  • Use {self.COLORS['bold']}alias{self.COLORS['reset']} to create shortcuts")
+        print(f"  • Chain commands with {self.COLORS['bold']}|{self.COLORS['reset']}, e.g. cat log | grep ERROR | head")
+        print(f"  • End a command with {self.COLORS['bold']}&{self.COLORS['reset']} to run it in the background, e.g. du / &")
         print(f"  • Built-in aliases: ll, la, .., ..., ~\n")
 
     def _ls(self, args: List[str]):
-        """List directory contents with colors."""
-        long_format = "-l" in args or "-la" in args
-        show_hidden = "-a" in args or "-la" in args
-        args = [a for a in args if not a.startswith("-")]
-        path = args[0] if args else "."
+        """List directory contents with colors (-l, -a, -h, -S, -t, -R)."""
+        flags = set("".join(a[1:] for a in args if a.startswith("-")))
+        unknown = flags - set("lahStR")
+        if unknown:
+            self._error(f"ls: unknown option -{''.join(sorted(unknown))}")
+            return
+        operands = [a for a in args if not a.startswith("-")] or ["."]
         
+        # Like ls(1): file operands first, then each directory under a heading
+        out: List[str] = []
+        files: List[tuple] = []
+        pending: List[str] = []
+        for path in sorted(operands):
+            if os.path.isdir(path):
+                pending.append(path)
+            elif os.path.lexists(path):
+                files.append((path, self._ls_stat(path)))
+            else:
+                self._error(f"ls: {path}: No such file or directory")
+        out.extend(self._ls_format(self._ls_sort(files, flags), flags))
+        headings = "R" in flags or len(operands) > 1
+        written = False
+        while pending:
+            directory = pending.pop(0)
+            try:
+                entries = self._ls_entries(directory, flags)
+            except OSError as e:
+                # Keep the error after the listing that came before it
+                if out:
+                    sys.stdout.write("\n".join(out) + "\n")
+                    out, written = [], True
+                self._error(f"ls: {directory}: {e.strerror or e}")
+                continue
+            if headings:
+                if out or written:
+                    out.append("")
+                out.append(f"{directory}:")
+            out.extend(self._ls_format(entries, flags))
+            if "R" in flags:
+                pending[0:0] = [os.path.join(directory, e.name) for e, _ in entries
+                                if e.is_dir(follow_symlinks=False)]
+        
+        # One write for the whole listing instead of a print per entry.
+        if out:
+            sys.stdout.write("\n".join(out) + "\n")
+
+    def _ls_format(self, entries: List[tuple], flags) -> List[str]:
+        """Lines for (entry, stat) pairs: long format with -l, else columns."""
+        if "l" not in flags:
+            return self._ls_columns(entries)
+        times: Dict[int, str] = {}
+        return [self._ls_long(entry, st, "h" in flags, times) for entry, st in entries]
+
+    def _ls_stat(self, path: str) -> Optional[os.stat_result]:
+        """Stat a file operand, falling back to the link itself when it dangles."""
         try:
-            entries = os.listdir(path)
-            if not show_hidden:
-                entries = [e for e in entries if not e.startswith(".")]
-            entries.sort()
-            
-            if long_format:
-                # Detailed listing
-                for name in entries:
-                    full_path = os.path.join(path, name)
+            return os.stat(path)
+        except OSError:
+            try:
+                return os.lstat(path)
+            except OSError:
+                return None
+
+    def _ls_sort(self, entries: List[tuple], flags) -> List[tuple]:
+        """Order (entry, stat) pairs, already sorted by name, for -S or -t."""
+        if "S" in flags:
+            entries.sort(key=lambda pair: pair[1].st_size if pair[1] else 0, reverse=True)
+        elif "t" in flags:
+            entries.sort(key=lambda pair: pair[1].st_mtime if pair[1] else 0, reverse=True)
+        return entries
+
+    def _ls_entries(self, path: str, flags) -> List[tuple]:
+        """Read a directory through the listing cache, returning sorted (entry, stat) pairs.
+        
+        Entries cache their type and stat result, so each entry costs at most
+        one stat call, and none when only the name and type are needed.
+        """
+        need_stat = bool(flags & set("lSt"))
+        entries = []
+        for entry in self._dir_cache.listdir(path):
+            if "a" not in flags and entry.name.startswith("."):
+                continue
+            st = None
+            if need_stat or not self._ls_is_dir(entry):
+                try:
+                    st = entry.stat()
+                except OSError:
                     try:
-                        st = os.stat(full_path)
-                        perms = stat.filemode(st.st_mode)
-                        size = st.st_size
-                        mtime = datetime.datetime.fromtimestamp(st.st_mtime).strftime('%b %d %H:%M')
-                        
-                        # Colorize name
-                        if os.path.isdir(full_path):
-                            colored_name = f"{self.COLORS['blue']}{self.COLORS['bold']}{name}/{self.COLORS['reset']}"
-                        elif os.access(full_path, os.X_OK):
-                            colored_name = f"{self.COLORS['green']}{name}*{self.COLORS['reset']}"
-                        else:
-                            colored_name = name
-                        
-                        print(f"{perms} {size:>8} {mtime} {colored_name}")
-                    except Exception:
-                        print(name)
-            else:
-                # Simple listing with colors
-                for name in entries:
-                    full_path = os.path.join(path, name)
-                    if os.path.isdir(full_path):
-                        print(f"{self.COLORS['blue']}{self.COLORS['bold']}{name}/{self.COLORS['reset']}")
-                    elif os.access(full_path, os.X_OK):
-                        print(f"{self.COLORS['green']}{name}*{self.COLORS['reset']}")
-                    else:
-                        print(name)
-        except FileNotFoundError:
-            print(f"{self.COLORS['red']}No such directory: {path}{self.COLORS['reset']}")
-        except PermissionError:
-            print(f"{self.COLORS['red']}Permission denied: {path}{self.COLORS['reset']}")
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        pass
+            entries.append((entry, st))
+        
+        # Listings come sorted by name
+        return self._ls_sort(entries, flags)
+
+    def _ls_is_dir(self, entry) -> bool:
+        try:
+            return entry.is_dir()
+        except OSError:
+            return False
+
+    def _ls_name(self, entry, st) -> tuple:
+        """Return (colored name, visible width) for a directory entry or file operand path."""
+        if isinstance(entry, str):
+            name, is_dir = entry, False
+        else:
+            name, is_dir = entry.name, self._ls_is_dir(entry)
+        if is_dir:
+            return f"{self.COLORS['blue']}{self.COLORS['bold']}{name}/{self.COLORS['reset']}", len(name) + 1
+        if st is not None and stat.S_ISREG(st.st_mode) and st.st_mode & 0o111:
+            return f"{self.COLORS['green']}{name}*{self.COLORS['reset']}", len(name) + 1
+        return name, len(name)
+
+    def _ls_long(self, entry, st, human: bool, times: Dict[int, str]) -> str:
+        """Format one entry for ls -l, memoising timestamps per minute in ``times``."""
+        colored_name, _ = self._ls_name(entry, st)
+        if st is None:
+            return colored_name
+        perms = stat.filemode(st.st_mode)
+        size = self._human_size(st.st_size) if human else st.st_size
+        minute = int(st.st_mtime) // 60
+        mtime = times.get(minute)
+        if mtime is None:
+            mtime = times[minute] = datetime.datetime.fromtimestamp(st.st_mtime).strftime('%b %d %H:%M')
+        return f"{perms} {size:>8} {mtime} {colored_name}"
+
+    def _ls_columns(self, entries: List[tuple]) -> List[str]:
+        """Lay names out in columns (filled top to bottom) that fit the terminal.
+        
+        Output that is not a terminal gets one name per line so pipelines
+        like ``ls | wc`` see one entry per line.
+        """
+        names = [self._ls_name(entry, st) for entry, st in entries]
+        if not names:
+            return []
+        try:
+            tty = sys.stdout.isatty()
+        except (AttributeError, ValueError):
+            tty = False
+        if not tty:
+            return [name for name, _ in names]
+        
+        width = shutil.get_terminal_size().columns
+        gap = 2
+        widths = [w for _, w in names]
+        # Try the widest layout first; no layout can have more columns than
+        # would fit if every name were as short as the shortest one.
+        max_cols = max(1, min(len(names), (width + gap) // (min(widths) + gap)))
+        for cols in range(max_cols, 0, -1):
+            rows = -(-len(names) // cols)
+            cols = -(-len(names) // rows)
+            col_widths = [max(widths[c * rows:(c + 1) * rows]) for c in range(cols)]
+            if sum(col_widths) + gap * (cols - 1) <= width:
+                break
+        
+        lines = []
+        for r in range(rows):
+            cells = []
+            for c in range(cols):
+                i = c * rows + r
+                if i >= len(names):
+                    break
+                name, w = names[i]
+                last = c == cols - 1 or (c + 1) * rows + r >= len(names)
+                cells.append(name if last else name + " " * (col_widths[c] - w + gap))
+            lines.append("".join(cells))
+        return lines
 
     def _pwd(self, args: List[str]):
         """Print working directory."""
@@ -292,24 +907,82 @@ class CommandHero:
         try:
             os.chdir(os.path.expanduser(target))
         except FileNotFoundError:
-            print(f"{self.COLORS['red']}No such directory: {target}{self.COLORS['reset']}")
+            self._error(f"No such directory: {target}")
         except PermissionError:
-            print(f"{self.COLORS['red']}Permission denied: {target}{self.COLORS['reset']}")
+            self._error(f"Permission denied: {target}")
 
     def _cat(self, args: List[str]):
-        """Display file contents."""
-        if not args:
-            print("Usage: cat <file>")
+        """Display file contents (-n numbers lines, -A shows control characters).
+        
+        Compressed files are shown decompressed unless -z is given.
+        """
+        args, decompress_input = self._decompress_option(args)
+        flags = set("".join(a[1:] for a in args if a.startswith("-") and a != "-"))
+        files = [a for a in args if not a.startswith("-") or a == "-"]
+        decompress_input = decompress_input and "z" not in flags
+        flags.discard("z")
+        unknown = flags - set("nA")
+        if unknown:
+            self._error(f"cat: unknown option -{''.join(sorted(unknown))}")
+            return
+        if not files and streams.piped_stdin() is not None:
+            files = ["-"]
+        if not files:
+            print("Usage: cat [-n] [-A] [-z] <file>...")
             return
         
-        for filepath in args:
+        # Raw bytes go straight to the terminal or pipe; only captured
+        # output (background jobs) needs decoding back to text.
+        fd = fileio.output_fd(sys.stdout)
+        if fd is None:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            write = lambda data: sys.stdout.write(decoder.decode(data))
+        else:
+            write = lambda data: fileio.write_all(fd, data)
+        numbers = itertools.count(1)
+        
+        # Archives further down the list decompress while earlier files are shown
+        for filepath, f, error in decompress.open_many(files, decompress_input):
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    print(f.read(), end="")
+                if error is not None:
+                    raise error
+                if filepath == "-":
+                    stdin = streams.piped_stdin()
+                    if stdin is None:
+                        self._error("cat: -: no piped input")
+                        continue
+                    self._cat_stream(stdin.buffer, flags, fd, write, numbers)
+                else:
+                    with f:
+                        self._cat_stream(f, flags, fd, write, numbers)
             except FileNotFoundError:
-                print(f"{self.COLORS['red']}No such file: {filepath}{self.COLORS['reset']}")
+                self._error(f"No such file: {filepath}")
             except PermissionError:
-                print(f"{self.COLORS['red']}Permission denied: {filepath}{self.COLORS['reset']}")
+                self._error(f"Permission denied: {filepath}")
+            except IsADirectoryError:
+                self._error(f"cat: {filepath}: Is a directory")
+            except BrokenPipeError:
+                raise
+            except OSError as e:
+                self._error(f"cat: {filepath}: {e.strerror or e}")
+
+    def _cat_stream(self, f, flags: set, fd: Optional[int],
+                    write: Callable[[bytes], None], numbers: Iterator[int]):
+        """Copy one binary input to stdout, through the -n/-A filters if asked."""
+        if not flags:
+            if fd is not None:
+                fileio.copy_to_fd(f, fd)
+            else:
+                for chunk in iter(lambda: f.read(fileio.CHUNK_SIZE), b""):
+                    write(chunk)
+            return
+        lines = iter(f)
+        if "A" in flags:
+            lines = fileio.show_nonprinting(lines)
+        if "n" in flags:
+            lines = fileio.number_lines(lines, numbers)
+        for chunk in fileio.batched(lines):
+            write(chunk)
 
     def _edit(self, args: List[str]):
         """Open a file in the user's editor (respects $EDITOR)."""
@@ -323,9 +996,9 @@ class CommandHero:
             # Launch the editor, inheriting stdio so interactive editors work
             subprocess.call(cmd)
         except FileNotFoundError:
-            print(f"{self.COLORS['red']}Editor not found: {cmd[0]}{self.COLORS['reset']}")
+            self._error(f"Editor not found: {cmd[0]}")
         except Exception as e:
-            print(f"{self.COLORS['red']}Failed to launch editor: {e}{self.COLORS['reset']}")
+            self._error(f"Failed to launch editor: {e}")
 
     def _vim(self, args: List[str]):
         """Shortcut to open vim (or fall back if not present)."""
@@ -333,9 +1006,9 @@ class CommandHero:
         try:
             subprocess.call(cmd)
         except FileNotFoundError:
-            print(f"{self.COLORS['red']}vim not found{self.COLORS['reset']}")
+            self._error(f"vim not found")
         except Exception as e:
-            print(f"{self.COLORS['red']}Failed to launch vim: {e}{self.COLORS['reset']}")
+            self._error(f"Failed to launch vim: {e}")
 
     def _nano(self, args: List[str]):
         """Shortcut to open nano."""
@@ -343,9 +1016,9 @@ class CommandHero:
         try:
             subprocess.call(cmd)
         except FileNotFoundError:
-            print(f"{self.COLORS['red']}nano not found{self.COLORS['reset']}")
+            self._error(f"nano not found")
         except Exception as e:
-            print(f"{self.COLORS['red']}Failed to launch nano: {e}{self.COLORS['reset']}")
+            self._error(f"Failed to launch nano: {e}")
 
     def _echo(self, args: List[str]):
         """Print text to stdout."""
@@ -370,27 +1043,50 @@ class CommandHero:
         
         for filepath in args:
             try:
-                Path(filepath).touch()
+                pathlib.Path(filepath).touch()
             except Exception as e:
-                print(f"{self.COLORS['red']}Failed to touch {filepath}: {e}{self.COLORS['reset']}")
+                self._error(f"Failed to touch {filepath}: {e}")
 
     def _rm(self, args: List[str]):
-        """Remove files."""
-        if not args:
-            print("Usage: rm <file> [file...]")
+        """Remove files (-r directories too, -f ignore missing, --dry-run to count)."""
+        flags = set("".join(a[1:] for a in args if a.startswith("-") and not a.startswith("--")))
+        options = {a for a in args if a.startswith("--")}
+        paths = [a for a in args if not a.startswith("-")]
+        unknown = flags - set("rRf")
+        if unknown or options - {"--dry-run"} or not paths:
+            print("Usage: rm [-r] [-f] [--dry-run] <file> [file...]")
             return
+        recursive = bool(flags & set("rR"))
+        force = "f" in flags
         
-        for filepath in args:
-            try:
-                if os.path.isdir(filepath):
-                    print(f"{self.COLORS['yellow']}Skipping directory {filepath} (use rmdir){self.COLORS['reset']}")
-                else:
-                    os.remove(filepath)
-                    print(f"Removed: {filepath}")
-            except FileNotFoundError:
-                print(f"{self.COLORS['red']}No such file: {filepath}{self.COLORS['reset']}")
-            except Exception as e:
-                print(f"{self.COLORS['red']}Failed to remove {filepath}: {e}{self.COLORS['reset']}")
+        targets: List[str] = []
+        for path in paths:
+            if not os.path.lexists(path):
+                if not force:
+                    self._error(f"rm: {path}: No such file or directory")
+            elif os.path.basename(os.path.normpath(path)) in (".", "..") or \
+                    os.path.abspath(path) == os.path.abspath(os.sep):
+                self._error(f"rm: refusing to remove '{path}'")
+            elif os.path.isdir(path) and not os.path.islink(path) and not recursive:
+                self._error(f"rm: {path}: is a directory (use -r)")
+            else:
+                targets.append(path)
+        if targets:
+            self._remove_paths("rm", targets, "--dry-run" in options)
+
+    def _remove_paths(self, cmd: str, paths: List[str], dry_run: bool = False):
+        """Delete (or count) files and trees with the deletion engine and print a summary."""
+        result = deleting.remove(paths, dry_run=dry_run, progress_stream=self._progress_stream())
+        for message in result.errors[:20]:
+            self._error(f"{cmd}: {message}")
+        if len(result.errors) > 20:
+            self._error(f"{cmd}: ... {len(result.errors) - 20} more errors")
+        files = f"{result.files} file{'s' if result.files != 1 else ''}"
+        dirs = f"{result.dirs} director{'ies' if result.dirs != 1 else 'y'}"
+        if dry_run:
+            print(f"Would remove {files} and {dirs} ({self._human_size(result.bytes)})")
+        else:
+            print(f"Removed {files} and {dirs}")
 
     def _mkdir(self, args: List[str]):
         """Create directories."""
@@ -403,7 +1099,7 @@ class CommandHero:
                 os.makedirs(dirpath, exist_ok=True)
                 print(f"Created: {dirpath}")
             except Exception as e:
-                print(f"{self.COLORS['red']}Failed to create {dirpath}: {e}{self.COLORS['reset']}")
+                self._error(f"Failed to create {dirpath}: {e}")
 
     def _rmdir(self, args: List[str]):
         """Remove directories."""
@@ -414,236 +1110,746 @@ class CommandHero:
         recursive = "-r" in args
         dirs = [a for a in args if not a.startswith("-")]
         
+        if recursive:
+            missing = [d for d in dirs if not os.path.isdir(d)]
+            for dirpath in missing:
+                self._error(f"No such directory: {dirpath}")
+            dirs = [d for d in dirs if d not in missing]
+            if dirs:
+                self._remove_paths("rmdir", dirs)
+            return
+        
         for dirpath in dirs:
             try:
-                if recursive:
-                    shutil.rmtree(dirpath)
-                else:
-                    os.rmdir(dirpath)
+                os.rmdir(dirpath)
                 print(f"Removed: {dirpath}")
             except FileNotFoundError:
-                print(f"{self.COLORS['red']}No such directory: {dirpath}{self.COLORS['reset']}")
+                self._error(f"No such directory: {dirpath}")
             except OSError as e:
-                print(f"{self.COLORS['red']}Failed to remove {dirpath}: {e}{self.COLORS['reset']}")
+                self._error(f"Failed to remove {dirpath}: {e}")
+
+    def _copy_targets(self, cmd: str, paths: List[str]) -> Optional[List[tuple]]:
+        """Pair each source with its destination, cp/mv style: ``src dst`` or ``src... dir``."""
+        *sources, dest = paths
+        if os.path.isdir(dest):
+            return [(src, os.path.join(dest, os.path.basename(src.rstrip(os.sep)) or src))
+                    for src in sources]
+        if len(sources) > 1:
+            self._error(f"{cmd}: target '{dest}' is not a directory")
+            return None
+        return [(sources[0], dest)]
+
+    def _progress_stream(self):
+        """stderr when a progress bar can be drawn there: a terminal, in the foreground."""
+        if jobs.current() is None and sys.stderr.isatty():
+            return sys.stderr
+        return None
 
     def _mv(self, args: List[str]):
-        """Move or rename files."""
+        """Move or rename files (copies across filesystems)."""
         if len(args) < 2:
-            print("Usage: mv <source> <dest>")
+            print("Usage: mv <source>... <dest>")
             return
         
-        src, dst = args[0], args[1]
-        try:
-            shutil.move(src, dst)
-            print(f"Moved: {src} -> {dst}")
-        except Exception as e:
-            print(f"{self.COLORS['red']}Failed to move: {e}{self.COLORS['reset']}")
+        pairs = self._copy_targets("mv", args)
+        for src, dst in pairs or []:
+            try:
+                result = copying.move(src, dst, self._progress_stream())
+                for message in result.errors:
+                    self._error(f"mv: {message}")
+                if not result.errors:
+                    print(f"Moved: {src} -> {dst}")
+            except Exception as e:
+                self._error(f"Failed to move: {e}")
 
     def _cp(self, args: List[str]):
-        """Copy files or directories."""
-        if len(args) < 2:
-            print("Usage: cp <source> <dest>")
+        """Copy files or directories (-r, -u/--update to skip unchanged files)."""
+        flags = [a for a in args if a.startswith("-") and a != "-"]
+        paths = [a for a in args if a not in flags]
+        unknown = set(flags) - {"-r", "-R", "-u", "--update"}
+        if unknown or len(paths) < 2:
+            print("Usage: cp [-r] [-u|--update] <source>... <dest>")
             return
+        update = "-u" in flags or "--update" in flags
+        recursive = "-r" in flags or "-R" in flags
         
-        src, dst = args[0], args[1]
-        try:
-            if os.path.isdir(src):
-                shutil.copytree(src, dst)
+        pairs = []
+        for src, dst in self._copy_targets("cp", paths) or []:
+            if not os.path.exists(src):
+                self._error(f"cp: {src}: No such file or directory")
+            elif os.path.isdir(src) and not recursive:
+                self._error(f"cp: -r not specified; omitting directory '{src}'")
+            elif os.path.isdir(src) and os.path.abspath(dst).startswith(
+                    os.path.abspath(src).rstrip(os.sep) + os.sep):
+                self._error(f"cp: cannot copy '{src}' into itself")
+            elif os.path.exists(dst) and os.path.samefile(src, dst):
+                self._error(f"cp: '{src}' and '{dst}' are the same file")
             else:
-                shutil.copy2(src, dst)
-            print(f"Copied: {src} -> {dst}")
+                pairs.append((src, dst))
+        if not pairs:
+            return
+        try:
+            result = copying.copy(pairs, update=update, progress_stream=self._progress_stream())
         except Exception as e:
-            print(f"{self.COLORS['red']}Failed to copy: {e}{self.COLORS['reset']}")
+            self._error(f"Failed to copy: {e}")
+            return
+        for message in result.errors:
+            self._error(f"cp: {message}")
+        for src, dst in pairs:
+            print(f"Copied: {src} -> {dst}")
+        if result.files > 1 or result.skipped:
+            skipped = f", {result.skipped} up to date" if result.skipped else ""
+            print(f"{result.files} files, {self._human_size(result.bytes)}{skipped}")
+
+    def _count_operand(self, args: List[str], default: int) -> Tuple[List[str], int]:
+        """Split ``file... [n]`` into the files and the trailing line count."""
+        if len(args) > 1 and args[-1].isdigit():
+            return args[:-1], int(args[-1])
+        return args, default
+
+    def _file_header(self, filepath: str, first: bool) -> None:
+        """Print the ``==> file <==`` line head and tail put between files."""
+        if not first:
+            print()
+        print(f"==> {filepath} <==")
 
     def _head(self, args: List[str]):
-        """Show first N lines of a file."""
+        """Show first N lines of files (decompressed unless -z is given)."""
+        args, decompress_input = self._decompress_option(args)
+        args = self._with_piped_file(args)
         if not args:
-            print("Usage: head <file> [n]")
+            print("Usage: head [-z] <file>... [n]")
             return
         
-        filepath = args[0]
-        n = int(args[1]) if len(args) > 1 else 10
-        
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                for i, line in enumerate(f):
+        files, n = self._count_operand(args, 10)
+        for index, filepath in enumerate(files):
+            if len(files) > 1:
+                self._file_header(filepath, index == 0)
+            try:
+                # Stop pulling lines as soon as we have enough, so an upstream
+                # pipeline stage is not read any further than necessary.
+                for i, line in enumerate(self._input_lines(filepath, decompress_input)):
                     if i >= n:
                         break
                     print(line, end="")
-        except FileNotFoundError:
-            print(f"{self.COLORS['red']}No such file: {filepath}{self.COLORS['reset']}")
+            except FileNotFoundError:
+                self._error(f"No such file: {filepath}")
+            except BrokenPipeError:
+                raise
+            except OSError as e:
+                self._error(f"head: {filepath}: {e.strerror or e}")
 
     def _tail(self, args: List[str]):
-        """Show last N lines of a file."""
+        """Show last N lines of files, optionally following one with -f.
+        
+        A compressed file has to be decompressed from the start, so only its
+        last N lines are kept while it streams by; -z reads it raw.
+        """
+        follow = "-f" in args
+        args, decompress_input = self._decompress_option([a for a in args if a != "-f"])
+        args = self._with_piped_file(args)
         if not args:
-            print("Usage: tail <file> [n]")
+            print("Usage: tail [-f] [-z] <file>... [n]")
             return
         
-        filepath = args[0]
-        n = int(args[1]) if len(args) > 1 else 10
-        
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                for line in lines[-n:]:
-                    print(line, end="")
-        except FileNotFoundError:
-            print(f"{self.COLORS['red']}No such file: {filepath}{self.COLORS['reset']}")
+        files, n = self._count_operand(args, 10)
+        if follow and len(files) > 1:
+            self._error("tail: -f follows a single file")
+            return
+        for index, filepath in enumerate(files):
+            if len(files) > 1:
+                self._file_header(filepath, index == 0)
+            try:
+                self._tail_file(filepath, n, follow, decompress_input)
+            except FileNotFoundError:
+                self._error(f"No such file: {filepath}")
+            except BrokenPipeError:
+                raise
+            except OSError as e:
+                self._error(f"tail: {filepath}: {e.strerror or e}")
+
+    def _tail_file(self, filepath: str, n: int, follow: bool, decompress_input: bool):
+        if filepath == "-":
+            for line in deque(self._input_lines(filepath), maxlen=n):
+                print(line, end="")
+            return
+        with decompress.open_input(filepath, decompress_input) as f:
+            if decompress.is_compressed(f):
+                for line in deque(f, maxlen=n):
+                    sys.stdout.write(line.decode("utf-8", errors="replace"))
+                if follow:
+                    self._error(f"tail: {filepath}: cannot follow a compressed file")
+                return
+            sys.stdout.write(fileio.read_tail(f, n).decode("utf-8", errors="replace"))
+            offset = f.seek(0, os.SEEK_END)
+        if follow:
+            sys.stdout.flush()
+            fileio.follow(filepath, offset, self._write_flush, should_stop=jobs.stop_check())
+
+    def _write_flush(self, text: str) -> None:
+        """Write text to stdout and flush it straight away."""
+        sys.stdout.write(text)
+        sys.stdout.flush()
 
     def _grep(self, args: List[str]):
-        """Search for pattern in files."""
-        if len(args) < 2:
-            print("Usage: grep <pattern> <file> [file...]")
+        """Search for patterns in files (-E regex, -i, -r, -l, -c, -e pattern, -z raw)."""
+        args, decompress_input = self._decompress_option(args)
+        patterns: List[str] = []
+        flags = set()
+        operands: List[str] = []
+        it = iter(args)
+        for arg in it:
+            if arg == "-e":
+                patterns.append(next(it, ""))
+            elif arg.startswith("-") and len(arg) > 1:
+                flags.update(arg[1:])
+            else:
+                operands.append(arg)
+        
+        unknown = flags - set("Eirlcz")
+        if unknown:
+            self._error(f"grep: unknown option -{''.join(sorted(unknown))}")
+            return
+        decompress_input = decompress_input and "z" not in flags
+        if not patterns and operands:
+            patterns.append(operands.pop(0))
+        files = operands
+        if not files and streams.piped_stdin() is not None:
+            files = ["-"]
+        elif not files and "r" in flags:
+            files = ["."]
+        if not patterns or not files:
+            print("Usage: grep [-E] [-i] [-r] [-l|-c] [-z] <pattern>|-e <pattern>... <file> [file...]")
             return
         
-        pattern = args[0]
-        files = args[1:]
+        try:
+            matcher = search.compile_patterns(patterns, regex="E" in flags,
+                                              ignore_case="i" in flags)
+        except re.error as e:
+            self._error(f"grep: invalid pattern: {e}")
+            return
         
-        for filepath in files:
+        files = list(search.walk_files(files, recursive="r" in flags))
+        mode = search.LIST if "l" in flags else search.COUNT if "c" in flags else search.LINES
+        results = self._grep_results(files, matcher, mode, allow_binary=bool(flags & set("lc")),
+                                     decompress_input=decompress_input)
+        c = self._stdout_colors()
+        found = False
+        for filepath, result, error in results:
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    for i, line in enumerate(f, start=1):
-                        if pattern in line:
-                            print(f"{self.COLORS['green']}{filepath}{self.COLORS['reset']}:"
-                                  f"{self.COLORS['cyan']}{i}{self.COLORS['reset']}:"
-                                  f"{line.rstrip()}")
+                if error is not None:
+                    raise error
+                if mode == search.LIST:
+                    if result:
+                        found = True
+                        print(f"{c['green']}{filepath}{c['reset']}")
+                elif mode == search.COUNT:
+                    found = found or result > 0
+                    print(result if filepath == "-" else
+                          f"{c['green']}{filepath}{c['reset']}:{result}")
+                else:
+                    for i, line in result:
+                        found = True
+                        text = line.decode("utf-8", errors="replace")
+                        if filepath == "-":
+                            print(text)
+                        else:
+                            print(f"{c['green']}{filepath}{c['reset']}:"
+                                  f"{c['cyan']}{i}{c['reset']}:"
+                                  f"{text.rstrip()}")
+            except search.BinaryFile:
+                found = True
+                print(f"Binary file {filepath} matches")
             except FileNotFoundError:
-                print(f"{self.COLORS['red']}No such file: {filepath}{self.COLORS['reset']}")
+                self._error(f"No such file: {filepath}")
+            except IsADirectoryError:
+                print(f"{c['yellow']}{filepath}: is a directory (use -r){c['reset']}")
+            except BrokenPipeError:
+                raise
+            except OSError as e:
+                self._error(f"Failed to read {filepath}: {e}")
+        
+        # Like grep(1): 0 if a line matched, 1 if none did, 2 on errors
+        if self._builtin_state.failed:
+            return 2
+        return 0 if found else 1
+
+    def _stdout_colors(self) -> Dict[str, str]:
+        """COLORS when stdout is a terminal; for pipes and files, the same keys, empty."""
+        try:
+            tty = sys.stdout.isatty()
+        except (AttributeError, ValueError):
+            tty = False
+        return self.COLORS if tty else dict.fromkeys(self.COLORS, "")
+
+    def _grep_results(self, files: List[str], matcher, mode: str, allow_binary: bool,
+                      decompress_input: bool = True):
+        """Yield (path, result, error) per file, in the order given.
+        
+        The result is an iterator of matching lines, their count or whether
+        there are any, as for ``search.search_files``.  Piped input and the
+        lines of a single file are searched lazily on this thread; otherwise
+        files are fanned out across a worker pool.
+        """
+        if len(files) > 1 or mode != search.LINES and files[0] != "-":
+            yield from search.search_files(files, matcher, mode, allow_binary, decompress_input)
+            return
+        
+        filepath = files[0]
+        if filepath == "-":
+            lines = (line.rstrip("\n").encode("utf-8", errors="replace")
+                     for line in self._input_lines(filepath))
+            matches = ((i, line) for i, line in enumerate(lines, start=1) if matcher.search(line))
+        else:
+            matches = search.iter_file_matches(filepath, matcher, allow_binary, decompress_input)
+        if mode == search.LINES:
+            yield filepath, matches, None
+            return
+        result = error = None
+        try:
+            result = sum(1 for _ in matches) if mode == search.COUNT else any(True for _ in matches)
+        except (search.BinaryFile, OSError) as e:
+            error = e
+        yield filepath, result, error
 
     def _wc(self, args: List[str]):
-        """Count lines, words, and characters in files."""
-        if not args:
-            print("Usage: wc <file> [file...]")
+        """Count lines, words, characters (-m) and bytes (-c) in files.
+        
+        Compressed files are counted decompressed unless -z is given.
+        """
+        args, decompress_input = self._decompress_option(args)
+        flags = set("".join(a[1:] for a in args if a.startswith("-") and len(a) > 1))
+        files = [a for a in args if not a.startswith("-") or a == "-"]
+        decompress_input = decompress_input and "z" not in flags
+        flags.discard("z")
+        unknown = flags - set("lwmc")
+        if unknown:
+            self._error(f"wc: unknown option -{''.join(sorted(unknown))}")
+            return
+        if not files and streams.piped_stdin() is not None:
+            files = ["-"]
+        if not files:
+            print("Usage: wc [-l] [-w] [-m] [-c] [-z] <file> [file...]")
             return
         
-        for filepath in args:
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    lines = content.count('\n')
-                    words = len(content.split())
-                    chars = len(content)
-                    print(f"{lines:>8} {words:>8} {chars:>8} {filepath}")
-            except FileNotFoundError:
-                print(f"{self.COLORS['red']}No such file: {filepath}{self.COLORS['reset']}")
+        # Column order follows coreutils: lines, words, chars, bytes.
+        columns = [i for i, flag in enumerate("lwmc") if flag in flags] or [0, 1, 2]
+        totals = [0, 0, 0, 0]
+        
+        def show(counts, name):
+            row = " ".join(f"{counts[i]:>8}" for i in columns)
+            print(f"{row} {name}".rstrip())
+        
+        # Piped input is bound to this thread, so hand it to the workers explicitly.
+        stdin = streams.piped_stdin()
+        with futures.ThreadPoolExecutor(max_workers=min(8, len(files))) as pool:
+            counted = pool.map(lambda p: self._wc_count(p, stdin, decompress_input), files)
+            for filepath, counts, error in counted:
+                if isinstance(error, FileNotFoundError):
+                    self._error(f"No such file: {filepath}")
+                elif error is not None:
+                    self._error(f"Failed to read {filepath}: {error}")
+                else:
+                    totals = [t + c for t, c in zip(totals, counts)]
+                    show(counts, "" if filepath == "-" else filepath)
+        if len(files) > 1:
+            show(totals, "total")
+
+    def _wc_count(self, filepath: str, stdin=None, decompress_input: bool = True):
+        """Count one file for wc, returning (path, counts, error)."""
+        try:
+            if filepath == "-":
+                return filepath, fileio.count(stdin.buffer), None
+            with decompress.open_input(filepath, decompress_input) as f:
+                return filepath, fileio.count(f), None
+        except OSError as e:
+            return filepath, None, e
 
     def _find(self, args: List[str]):
-        """Find files by name pattern."""
+        """Find files by name pattern (substring or glob), or --regex on the path."""
+        use_index = "--index" in args
+        regex = "--regex" in args
+        args = [a for a in args if a not in ("--index", "--regex")]
         if not args:
-            print("Usage: find <pattern> [path]")
+            print("Usage: find [--index] [--regex] <pattern> [path]")
             return
         
         pattern = args[0]
         start_path = args[1] if len(args) > 1 else "."
         
         try:
-            for root, dirs, files in os.walk(start_path):
-                for name in files + dirs:
-                    if pattern in name:
-                        full_path = os.path.join(root, name)
-                        if os.path.isdir(full_path):
+            if use_index:
+                self._find_indexed(pattern, start_path, regex)
+                return
+            matcher = re.compile(pattern) if regex else None
+            for root, entries in self._dir_cache.walk(start_path):
+                jobs.check_cancelled()
+                for entry in entries:
+                    full_path = os.path.join(root, entry.name)
+                    if matcher.search(full_path) if matcher else pathindex.name_matches(entry.name, pattern):
+                        if entry.is_dir():
                             print(f"{self.COLORS['blue']}{full_path}/{self.COLORS['reset']}")
                         else:
                             print(full_path)
+        except re.error as e:
+            self._error(f"find: invalid pattern: {e}")
+        except BrokenPipeError:
+            raise
         except Exception as e:
-            print(f"{self.COLORS['red']}Error: {e}{self.COLORS['reset']}")
+            self._error(f"Error: {e}")
 
-    def _tree(self, args: List[str]):
-        """Display directory tree structure."""
+    def _find_indexed(self, pattern: str, start_path: str, regex: bool):
+        """Answer a find query from the filename index, building it if needed."""
+        index = pathindex.PathIndex.covering(start_path)
+        if index is None:
+            print(f"{self.COLORS['dim']}Building index for {start_path} "
+                  f"(refresh with updatedb)...{self.COLORS['reset']}")
+            index = pathindex.PathIndex(start_path)
+            index.refresh()
+        
+        start = os.path.abspath(start_path)
+        for rel in index.query(pattern, regex=regex, under=start, base=start_path):
+            full_path = os.path.join(start_path, os.path.relpath(os.path.join(index.root, rel), start))
+            if rel.endswith("/"):
+                print(f"{self.COLORS['blue']}{full_path}/{self.COLORS['reset']}")
+            else:
+                print(full_path)
+
+    def _updatedb(self, args: List[str]):
+        """Build or incrementally refresh the find index for a directory."""
         path = args[0] if args else "."
-        max_depth = int(args[1]) if len(args) > 1 else 3
+        if not os.path.isdir(path):
+            self._error(f"No such directory: {path}")
+            return
+        
+        index = pathindex.PathIndex(path)
+        total, rescanned = index.refresh()
+        print(f"Indexed {total} paths under {index.root} ({rescanned} directories rescanned)")
+
+    def _dupes(self, args: List[str]):
+        """Find files with identical contents (--link replaces copies with hard links)."""
+        link = "--link" in args
+        use_cache = "--no-cache" not in args
+        min_size = 1
+        paths: List[str] = []
+        it = iter(a for a in args if a not in ("--link", "--no-cache"))
+        for arg in it:
+            if arg == "--min-size" or arg.startswith("--min-size="):
+                value = arg.partition("=")[2] or next(it, "")
+                if not value.isdigit():
+                    print("Usage: dupes [--min-size BYTES] [--link] [--no-cache] [path]")
+                    return
+                min_size = max(1, int(value))
+            else:
+                paths.append(arg)
+        path = paths[0] if paths else "."
+        if not os.path.isdir(path):
+            self._error(f"No such directory: {path}")
+            return
+        
+        c = self.COLORS
+        cache = dupes.HashCache().load() if use_cache else None
+        report = dupes.find_duplicates(path, self._dir_cache, cache, min_size)
+        if cache is not None:
+            cache.save()
+        
+        for size, copies in report.groups:
+            print(f"{c['bold']}{len(copies)} x {self._human_size(size)}{c['reset']} "
+                  f"{c['dim']}({self._human_size(size * (len(copies) - 1))} reclaimable){c['reset']}")
+            for names in copies:
+                print(f"  {names[0]}")
+                for name in names[1:]:
+                    print(f"  {c['dim']}= {name}{c['reset']}")
+        for message in report.errors:
+            self._error(f"dupes: {message}")
+        
+        print(f"{len(report.groups)} duplicate groups in {report.files} files, "
+              f"{self._human_size(report.reclaimable)} reclaimable "
+              f"{c['dim']}({report.hashed_partial} partial and {report.hashed_full} full hashes, "
+              f"{report.cache_hits} cached){c['reset']}")
+        if link and report.groups:
+            linked, freed, errors = dupes.link_duplicates(report)
+            for message in errors:
+                self._error(f"dupes: {message}")
+            print(f"Linked {linked} paths, freed {self._human_size(freed)}")
+
+    def _tree(self, args: List[str]):
+        """Display the directory tree of each path (default .), N levels deep."""
+        paths, max_depth = self._count_operand(args, 3)
+        if not paths:
+            paths = ["."]
         
         def print_tree(directory, prefix="", depth=0):
             if depth > max_depth:
                 return
             
             try:
-                entries = sorted(os.listdir(directory))
-                entries = [e for e in entries if not e.startswith(".")]
+                entries = [e for e in self._dir_cache.listdir(directory) if not e.name.startswith(".")]
                 
                 for i, entry in enumerate(entries):
-                    full_path = os.path.join(directory, entry)
+                    full_path = os.path.join(directory, entry.name)
                     is_last = i == len(entries) - 1
                     connector = "└── " if is_last else "├── "
                     
-                    if os.path.isdir(full_path):
-                        print(f"{prefix}{connector}{self.COLORS['blue']}{entry}/{self.COLORS['reset']}")
+                    if entry.is_dir():
+                        print(f"{prefix}{connector}{self.COLORS['blue']}{entry.name}/{self.COLORS['reset']}")
                         extension = "    " if is_last else "│   "
                         print_tree(full_path, prefix + extension, depth + 1)
                     else:
-                        print(f"{prefix}{connector}{entry}")
+                        print(f"{prefix}{connector}{entry.name}")
             except PermissionError:
                 print(f"{prefix}[Permission Denied]")
         
-        print(f"{self.COLORS['blue']}{path}/{self.COLORS['reset']}")
-        print_tree(path)
+        for path in paths:
+            if not os.path.isdir(path):
+                self._error(f"tree: {path}: No such directory")
+                continue
+            print(f"{self.COLORS['blue']}{path}/{self.COLORS['reset']}")
+            print_tree(path)
 
     def _du(self, args: List[str]):
-        """Show disk usage of directories."""
-        path = args[0] if args else "."
+        """Show disk usage of each path (-d N breakdown, --sort by size)."""
+        depth = None
+        by_size = "--sort" in args
+        use_cache = "--cache" in args
+        paths: List[str] = []
+        it = iter(a for a in args if a not in ("--sort", "--cache"))
+        for arg in it:
+            if arg == "-d" or arg.startswith("-d"):
+                value = arg[2:] or next(it, "")
+                if not value.isdigit():
+                    print("Usage: du [-d N] [--sort] [--cache] [path...]")
+                    return
+                depth = int(value)
+            else:
+                paths.append(arg)
         
+        cache = diskusage.DiskUsageCache().load() if use_cache else None
         try:
-            total_size = 0
-            for dirpath, dirnames, filenames in os.walk(path):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    try:
-                        total_size += os.path.getsize(filepath)
-                    except:
-                        pass
-            
-            # Convert to human-readable format
-            for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-                if total_size < 1024.0:
-                    print(f"{total_size:.1f}{unit}\t{path}")
-                    break
-                total_size /= 1024.0
-        except Exception as e:
-            print(f"{self.COLORS['red']}Error: {e}{self.COLORS['reset']}")
+            for path in paths or ["."]:
+                try:
+                    self._du_path(path, depth, by_size, cache)
+                except FileNotFoundError:
+                    self._error(f"No such file or directory: {path}")
+                except BrokenPipeError:
+                    raise
+                except Exception as e:
+                    self._error(f"Error: {e}")
+        finally:
+            if cache is not None:
+                cache.save()
 
-    def _diff(self, args: List[str]):
-        """Compare two files line by line."""
-        if len(args) < 2:
-            print("Usage: diff <file1> <file2>")
+    def _du_path(self, path: str, depth: Optional[int], by_size: bool,
+                 cache: Optional["diskusage.DiskUsageCache"]):
+        """Print the total of one du operand, or its breakdown down to ``depth``."""
+        if not os.path.isdir(path):
+            print(f"{self._human_size(os.path.getsize(path))}\t{path}")
+            return
+        
+        totals = diskusage.directory_sizes(path, cache, listing=self._dir_cache,
+                                           should_stop=jobs.stop_check())
+        jobs.check_cancelled()
+        
+        root = os.path.abspath(path)
+        if depth is None:
+            print(f"{self._human_size(totals[root])}\t{path}")
             return
         
-        file1, file2 = args[0], args[1]
+        rows = []
+        for full, size in totals.items():
+            rel = os.path.relpath(full, root)
+            level = 0 if rel == "." else rel.count(os.sep) + 1
+            if level <= depth:
+                rows.append((size, path if rel == "." else os.path.join(path, rel)))
+        if by_size:
+            rows.sort(key=lambda row: row[0], reverse=True)
+        else:
+            # du order: every directory after its children, the root last
+            rows.sort(key=lambda row: row[1] + os.sep + "\U0010ffff")
+        for size, name in rows:
+            print(f"{self._human_size(size)}\t{name}")
+
+    def _human_size(self, size: float) -> str:
+        """Format a byte count the way du prints it (e.g. 12.0KB)."""
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if size < 1024.0:
+                return f"{size:.1f}{unit}"
+            size /= 1024.0
+        return f"{size:.1f}TB"
+
+    def _diff(self, args: List[str]):
+        """Compare files line by line (-u N context, --stat, -r for directories)."""
+        context = 3
+        stat_only = recursive = False
+        paths: List[str] = []
+        it = iter(args)
+        for arg in it:
+            if arg in ("-u", "-U") or (arg[:2] in ("-u", "-U") and arg[2:].isdigit()):
+                value = arg[2:]
+                if not value:
+                    value = next(it, "")
+                    if not value.isdigit():
+                        # Bare -u: unified is the only format, keep the default
+                        paths.extend([value] if value else [])
+                        continue
+                context = int(value)
+            elif arg == "--stat":
+                stat_only = True
+            elif arg in ("-r", "-R"):
+                recursive = True
+            else:
+                paths.append(arg)
+        if len(paths) != 2:
+            print("Usage: diff [-u N] [--stat] [-r] <file1> <file2>")
+            return 2
         
+        file1, file2 = paths
+        stats: List[tuple] = []
         try:
-            with open(file1, "r") as f1, open(file2, "r") as f2:
-                lines1 = f1.readlines()
-                lines2 = f2.readlines()
-            
-            diff = difflib.unified_diff(lines1, lines2, fromfile=file1, tofile=file2, lineterm='')
-            
-            for line in diff:
-                if line.startswith('+'):
-                    print(f"{self.COLORS['green']}{line}{self.COLORS['reset']}")
-                elif line.startswith('-'):
-                    print(f"{self.COLORS['red']}{line}{self.COLORS['reset']}")
-                elif line.startswith('@'):
-                    print(f"{self.COLORS['cyan']}{line}{self.COLORS['reset']}")
-                else:
-                    print(line)
+            if os.path.isdir(file1) and os.path.isdir(file2):
+                if not recursive:
+                    self._error(f"diff: {file1} and {file2} are directories (use -r)")
+                    return 2
+                status = 0
+                for kind, first, second in diffing.compare_trees(file1, file2):
+                    status = 1
+                    if kind == "only":
+                        print(f"Only in {first}: {second}")
+                    elif kind == "kind":
+                        what = ("a directory", "a regular file")
+                        if not os.path.isdir(first):
+                            what = what[::-1]
+                        print(f"File {first} is {what[0]} while file {second} is {what[1]}")
+                    else:
+                        if not stat_only:
+                            print(f"{self.COLORS['bold']}diff -r {first} {second}{self.COLORS['reset']}")
+                        self._diff_files(first, second, context, stat_only, stats)
+            else:
+                if os.path.isdir(file2):
+                    file2 = os.path.join(file2, os.path.basename(file1))
+                elif os.path.isdir(file1):
+                    file1 = os.path.join(file1, os.path.basename(file2))
+                status = self._diff_files(file1, file2, context, stat_only, stats)
         except FileNotFoundError as e:
-            print(f"{self.COLORS['red']}File not found: {e}{self.COLORS['reset']}")
+            self._error(f"File not found: {e.filename}")
+            return 2
+        except OSError as e:
+            self._error(f"diff: {e.filename}: {e.strerror}")
+            return 2
+        
+        if stat_only and stats:
+            self._print_diff_stat(stats)
+        return status
+
+    def _diff_files(self, file1: str, file2: str, context: int, stat_only: bool,
+                    stats: List[tuple]) -> int:
+        """Diff two files; print the hunks or add a (name, inserted, deleted) row to stats."""
+        lines1 = diffing.read_lines(file1)
+        lines2 = diffing.read_lines(file2)
+        if lines1 == lines2:
+            return 0
+        if diffing.is_binary(lines1) or diffing.is_binary(lines2):
+            print(f"Binary files {file1} and {file2} differ")
+            return 1
+        
+        ids1, ids2 = diffing.intern(lines1, lines2)
+        blocks = diffing.matching_blocks(ids1, ids2)
+        if stat_only:
+            inserted, deleted = diffing.count_changes(blocks, len(lines1), len(lines2))
+            stats.append((file1, inserted, deleted))
+            return 1
+        
+        print(f"{self.COLORS['red']}--- {file1}{self.COLORS['reset']}")
+        print(f"{self.COLORS['green']}+++ {file2}{self.COLORS['reset']}")
+        for line in diffing.unified(lines1, lines2, blocks, context):
+            if line.startswith('+'):
+                print(f"{self.COLORS['green']}{line}{self.COLORS['reset']}")
+            elif line.startswith('-'):
+                print(f"{self.COLORS['red']}{line}{self.COLORS['reset']}")
+            elif line.startswith('@'):
+                print(f"{self.COLORS['cyan']}{line}{self.COLORS['reset']}")
+            else:
+                print(line)
+        return 1
+
+    def _print_diff_stat(self, stats: List[tuple]):
+        """Print a git-style --stat summary of changed lines per file."""
+        width = max(len(name) for name, _, _ in stats)
+        most = max(inserted + deleted for _, inserted, deleted in stats)
+        scale = min(1.0, 50 / most) if most else 1.0
+        for name, inserted, deleted in stats:
+            plus = "+" * max(int(inserted * scale), 1 if inserted else 0)
+            minus = "-" * max(int(deleted * scale), 1 if deleted else 0)
+            print(f" {name:<{width}} | {inserted + deleted:>5} "
+                  f"{self.COLORS['green']}{plus}{self.COLORS['red']}{minus}{self.COLORS['reset']}")
+        files = len(stats)
+        inserted = sum(row[1] for row in stats)
+        deleted = sum(row[2] for row in stats)
+        print(f" {files} file{'s' if files != 1 else ''} changed, "
+              f"{inserted} insertion{'s' if inserted != 1 else ''}(+), "
+              f"{deleted} deletion{'s' if deleted != 1 else ''}(-)")
 
     def _sort(self, args: List[str]):
-        """Sort lines in a file."""
-        if not args:
-            print("Usage: sort <file>")
+        """Sort lines (-n numeric, -r reverse, -u unique, -k field[nr], -t separator)."""
+        flags = set()
+        files: List[str] = []
+        values: Dict[str, str] = {}
+        it = iter(args)
+        for arg in it:
+            if arg in ("-k", "-t", "-S"):
+                values[arg[1]] = next(it, "")
+            elif arg[:2] in ("-k", "-t", "-S") and len(arg) > 2:
+                values[arg[1]] = arg[2:]
+            elif arg.startswith("-") and len(arg) > 1:
+                flags.update(arg[1:])
+            else:
+                files.append(arg)
+        
+        unknown = flags - set("nru")
+        if unknown:
+            self._error(f"sort: unknown option -{''.join(sorted(unknown))}")
+            return
+        if not files and streams.piped_stdin() is not None:
+            files = ["-"]
+        if not files:
+            print("Usage: sort [-n] [-r] [-u] [-k N[,M][nr]] [-t sep] [-S size] <file>")
             return
         
-        filepath = args[0]
+        numeric, reverse = "n" in flags, "r" in flags
+        try:
+            start = end = None
+            if "k" in values:
+                m = re.fullmatch(r"(\d+)(?:\.\d+)?([nr]*)(?:,(\d+)(?:\.\d+)?([nr]*))?",
+                                 values["k"])
+                if m is None:
+                    raise ValueError(values["k"])
+                start = int(m.group(1))
+                end = int(m.group(3)) if m.group(3) else None
+                modifiers = m.group(2) + (m.group(4) or "")
+                if modifiers:
+                    # Like sort(1), a key with its own options ignores the global ones
+                    numeric, reverse = "n" in modifiers, "r" in modifiers
+            buffer_size = (sorting.parse_size(values["S"]) if "S" in values
+                           else sorting.DEFAULT_BUFFER_SIZE)
+        except ValueError:
+            self._error(f"sort: invalid -k or -S value")
+            return
+        
+        key = None
+        if numeric or start is not None:
+            key = sorting.SortKey(numeric=numeric, start_field=start, end_field=end,
+                                  separator=values.get("t") or None)
         
+        filepath = files[0]
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            
-            for line in sorted(lines):
-                print(line, end="")
-        except FileNotFoundError:
-            print(f"{self.COLORS['red']}No such file: {filepath}{self.COLORS['reset']}")
+            lines = (line.rstrip("\n") for f in files for line in self._input_lines(f))
+            for line in sorting.sort_lines(lines, key=key, reverse=reverse,
+                                           unique="u" in flags, buffer_size=buffer_size,
+                                           should_stop=jobs.stop_check()):
+                print(line)
+            jobs.check_cancelled()
+        except FileNotFoundError as e:
+            self._error(f"No such file: {e.filename or filepath}")
 
     def _env(self, args: List[str]):
         """Show or set environment variables."""
@@ -656,6 +1862,8 @@ class CommandHero:
             key, value = args[0].split("=", 1)
             os.environ[key] = value
             self._env_vars[key] = value
+            if key == "PATH":
+                self._path_hash.clear()
             print(f"Set: {key}={value}")
         else:
             # Show specific variable
@@ -664,35 +1872,254 @@ class CommandHero:
             if value:
                 print(f"{key}={value}")
             else:
-                print(f"{self.COLORS['red']}Variable not found: {key}{self.COLORS['reset']}")
+                self._error(f"Variable not found: {key}")
 
     def _which(self, args: List[str]):
-        """Locate a command."""
+        """Locate a command (-a lists every match)."""
+        show_all = "-a" in args
+        args = [a for a in args if a != "-a"]
         if not args:
-            print("Usage: which <command>")
+            print("Usage: which [-a] <command>")
             return
         
         cmd = args[0]
+        found = False
         
         # Check if it's a built-in command
         if cmd in self._commands:
             print(f"{cmd}: built-in command")
-            return
+            found = True
         
         # Check if it's an alias
-        if cmd in self._aliases:
+        if cmd in self._aliases and (show_all or not found):
             print(f"{cmd}: aliased to '{self._aliases[cmd]}'")
-            return
+            found = True
         
-        # Check PATH
-        path_dirs = os.environ.get("PATH", "").split(os.pathsep)
-        for directory in path_dirs:
-            full_path = os.path.join(directory, cmd)
-            if os.path.isfile(full_path) and os.access(full_path, os.X_OK):
+        # Check PATH through the command hash
+        if show_all or not found:
+            paths = self._path_hash.lookup_all(cmd)
+            for full_path in (paths if show_all else paths[:1]):
                 print(full_path)
+                found = True
+        
+        if not found:
+            self._error(f"{cmd} not found")
+
+    def _hash(self, args: List[str]):
+        """Show, add to or reset (-r) the table of remembered $PATH commands."""
+        if "-r" in args:
+            self._path_hash.clear()
+            return
+        
+        if args:
+            for cmd in args:
+                if self._path_hash.lookup(cmd) is None:
+                    self._error(f"hash: {cmd} not found")
+            return
+        
+        remembered = self._path_hash.remembered()
+        if not remembered:
+            print("hash: hash table empty")
+            return
+        print(f"{self.COLORS['bold']}hits    command{self.COLORS['reset']}")
+        for name, hits, path in remembered:
+            print(f"{hits:>4}    {path}")
+
+    def _job_arg(self, args: List[str], cmd: str) -> Optional["jobs.Job"]:
+        """Resolve the job named by ``args`` (default: the latest job)."""
+        spec = args[0] if args else None
+        job = self._jobs.get(spec)
+        if job is None:
+            self._error(f"{cmd}: {spec or 'current'}: no such job")
+        return job
+
+    def _jobs_cmd(self, args: List[str]):
+        """List background jobs (-l adds process ids)."""
+        for job in list(self._jobs.jobs.values()):
+            pids = f" {','.join(map(str, job.pgids))}" if "-l" in args and job.pgids else ""
+            print(f"[{job.id}]{pids}  {job.state:<10} {job.command}")
+            if job.done.is_set():
+                job.reported = True
+                if job.output.empty():
+                    self._jobs.remove(job)
+
+    def _fg(self, args: List[str]):
+        """Bring a job to the foreground: show its output and wait for it."""
+        job = self._job_arg(args, "fg")
+        if job is None:
+            return 1
+        print(job.command)
+        if job.stopped:
+            job.signal(signal.SIGCONT)
+        try:
+            job.follow(sys.stdout.write)
+        except KeyboardInterrupt:
+            # Ctrl+C cancels the job that is in the foreground, not the shell
+            job.signal(signal.SIGINT)
+            print()
+            return 130
+        self._jobs.remove(job)
+        return job.status
+
+    def _bg(self, args: List[str]):
+        """Resume a stopped job in the background."""
+        job = self._job_arg(args, "bg")
+        if job is None:
+            return 1
+        if job.done.is_set():
+            print(f"{self.COLORS['yellow']}bg: job {job.id} has already finished{self.COLORS['reset']}")
+            return 1
+        job.signal(signal.SIGCONT)
+        print(f"[{job.id}] {job.command} &")
+
+    def _kill(self, args: List[str]):
+        """Send a signal to jobs (%N) or process ids."""
+        sig = signal.SIGTERM
+        if args and args[0].startswith("-") and len(args[0]) > 1:
+            name = args.pop(0)[1:].upper()
+            try:
+                sig = int(name) if name.isdigit() else signal.Signals[
+                    name if name.startswith("SIG") else "SIG" + name]
+            except KeyError:
+                self._error(f"kill: unknown signal: {name}")
+                return 1
+        if not args:
+            print("Usage: kill [-SIGNAL] <%job|pid>...")
+            return 1
+
+        status = 0
+        for target in args:
+            if target.startswith("%"):
+                job = self._job_arg([target], "kill")
+                if job is None:
+                    status = 1
+                    continue
+                if not job.signal(sig):
+                    self._error(f"kill: {target}: job has no processes to stop or continue")
+                    status = 1
+            elif target.isdigit():
+                try:
+                    os.kill(int(target), sig)
+                except OSError as e:
+                    self._error(f"kill: {target}: {e.strerror}")
+                    status = 1
+            else:
+                self._error(f"kill: {target}: arguments must be %job or pid")
+                status = 1
+        return status
+
+    def _wait(self, args: List[str]):
+        """Wait for background jobs to finish (all, or the given %N)."""
+        if args:
+            targets = [self._job_arg([a], "wait") for a in args]
+        else:
+            targets = list(self._jobs.jobs.values())
+        status = 0
+        for job in targets:
+            if job is None:
+                status = 127
+                continue
+            job.done.wait()
+            status = job.status or 0
+        return status
+
+    def _time_pipeline(self, stages: List[List[str]],
+                       redirects: Optional[List[List[tuple]]] = None) -> int:
+        """Run a pipeline and report real, user and sys time and peak memory on stderr."""
+        with metrics.Stopwatch() as watch:
+            status = self._run_pipeline(stages, redirects)
+        sys.stdout.flush()
+        peak = "-" if watch.peak_rss_kb is None else f"{watch.peak_rss_kb / 1024:.1f}M"
+        print(f"\nreal  {watch.real:8.3f}s\nuser  {watch.user:8.3f}s\n"
+              f"sys   {watch.sys:8.3f}s\npeak  {peak:>9}", file=sys.stderr)
+        return status
+
+    def _time(self, args: List[str]):
+        """Time a command: real, user and sys time and peak memory."""
+        if not args:
+            print("Usage: time <command> [args...]")
+            return
+        return self._time_pipeline([args])
+
+    def _stats_cmd(self, args: List[str]):
+        """Show command latency statistics (-r resets, 'stats <cmd>' for a histogram)."""
+        if args and args[0] == "-r":
+            self._stats.clear()
+            print("Statistics cleared")
+            return
+        snapshot = self._stats.snapshot()
+        if args:
+            hist = snapshot.get(args[0])
+            if hist is None:
+                self._error(f"stats: no calls recorded for {args[0]}")
                 return
+            self._print_histogram(args[0], hist)
+            return
+        if not snapshot:
+            print("No commands recorded yet")
+            return
         
-        print(f"{self.COLORS['red']}{cmd} not found{self.COLORS['reset']}")
+        c = self.COLORS
+        fmt = metrics.format_duration
+        print(f"{c['bold']}{'command':<12} {'calls':>6} {'fail':>5} {'mean':>9} "
+              f"{'p50':>9} {'p99':>9} {'max':>9}{c['reset']}")
+        for name, hist in sorted(snapshot.items(), key=lambda item: -item[1].total):
+            print(f"{c['green']}{name:<12}{c['reset']} {hist.count:>6} {hist.failures:>5} "
+                  f"{fmt(hist.total / hist.count):>9} {fmt(hist.percentile(50)):>9} "
+                  f"{fmt(hist.percentile(99)):>9} {fmt(hist.max):>9}")
+
+    def _print_histogram(self, name: str, hist: "metrics.Histogram"):
+        """Print the latency buckets of one command as a bar chart."""
+        c = self.COLORS
+        fmt = metrics.format_duration
+        print(f"{c['bold']}{name}{c['reset']}: {hist.count} calls, {hist.failures} failed, "
+              f"mean {fmt(hist.total / hist.count)}, max {fmt(hist.max)}")
+        used = [i for i, n in enumerate(hist.buckets) if n]
+        widest = max(hist.buckets)
+        for i in range(used[0], used[-1] + 1):
+            low, high = metrics.Histogram.bucket_range(i)
+            n = hist.buckets[i]
+            bar = "█" * max(1 if n else 0, round(n / widest * 40))
+            print(f"  {fmt(low):>8} - {fmt(high):<8} {n:>6} {c['cyan']}{bar}{c['reset']}")
+
+    def _cache_cmd(self, args: List[str]):
+        """Show or clear the directory listing cache (cache stats | cache clear)."""
+        if args == ["clear"]:
+            self._dir_cache.clear()
+            print("Directory cache cleared")
+        elif args in ([], ["stats"]):
+            info = self._dir_cache.stats()
+            lookups = info["hits"] + info["misses"]
+            stats_total = info["stat_hits"] + info["stat_misses"]
+            rate = lambda hits, total: f"{hits / total * 100:.0f}%" if total else "-"
+            print(f"Directories: {info['directories']}")
+            print(f"Entries:     {info['entries']} / {info['max_entries']}")
+            print(f"Listings:    {info['hits']} hits, {info['misses']} misses "
+                  f"({rate(info['hits'], lookups)} hit rate), {info['evictions']} evicted")
+            print(f"Stats:       {info['stat_hits']} hits, {info['stat_misses']} misses "
+                  f"({rate(info['stat_hits'], stats_total)} hit rate)")
+        else:
+            print("Usage: cache [stats|clear]")
+
+    def _set(self, args: List[str]):
+        """Show or change shell options (set -o noglob, set +o noglob; -f/+f for short)."""
+        if not args or args == ["-o"]:
+            for name, value in sorted(self._options.items()):
+                print(f"{name:<12}{'on' if value else 'off'}")
+            return
+        it = iter(args)
+        for arg in it:
+            if arg in ("-o", "+o"):
+                name = next(it, "")
+                if name not in self._options:
+                    self._error(f"set: {name or '-o'}: invalid option name")
+                    return
+                self._options[name] = arg == "-o"
+            elif arg in ("-f", "+f"):
+                self._options["noglob"] = arg == "-f"
+            else:
+                print("Usage: set [-o|+o noglob] [-f|+f]")
+                return
 
     def _alias_cmd(self, args: List[str]):
         """Create or show command aliases."""
@@ -711,7 +2138,7 @@ class CommandHero:
             if name in self._aliases:
                 print(f"{name}='{self._aliases[name]}'")
             else:
-                print(f"{self.COLORS['red']}Alias not found: {name}{self.COLORS['reset']}")
+                self._error(f"Alias not found: {name}")
 
     def _unalias(self, args: List[str]):
         """Remove command aliases."""
@@ -724,9 +2151,17 @@ class CommandHero:
             del self._aliases[name]
             print(f"Removed alias: {name}")
         else:
-            print(f"{self.COLORS['red']}Alias not found: {name}{self.COLORS['reset']}")
+            self._error(f"Alias not found: {name}")
 
     def _exit(self, args: List[str]):
-        """Exit the CLI."""
+        """Exit the CLI, optionally with a status (exit [n])."""
         self._running = False
-        print(f"\n{self.COLORS['cyan']}Goodbye! 👋{self.COLORS['reset']}")
+        if self._interactive:
+            print(f"\n{self.COLORS['cyan']}Goodbye! 👋{self.COLORS['reset']}")
+        if args:
+            try:
+                return int(args[0]) & 0xFF
+            except ValueError:
+                self._error(f"exit: {args[0]}: numeric argument required")
+                return 2
+        return self._last_status
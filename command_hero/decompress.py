@@ -0,0 +1,219 @@
+"""Transparent decompression for the commands that read files.
+
+``open_input`` looks at the first bytes of a file, not its name, and hands
+back either the file itself or a stream of its decompressed contents:
+gzip, bzip2 and xz through the standard library, zstd when the
+``compression.zstd`` module (Python 3.14) or the ``zstandard`` package is
+available.  Data is decompressed a chunk at a time as it is read, so memory
+stays flat however large the archive is.
+
+``open_many`` serves a list of files in order while decompressing the next
+few compressed ones on background threads (zlib, bz2 and lzma release the
+GIL), each into a small bounded queue.
+"""
+import errno
+import io
+import queue
+import threading
+from collections import deque
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+# Chunk handed from a decompression thread to the reader.
+CHUNK_SIZE = 256 * 1024
+
+# Chunks buffered per file ahead of the reader, bounding read-ahead memory.
+QUEUE_CHUNKS = 8
+
+# Files opened ahead of the one being read by ``open_many``.
+READ_AHEAD = 4
+
+# Magic numbers, longest first.
+MAGIC = [
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"BZh", "bz2"),
+    (b"\x1f\x8b", "gzip"),
+]
+
+
+class CorruptArchive(OSError):
+    """Raised when compressed data is truncated or malformed."""
+
+    def __str__(self) -> str:
+        return self.strerror
+
+
+def detect(f: io.BufferedReader) -> Optional[str]:
+    """Compression format of a buffered binary file, judged by magic bytes."""
+    head = f.peek(6)[:6]
+    for magic, name in MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def _open_zstd(path: str) -> BinaryIO:
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.open(path, "rb")
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise OSError("zstd support is not installed (pip install zstandard)") from None
+    return zstandard.open(path, "rb")
+
+
+def _open_format(path: str, name: str) -> BinaryIO:
+    if name == "gzip":
+        import gzip
+        return gzip.open(path, "rb")
+    if name == "bz2":
+        import bz2
+        return bz2.open(path, "rb")
+    if name == "xz":
+        import lzma
+        return lzma.open(path, "rb")
+    return _open_zstd(path)
+
+
+class _Decompressed(io.RawIOBase):
+    """Raw stream over a decompressor that reports bad data as CorruptArchive."""
+
+    def __init__(self, source: BinaryIO, name: str):
+        self._source = source
+        self.format = name
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        try:
+            return self._source.readinto(buf)
+        except OSError:
+            raise
+        except Exception as e:  # EOFError, lzma.LZMAError, zlib.error, zstd errors
+            raise CorruptArchive(errno.EIO, f"corrupt {self.format} data ({e})") from None
+
+    def close(self) -> None:
+        if not self.closed:
+            self._source.close()
+        super().close()
+
+
+def open_input(path: str, decompress: bool = True) -> BinaryIO:
+    """Open ``path`` for binary reading, decompressing it if it is an archive.
+
+    A plain file comes back as the usual buffered file, so callers can still
+    ``fileno()``, ``seek`` or mmap it; check ``is_compressed`` first.
+    """
+    f = open(path, "rb")
+    try:
+        name = detect(f) if decompress else None
+    except BaseException:
+        f.close()
+        raise
+    if name is None:
+        return f
+    f.close()
+    return io.BufferedReader(_Decompressed(_open_format(path, name), name), CHUNK_SIZE)
+
+
+def is_compressed(f: BinaryIO) -> bool:
+    """True for the streams ``open_input`` returns for archives."""
+    return isinstance(getattr(f, "raw", None), _Decompressed)
+
+
+class _QueueReader(io.RawIOBase):
+    """Raw stream fed by a decompression thread through a bounded queue."""
+
+    _DONE = object()
+
+    def __init__(self, source: BinaryIO):
+        self._queue: "queue.Queue" = queue.Queue(QUEUE_CHUNKS)
+        self._pending = memoryview(b"")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._pump, args=(source,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _pump(self, source: BinaryIO) -> None:
+        try:
+            with source:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    if not self._put(chunk):
+                        return
+            self._put(self._DONE)
+        except BaseException as e:
+            self._put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        if not self._pending:
+            item = self._queue.get()
+            if item is self._DONE:
+                self._queue.put(item)  # Stay at EOF on later reads
+                return 0
+            if isinstance(item, BaseException):
+                self._queue.put(self._DONE)
+                raise item
+            self._pending = memoryview(item)
+        n = min(len(buf), len(self._pending))
+        buf[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+        super().close()
+
+
+def open_many(paths: List[str], decompress: bool = True, read_ahead: int = READ_AHEAD
+              ) -> Iterator[Tuple[str, Optional[BinaryIO], Optional[OSError]]]:
+    """Yield ``(path, file, error)`` for each path, in order.
+
+    Archives among the next ``read_ahead`` paths are already being
+    decompressed while the current file is read.  ``-`` comes back with no
+    file.  The caller closes each file; files still queued are closed if the
+    caller stops early.
+    """
+    ahead: "deque[Tuple[str, Optional[BinaryIO], Optional[OSError]]]" = deque()
+    it = iter(paths)
+
+    def start(path: str) -> None:
+        if path == "-":
+            ahead.append((path, None, None))  # Piped input is the caller's to read
+            return
+        try:
+            f = open_input(path, decompress)
+        except OSError as e:
+            ahead.append((path, None, e))
+            return
+        if is_compressed(f):
+            f = io.BufferedReader(_QueueReader(f), CHUNK_SIZE)
+        ahead.append((path, f, None))
+
+    try:
+        for path in it:
+            start(path)
+            if len(ahead) > read_ahead:
+                yield ahead.popleft()
+        while ahead:
+            yield ahead.popleft()
+    finally:
+        for _, f, _ in ahead:
+            if f is not None:
+                f.close()
@@ -0,0 +1,269 @@
+"""Deletion engine behind ``rm -r`` and ``rmdir -r``.
+
+Trees are removed the way ``shutil.rmtree`` walks them with descriptors:
+every directory is opened relative to its parent's descriptor with
+``O_NOFOLLOW`` (``os.open(name, dir_fd=parent_fd)``), its files are
+unlinked relative to its own descriptor, and once its subdirectories are
+gone it is removed with ``rmdir(name, dir_fd=parent_fd)``.  No path below
+a root is ever resolved by the kernel again, so a symlink inside the tree
+is removed itself and never followed, and a directory swapped for a
+symlink while the tree is being removed cannot redirect the deletion out
+of it.
+
+Directories are handed out to a few worker threads from a LIFO queue.
+Each open directory keeps its descriptor only while subdirectories below
+it are still pending, and the LIFO order finishes one branch before the
+next is started, so the number of open descriptors stays close to the
+depth of the tree times the number of workers.
+"""
+import errno
+import os
+import queue
+import stat
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+_OPEN_DIR = (os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+             | getattr(os, "O_CLOEXEC", 0))
+
+# Whether this platform can scandir a descriptor and unlink/rmdir relative to one.
+_FD_BASED = (os.scandir in os.supports_fd and os.unlink in os.supports_dir_fd
+             and os.rmdir in os.supports_dir_fd)
+
+
+class Removal:
+    """Counters for one deletion, updated from worker threads.
+
+    When given a terminal ``progress_stream`` the running totals are
+    redrawn there in place at most ten times a second.
+    """
+
+    def __init__(self, dry_run: bool = False, progress_stream: Optional[TextIO] = None):
+        self.dry_run = dry_run
+        self.files = 0
+        self.dirs = 0
+        self.bytes = 0
+        self.errors: List[str] = []
+        self._stream = progress_stream
+        self._drawn = time.monotonic()
+        self._visible = False
+        self._lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def removed_file(self, size: int = 0) -> None:
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+            self._tick()
+
+    def removed_dir(self) -> None:
+        with self._lock:
+            self.dirs += 1
+            self._tick()
+
+    def failed(self, path: str, error: OSError) -> None:
+        with self._lock:
+            self.errors.append(f"{path}: {error.strerror or error}")
+
+    def _tick(self) -> None:
+        if self._stream is None:
+            return
+        now = time.monotonic()
+        if now - self._drawn < 0.1:
+            return
+        self._drawn = now
+        self._visible = True
+        verb = "counting" if self.dry_run else "removing"
+        self._stream.write(f"\r{verb}: {self.files} files, {self.dirs} directories")
+        self._stream.flush()
+
+    def finish(self) -> None:
+        with self._lock:
+            if self._visible:
+                self._stream.write("\r\033[K")
+                self._stream.flush()
+
+
+class _Dir:
+    """An open directory whose subdirectories are still being removed."""
+
+    __slots__ = ("fd", "path", "name", "parent", "pending")
+
+    def __init__(self, fd: Optional[int], path: str, name: str, parent: Optional["_Dir"]):
+        self.fd = fd
+        self.path = path
+        self.name = name  # Relative to the parent's descriptor
+        self.parent = parent
+        self.pending = 0
+
+
+def _clear_dir(fd: Optional[int], path: str, result: Removal) -> List[str]:
+    """Remove (or count) every non-directory in a directory; return its subdirectory names."""
+    subdirs: List[str] = []
+    try:
+        with os.scandir(fd if fd is not None else path) as it:
+            for entry in it:
+                if result.stopped.is_set():
+                    break
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif result.dry_run:
+                        result.removed_file(entry.stat(follow_symlinks=False).st_size)
+                    else:
+                        if fd is not None:
+                            os.unlink(entry.name, dir_fd=fd)
+                        else:
+                            os.unlink(os.path.join(path, entry.name))
+                        result.removed_file()
+                except OSError as e:
+                    result.failed(os.path.join(path, entry.name), e)
+    except OSError as e:
+        result.failed(path, e)
+    return subdirs
+
+
+class _TreeRemover:
+    """Removes whole trees with a pool of threads sharing a LIFO work queue."""
+
+    def __init__(self, result: Removal, workers: int):
+        self.result = result
+        self.workers = workers
+        self._queue: "queue.LifoQueue" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open: Dict[int, _Dir] = {}  # id -> directory holding a descriptor
+        self._remaining = 0
+        self._done = threading.Event()
+
+    def run(self, roots: List[str]) -> None:
+        self._remaining = len(roots)
+        if not roots:
+            return
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        try:
+            for root in roots:
+                self._queue.put((None, root, root))
+            # Wait in short steps so that Ctrl+C reaches the main thread
+            while not self._done.wait(0.1):
+                pass
+        except BaseException:
+            self.result.stopped.set()
+            raise
+        finally:
+            self._done.set()
+            for _ in threads:
+                self._queue.put(None)
+            for t in threads:
+                t.join()
+            for node in self._open.values():
+                if node.fd is not None:
+                    os.close(node.fd)
+
+    def _work(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            if self.result.stopped.is_set():
+                continue
+            try:
+                self._enter(*task)
+            except BaseException as e:  # Never leave run() waiting forever
+                self.result.failed(task[2], e if isinstance(e, OSError) else OSError(str(e)))
+                self.result.stopped.set()
+                self._done.set()
+
+    def _enter(self, parent: Optional[_Dir], name: str, path: str) -> None:
+        """Open one directory below ``parent``, clear its files and queue its subdirectories."""
+        result = self.result
+        try:
+            if not _FD_BASED:
+                fd = None
+            elif parent is None:
+                fd = os.open(path, _OPEN_DIR)
+            else:
+                fd = os.open(name, _OPEN_DIR, dir_fd=parent.fd)
+        except OSError as e:
+            result.failed(path, e)
+            self._child_done(parent)
+            return
+        node = _Dir(fd, path, name, parent)
+        with self._lock:
+            self._open[id(node)] = node
+        subdirs = _clear_dir(fd, path, result)
+        if not subdirs or result.stopped.is_set():
+            self._leave(node)
+            return
+        node.pending = len(subdirs)
+        for sub in subdirs:
+            self._queue.put((node, sub, os.path.join(path, sub)))
+
+    def _leave(self, node: _Dir) -> None:
+        """Close a finished directory and remove it, then finish any parents it completes."""
+        while node is not None:
+            with self._lock:
+                del self._open[id(node)]
+            if node.fd is not None:
+                os.close(node.fd)
+            self._rmdir(node)
+            node = self._child_done(node.parent, leave=False)
+
+    def _child_done(self, parent: Optional[_Dir], leave: bool = True) -> Optional[_Dir]:
+        """Count one finished subdirectory of ``parent``; return it if that was the last."""
+        with self._lock:
+            if parent is None:
+                self._remaining -= 1
+                if self._remaining == 0:
+                    self._done.set()
+                return None
+            parent.pending -= 1
+            if parent.pending:
+                return None
+        if leave:
+            self._leave(parent)
+            return None
+        return parent
+
+    def _rmdir(self, node: _Dir) -> None:
+        result = self.result
+        if result.stopped.is_set():
+            return
+        if result.dry_run:
+            result.removed_dir()
+            return
+        try:
+            if node.parent is None or node.parent.fd is None:
+                os.rmdir(node.path)
+            else:
+                os.rmdir(node.name, dir_fd=node.parent.fd)
+            result.removed_dir()
+        except OSError as e:
+            if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                result.failed(node.path, e)
+            # Not empty: something inside failed and was reported already
+
+
+def remove(paths: List[str], dry_run: bool = False, progress_stream: Optional[TextIO] = None,
+           workers: Optional[int] = None) -> Removal:
+    """Remove files and whole directory trees, or only count them with ``dry_run``."""
+    result = Removal(dry_run, progress_stream)
+    roots: List[str] = []
+    try:
+        for path in paths:
+            try:
+                st = os.lstat(path)
+                if stat.S_ISDIR(st.st_mode):
+                    roots.append(path)
+                    continue
+                if not dry_run:
+                    os.unlink(path)
+                result.removed_file(st.st_size if dry_run else 0)
+            except OSError as e:
+                result.failed(path, e)
+        _TreeRemover(result, workers or min(16, (os.cpu_count() or 1) * 4)).run(roots)
+    finally:
+        result.finish()
+    return result
@@ -0,0 +1,371 @@
+"""Line diff engine behind the ``diff`` built-in.
+
+Files are read as bytes and every distinct line is interned to a small
+integer, so comparisons are integer compares and each distinct line is kept
+once.  Common prefixes and suffixes are trimmed with slice compares before
+any real work.  Large regions are then split at the longest in-order chain
+of lines that occur exactly once on each side (as in patience diff), which
+is near-linear and leaves small gaps on typical edits.  Those are split
+recursively at histogram anchors: the common line that occurs least often
+in the old side, grown into the longest run of matching lines around it
+(as in git's histogram diff).  Regions with no usable anchor fall back to
+Myers' O(ND) algorithm.
+
+Both algorithms are capped: Myers gives up past ``MAX_COST`` edits and the
+histogram splitting gives up after touching ``BUDGET_FACTOR`` times the
+input.  Whatever is left is reported as replaced lines, so a huge or very
+different input costs bounded time and produces a correct, if not minimal,
+diff.
+"""
+import bisect
+import os
+import stat
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Runs of matching lines: a[i:i + n] == b[j:j + n]
+Block = Tuple[int, int, int]
+
+# Edits Myers may spend on one region before it is reported as replaced.
+MAX_COST = 1000
+
+# Histogram anchors seen more often than this are too common to split on.
+MAX_CHAIN = 64
+
+# Lines the splitting may visit, as a multiple of the input size.
+BUDGET_FACTOR = 32
+
+# Regions at least this long are first split at lines unique to both sides.
+UNIQUE_SPLIT_MIN = 256
+
+# A NUL byte in the first block marks a file as binary, as in GNU diff.
+BINARY_SNIFF = 8192
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def read_lines(path: str) -> List[bytes]:
+    """Lines of a file as bytes, each with its line ending."""
+    with open(path, "rb") as f:
+        return f.read().splitlines(keepends=True)
+
+
+def is_binary(lines: List[bytes]) -> bool:
+    head = b"".join(lines[:64])[:BINARY_SNIFF]
+    return b"\0" in head
+
+
+def intern(a: List[bytes], b: List[bytes]) -> Tuple[List[int], List[int]]:
+    """Replace each line by an integer shared by all equal lines."""
+    ids: Dict[bytes, int] = {}
+    return ([ids.setdefault(line, len(ids)) for line in a],
+            [ids.setdefault(line, len(ids)) for line in b])
+
+
+def _common_prefix(a: List[int], alo: int, ahi: int, b: List[int], blo: int, bhi: int) -> int:
+    """Length of the common prefix, found with galloping slice compares."""
+    limit = min(ahi - alo, bhi - blo)
+    n, step = 0, 1
+    while n < limit:
+        step = min(step, limit - n)
+        if a[alo + n:alo + n + step] == b[blo + n:blo + n + step]:
+            n += step
+            step *= 2
+        elif step == 1:
+            break
+        else:
+            step = 1
+    return n
+
+
+def _common_suffix(a: List[int], alo: int, ahi: int, b: List[int], blo: int, bhi: int) -> int:
+    limit = min(ahi - alo, bhi - blo)
+    n, step = 0, 1
+    while n < limit:
+        step = min(step, limit - n)
+        if a[ahi - n - step:ahi - n] == b[bhi - n - step:bhi - n]:
+            n += step
+            step *= 2
+        elif step == 1:
+            break
+        else:
+            step = 1
+    return n
+
+
+def _unique_anchors(a: List[int], alo: int, ahi: int,
+                    b: List[int], blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """Lines occurring once on each side, longest in-order chain (as in patience diff)."""
+    count_a = Counter(a[alo:ahi])
+    count_b = Counter(b[blo:bhi])
+    where = {line: i for i, line in enumerate(a[alo:ahi], alo) if count_a[line] == 1}
+    pairs = [(where[line], j) for j, line in enumerate(b[blo:bhi], blo)
+             if line in where and count_b[line] == 1]
+
+    # Longest increasing run of a-positions, by patience sorting
+    tails: List[int] = []
+    tail_pairs: List[int] = []
+    previous = [-1] * len(pairs)
+    for k, (i, _) in enumerate(pairs):
+        # Mostly unchanged files keep their order, so try the end first
+        pos = len(tails) if not tails or i > tails[-1] else bisect.bisect_left(tails, i)
+        if pos == len(tails):
+            tails.append(i)
+            tail_pairs.append(k)
+        else:
+            tails[pos] = i
+            tail_pairs[pos] = k
+        previous[k] = tail_pairs[pos - 1] if pos else -1
+    chain = []
+    k = tail_pairs[-1] if tail_pairs else -1
+    while k >= 0:
+        chain.append(pairs[k])
+        k = previous[k]
+    chain.reverse()
+    return chain
+
+
+def _anchor(a: List[int], alo: int, ahi: int,
+            b: List[int], blo: int, bhi: int) -> Optional[Block]:
+    """The histogram anchor of a region: the rarest common line, grown into a run."""
+    occurrences: Dict[int, List[int]] = {}
+    for i in range(alo, ahi):
+        occurrences.setdefault(a[i], []).append(i)
+
+    best: Optional[Block] = None
+    best_count = MAX_CHAIN + 1
+    j = blo
+    while j < bhi:
+        positions = occurrences.get(b[j])
+        next_j = j + 1
+        if positions is not None and len(positions) <= best_count:
+            for i in positions:
+                si, sj = i, j
+                while si > alo and sj > blo and a[si - 1] == b[sj - 1]:
+                    si -= 1
+                    sj -= 1
+                ei, ej = i + 1, j + 1
+                while ei < ahi and ej < bhi and a[ei] == b[ej]:
+                    ei += 1
+                    ej += 1
+                if len(positions) < best_count or (best is not None and ei - si > best[2]):
+                    best, best_count = (si, sj, ei - si), len(positions)
+                next_j = max(next_j, ej)
+        j = next_j
+    return best
+
+
+def _myers(a: List[int], alo: int, ahi: int, b: List[int], blo: int, bhi: int,
+           max_cost: int) -> Optional[List[Block]]:
+    """Matching runs of a shortest edit script, or None if it needs more than ``max_cost`` edits."""
+    n, m = ahi - alo, bhi - blo
+    max_d = min(n + m, max_cost)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    # trace[d] holds v[-d-1 .. d+1] as it was before step d
+    trace: List[List[int]] = []
+    for d in range(max_d + 1):
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, d, n, m, alo, blo)
+    return None
+
+
+def _backtrack(trace: List[List[int]], d: int, x: int, y: int, alo: int, blo: int) -> List[Block]:
+    blocks: List[Block] = []
+    for step in range(d, 0, -1):
+        before = trace[step]
+        k = x - y
+        if k == -step or (k != step and before[k - 1 + step + 1] < before[k + 1 + step + 1]):
+            prev_k = k + 1
+            mid_x = before[prev_k + step + 1]
+        else:
+            prev_k = k - 1
+            mid_x = before[prev_k + step + 1] + 1
+        if x > mid_x:
+            blocks.append((alo + mid_x, blo + mid_x - k, x - mid_x))
+        x = before[prev_k + step + 1]
+        y = x - prev_k
+    if x > 0:
+        blocks.append((alo, blo, x))
+    return blocks
+
+
+def matching_blocks(a: List[int], b: List[int], max_cost: int = MAX_COST) -> List[Block]:
+    """Sorted runs ``(i, j, n)`` of lines common to ``a`` and ``b``, in order."""
+    blocks: List[Block] = []
+    budget = BUDGET_FACTOR * (len(a) + len(b)) + 10000
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        n = _common_prefix(a, alo, ahi, b, blo, bhi)
+        if n:
+            blocks.append((alo, blo, n))
+            alo, blo = alo + n, blo + n
+        n = _common_suffix(a, alo, ahi, b, blo, bhi)
+        if n:
+            blocks.append((ahi - n, bhi - n, n))
+            ahi, bhi = ahi - n, bhi - n
+        if alo == ahi or blo == bhi:
+            continue
+        budget -= (ahi - alo) + (bhi - blo)
+        if budget < 0:
+            continue  # Out of budget: report the rest of this region as replaced
+
+        unique = []
+        if (ahi - alo) + (bhi - blo) >= UNIQUE_SPLIT_MIN:
+            unique = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if unique:
+            run = None
+            for i, j in unique:
+                if i == alo and j == blo and run is not None:
+                    run[2] += 1
+                else:
+                    if run is not None:
+                        blocks.append(tuple(run))
+                    if i > alo or j > blo:
+                        stack.append((alo, i, blo, j))
+                    run = [i, j, 1]
+                alo, blo = i + 1, j + 1
+            blocks.append(tuple(run))
+            stack.append((alo, ahi, blo, bhi))
+            continue
+
+        anchor = _anchor(a, alo, ahi, b, blo, bhi)
+        if anchor is not None:
+            i, j, n = anchor
+            blocks.append(anchor)
+            stack.append((alo, i, blo, j))
+            stack.append((i + n, ahi, j + n, bhi))
+        elif not set(a[alo:ahi]).isdisjoint(b[blo:bhi]):
+            # Only very common lines are shared; nothing shared means a plain replace
+            blocks.extend(_myers(a, alo, ahi, b, blo, bhi, max_cost) or [])
+    blocks.sort()
+
+    # Join adjacent runs, e.g. consecutive unique lines
+    merged: List[Block] = []
+    for i, j, n in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + n)
+        else:
+            merged.append((i, j, n))
+    return merged
+
+
+def changes(blocks: List[Block], len_a: int, len_b: int) -> List[Tuple[int, int, int, int]]:
+    """The gaps between matching runs as ``(alo, ahi, blo, bhi)`` changed ranges."""
+    result = []
+    i = j = 0
+    for bi, bj, n in blocks + [(len_a, len_b, 0)]:
+        if bi > i or bj > j:
+            result.append((i, bi, j, bj))
+        i, j = bi + n, bj + n
+    return result
+
+
+def count_changes(blocks: List[Block], len_a: int, len_b: int) -> Tuple[int, int]:
+    """Number of inserted and deleted lines."""
+    common = sum(n for _, _, n in blocks)
+    return len_b - common, len_a - common
+
+
+def _range(start: int, stop: int) -> str:
+    """A hunk range the way unified diffs write it."""
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start if not length else start + 1},{length}"
+
+
+def _lines(prefix: str, lines: List[bytes]) -> Iterator[str]:
+    for line in lines:
+        yield prefix + line.rstrip(b"\r\n").decode("utf-8", "replace")
+        if not line.endswith(b"\n"):
+            yield "\\ No newline at end of file"
+
+
+def unified(a: List[bytes], b: List[bytes], blocks: List[Block],
+            context: int = 3) -> Iterator[str]:
+    """Hunks of a unified diff (without the ---/+++ header)."""
+    hunks: List[List[Tuple[int, int, int, int]]] = []
+    for change in changes(blocks, len(a), len(b)):
+        if hunks and change[0] - hunks[-1][-1][1] <= 2 * context:
+            hunks[-1].append(change)
+        else:
+            hunks.append([change])
+
+    for hunk in hunks:
+        a_start = max(hunk[0][0] - context, 0)
+        b_start = max(hunk[0][2] - context, 0)
+        a_stop = min(hunk[-1][1] + context, len(a))
+        b_stop = min(hunk[-1][3] + context, len(b))
+        yield f"@@ -{_range(a_start, a_stop)} +{_range(b_start, b_stop)} @@"
+        i = a_start
+        for alo, ahi, blo, bhi in hunk:
+            yield from _lines(" ", a[i:alo])
+            yield from _lines("-", a[alo:ahi])
+            yield from _lines("+", b[blo:bhi])
+            i = ahi
+        yield from _lines(" ", a[i:a_stop])
+
+
+def same_file(path1: str, path2: str, st1: os.stat_result, st2: os.stat_result) -> bool:
+    """Whether two files have the same contents.
+
+    A size mismatch settles it without reading; equal sizes and mtimes prove
+    nothing (a same-second edit, ``cp -p``), so the bytes are compared
+    unless both names are the same file.
+    """
+    if st1.st_size != st2.st_size:
+        return False
+    if (st1.st_dev, st1.st_ino) == (st2.st_dev, st2.st_ino):
+        return True
+    with open(path1, "rb") as f1, open(path2, "rb") as f2:
+        while True:
+            chunk = f1.read(CHUNK_SIZE)
+            if chunk != f2.read(CHUNK_SIZE):
+                return False
+            if not chunk:
+                return True
+
+
+def _listing(path: str) -> Dict[str, os.DirEntry]:
+    with os.scandir(path) as it:
+        return {entry.name: entry for entry in it}
+
+
+def compare_trees(dir1: str, dir2: str) -> Iterator[Tuple[str, str, str]]:
+    """Walk two trees and yield what differs, in sorted order.
+
+    Events are ``("only", dir, name)`` for an entry on one side only,
+    ``("kind", path1, path2)`` for a file facing a directory, and
+    ``("differ", path1, path2)`` for files whose contents differ.
+    """
+    stack = [(dir1, dir2)]
+    while stack:
+        left, right = stack.pop()
+        entries1, entries2 = _listing(left), _listing(right)
+        subdirs = []
+        for name in sorted(set(entries1) | set(entries2)):
+            e1, e2 = entries1.get(name), entries2.get(name)
+            if e1 is None or e2 is None:
+                yield ("only", left if e2 is None else right, name)
+                continue
+            st1, st2 = e1.stat(), e2.stat()
+            if stat.S_ISDIR(st1.st_mode) and stat.S_ISDIR(st2.st_mode):
+                subdirs.append((e1.path, e2.path))
+            elif stat.S_ISDIR(st1.st_mode) or stat.S_ISDIR(st2.st_mode):
+                yield ("kind", e1.path, e2.path)
+            elif not same_file(e1.path, e2.path, st1, st2):
+                yield ("differ", e1.path, e2.path)
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,167 @@
+"""Shared directory listing cache for ``ls``, ``tree``, ``find``, ``du`` and completion.
+
+Each directory is read once with ``os.scandir`` and kept, sorted by name,
+until its mtime changes; adding, removing or renaming an entry always bumps
+the directory's mtime, so a listing is revalidated with a single ``stat`` of
+the directory instead of a rescan.  A listing read within a second of its
+directory's last change is not trusted on the next lookup, because a change
+in the same timestamp tick would go unnoticed (the "racy git" problem).
+
+Stat results of the entries are kept for ``stat_ttl`` seconds, like the
+attribute cache of an NFS client: a file rewritten in place does not touch
+its directory's mtime, so its size and times are refetched once they are
+older than that.  Memory is bounded by the total number of entries held;
+the least recently used directories are dropped first.
+"""
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Total entries kept across all cached directories.
+MAX_ENTRIES = 100_000
+
+# Seconds an entry's stat result is reused before it is fetched again.
+STAT_TTL = 2.0
+
+# Listings this close to their directory's mtime are rescanned next time.
+RACY_WINDOW_NS = 1_000_000_000
+
+
+class CachedEntry:
+    """A directory entry whose type is fixed and whose stat result expires.
+
+    Offers the parts of ``os.DirEntry`` the built-ins use.  ``path`` is
+    absolute, because one listing serves every spelling of its directory.
+    """
+
+    __slots__ = ("name", "_entry", "_cache", "_stat", "_stat_time", "_lstat", "_lstat_time")
+
+    def __init__(self, entry: os.DirEntry, cache: "DirCache"):
+        self.name = entry.name
+        self._entry = entry
+        self._cache = cache
+        self._stat: Optional[os.stat_result] = None
+        self._lstat: Optional[os.stat_result] = None
+        self._stat_time = self._lstat_time = 0.0
+
+    @property
+    def path(self) -> str:
+        return self._entry.path
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        try:
+            return self._entry.is_dir(follow_symlinks=follow_symlinks)
+        except OSError:
+            return False
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        try:
+            return self._entry.is_file(follow_symlinks=follow_symlinks)
+        except OSError:
+            return False
+
+    def is_symlink(self) -> bool:
+        return self._entry.is_symlink()
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        follow = follow_symlinks and self._entry.is_symlink()
+        cached, fetched = (self._stat, self._stat_time) if follow else (self._lstat, self._lstat_time)
+        now = time.monotonic()
+        if cached is not None and now - fetched < self._cache.stat_ttl:
+            self._cache.stat_hits += 1
+            return cached
+        self._cache.stat_misses += 1
+        if cached is None:
+            st = self._entry.stat(follow_symlinks=follow)  # One stat, shared with DirEntry
+        else:
+            st = os.stat(self._entry.path, follow_symlinks=follow)
+        if follow:
+            self._stat, self._stat_time = st, now
+        else:
+            self._lstat, self._lstat_time = st, now
+        return st
+
+
+class DirCache:
+    """LRU cache of sorted directory listings, validated by directory mtime."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, stat_ttl: float = STAT_TTL):
+        self.max_entries = max_entries
+        self.stat_ttl = stat_ttl
+        # abs path -> (mtime_ns, trusted, entries)
+        self._dirs: "OrderedDict[str, Tuple[int, bool, List[CachedEntry]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.stat_hits = self.stat_misses = 0
+
+    def listdir(self, path: str) -> List[CachedEntry]:
+        """Entries of ``path`` sorted by name; raises OSError like ``os.scandir``."""
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        if not stat.S_ISDIR(st.st_mode):
+            raise NotADirectoryError(20, "Not a directory", path)
+        with self._lock:
+            cached = self._dirs.get(key)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1]:
+                self._dirs.move_to_end(key)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+
+        with os.scandir(key) as it:
+            entries = [CachedEntry(entry, self) for entry in it]
+        entries.sort(key=lambda entry: entry.name)
+        trusted = time.time_ns() - st.st_mtime_ns > RACY_WINDOW_NS
+
+        with self._lock:
+            old = self._dirs.pop(key, None)
+            if old is not None:
+                self._size -= len(old[2])
+            self._dirs[key] = (st.st_mtime_ns, trusted, entries)
+            self._size += len(entries)
+            while self._size > self.max_entries and len(self._dirs) > 1:
+                _, (_, _, dropped) = self._dirs.popitem(last=False)
+                self._size -= len(dropped)
+                self.evictions += 1
+        return entries
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[CachedEntry]]]:
+        """Yield ``(directory, entries)`` top-down, without following symlinks.
+
+        ``directory`` keeps the spelling of ``top``; unreadable directories
+        are skipped like ``os.walk`` does.
+        """
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = self.listdir(directory)
+            except OSError:
+                continue
+            yield directory, entries
+            stack.extend(os.path.join(directory, entry.name) for entry in reversed(entries)
+                         if entry.is_dir(follow_symlinks=False))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dirs.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+            self.stat_hits = self.stat_misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "directories": len(self._dirs),
+                "entries": self._size,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stat_hits": self.stat_hits,
+                "stat_misses": self.stat_misses,
+            }
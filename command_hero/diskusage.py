@@ -0,0 +1,169 @@
+"""Parallel directory size scanner behind the ``du`` built-in.
+
+Each directory is read once with ``os.scandir``; the sizes of the files it
+holds directly are summed from ``DirEntry.stat()`` and its subdirectories
+are queued for the next level, which is fanned out across a thread pool.
+
+With ``du --cache`` per-directory results are cached on disk keyed by path
+and directory mtime.  A directory's mtime changes whenever entries are
+added, removed or renamed, so on a mostly unchanged tree only the changed
+directories are rescanned.  Files that grow or shrink in place do not bump
+their directory's mtime, which is why the cache is opt-in: without it every
+file is stat'ed on every run.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+CACHE_FILE = "~/.hero_du_cache"
+
+# Each entry: [directory mtime_ns, bytes of files directly inside, subdir names]
+DirInfo = list
+
+
+class DiskUsageCache:
+    """On-disk cache of per-directory scan results."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = os.path.expanduser(path)
+        self.entries: Dict[str, DirInfo] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def load(self) -> "DiskUsageCache":
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            pass  # A cache that can't be written is just a slower du
+
+    def lookup(self, path: str, mtime_ns: int) -> Optional[DirInfo]:
+        with self._lock:
+            info = self.entries.get(path)
+            if info is not None and info[0] == mtime_ns:
+                self.hits += 1
+                return info
+            self.misses += 1
+        return None
+
+    def store(self, path: str, info: DirInfo) -> None:
+        with self._lock:
+            self.entries[path] = info
+            self._dirty = True
+
+    def prune(self, root: str, seen) -> None:
+        """Forget cached directories under ``root`` that no longer exist."""
+        prefix = root.rstrip(os.sep) + os.sep
+        with self._lock:
+            stale = [p for p in self.entries
+                     if p.startswith(prefix) and p not in seen]
+            for p in stale:
+                del self.entries[p]
+            if stale:
+                self._dirty = True
+
+
+def scan_dir(path: str, cache: Optional[DiskUsageCache] = None,
+             listing=None) -> Optional[DirInfo]:
+    """Return ``[mtime_ns, own_bytes, subdirs]`` for one directory, or None.
+    
+    ``listing`` is an optional shared ``dircache.DirCache`` to read through.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    if cache is not None:
+        info = cache.lookup(path, mtime_ns)
+        if info is not None:
+            return info
+
+    own = 0
+    subdirs: List[str] = []
+    try:
+        if listing is not None:
+            entries = listing.listdir(path)
+        else:
+            with os.scandir(path) as it:
+                entries = list(it)
+    except OSError:
+        return None
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            else:
+                own += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            pass
+
+    info = [mtime_ns, own, subdirs]
+    if cache is not None:
+        cache.store(path, info)
+    return info
+
+
+def directory_sizes(root: str, cache: Optional[DiskUsageCache] = None,
+                    workers: Optional[int] = None, listing=None,
+                    should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+    """Return the total size of ``root`` and of every directory below it.
+
+    Once ``should_stop()`` is true no more directories are read and the
+    totals cover only what was scanned so far.  It is called from the pool
+    threads, once per directory.
+    """
+    root = os.path.abspath(root)
+    levels: List[List[str]] = []
+    info: Dict[str, DirInfo] = {}
+    frontier = [root]
+    stopped = False
+
+    def scan(path: str) -> Optional[DirInfo]:
+        nonlocal stopped
+        if should_stop is not None and should_stop():
+            stopped = True
+            return None
+        return scan_dir(path, cache, listing)
+
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        while frontier and not stopped:
+            levels.append(frontier)
+            next_frontier: List[str] = []
+            for path, entry in zip(frontier, pool.map(scan, frontier)):
+                if entry is None:
+                    continue
+                info[path] = entry
+                next_frontier.extend(os.path.join(path, name) for name in entry[2])
+            frontier = next_frontier
+
+    if cache is not None and not stopped:
+        cache.prune(root, info)
+
+    # Deepest level first, so children are totalled before their parents.
+    totals: Dict[str, int] = {}
+    for level in reversed(levels):
+        for path in level:
+            entry = info.get(path)
+            if entry is None:
+                totals[path] = 0
+                continue
+            totals[path] = entry[1] + sum(totals.get(os.path.join(path, name), 0)
+                                          for name in entry[2])
+    return totals
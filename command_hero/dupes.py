@@ -0,0 +1,255 @@
+"""Duplicate file finder behind the ``dupes`` built-in.
+
+Files are narrowed down in stages so that most of them are never read:
+
+1. group by size (files with a unique size cannot have a duplicate);
+2. group by a hash of the first and last ``PARTIAL_SIZE`` bytes;
+3. fully hash only what is still grouped.
+
+Hashing runs on a thread pool (hashlib releases the GIL on large buffers).
+Hashes are cached on disk keyed by device and inode and validated by size
+and mtime, so a repeat run over a mostly unchanged tree reads almost
+nothing.  Hard links to one inode count as one file, since they take no
+extra space.
+"""
+import hashlib
+import json
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+CACHE_FILE = "~/.hero_dupes_cache"
+
+# Cached entries kept; entries not seen in the latest run are dropped first.
+CACHE_LIMIT = 500_000
+
+# Bytes hashed from each end of a file in the partial stage.
+PARTIAL_SIZE = 4096
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class HashCache:
+    """On-disk cache of partial and full hashes keyed by (device, inode)."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = os.path.expanduser(path)
+        # "dev:ino" -> [size, mtime_ns, partial hash, full hash or None]
+        self.entries: Dict[str, list] = {}
+        self.hits = 0
+        self._seen = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def load(self) -> "HashCache":
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        if len(self.entries) > CACHE_LIMIT:
+            self.entries = {key: value for key, value in self.entries.items() if key in self._seen}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            pass  # A cache that can't be written only makes the next run slower
+
+    def lookup(self, st: os.stat_result, index: int) -> Optional[str]:
+        """Cached hash ``index`` (2 partial, 3 full) of a file, if it is unchanged."""
+        key = f"{st.st_dev}:{st.st_ino}"
+        with self._lock:
+            self._seen.add(key)
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns \
+                    and entry[index] is not None:
+                self.hits += 1
+                return entry[index]
+        return None
+
+    def store(self, st: os.stat_result, index: int, digest: str) -> None:
+        key = f"{st.st_dev}:{st.st_ino}"
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+                entry = self.entries[key] = [st.st_size, st.st_mtime_ns, None, None]
+            entry[index] = digest
+            self._dirty = True
+
+
+def partial_hash(path: str, size: int) -> str:
+    """Hash of the first and last PARTIAL_SIZE bytes (all of a small file)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(PARTIAL_SIZE))
+        if size > 2 * PARTIAL_SIZE:
+            f.seek(size - PARTIAL_SIZE)
+        h.update(f.read(PARTIAL_SIZE))
+    return h.hexdigest()
+
+
+def full_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+class Report:
+    """Duplicate groups found under a tree, largest waste first.
+
+    Each group is ``(size, copies)``; a copy is the sorted list of paths
+    that are hard links to one inode.  ``hashed`` holds the identity each
+    path had when it was hashed, for ``link_duplicates`` to check against.
+    """
+
+    def __init__(self):
+        self.groups: List[Tuple[int, List[List[str]]]] = []
+        self.hashed: Dict[str, Tuple[int, int, int, int]] = {}
+        self.files = 0
+        self.hashed_partial = 0
+        self.hashed_full = 0
+        self.cache_hits = 0
+        self.errors: List[str] = []
+
+    @property
+    def reclaimable(self) -> int:
+        return sum(size * (len(copies) - 1) for size, copies in self.groups)
+
+
+def _regroup(groups: List[List[tuple]], key_of, pool: ThreadPoolExecutor) -> List[List[tuple]]:
+    """Split each group by ``key_of(file)`` (run on the pool), dropping singletons."""
+    files = [item for group in groups for item in group]
+    regrouped: Dict[tuple, List[tuple]] = {}
+    for item, key in zip(files, pool.map(key_of, files)):
+        if key is not None:
+            regrouped.setdefault((item[1].st_size, key), []).append(item)
+    return [group for group in regrouped.values() if len(group) > 1]
+
+
+def find_duplicates(root: str, listing, cache: Optional[HashCache] = None,
+                    min_size: int = 1, workers: Optional[int] = None) -> Report:
+    """Find files with identical contents under ``root``.
+
+    ``listing`` is the shared ``dircache.DirCache`` the tree is walked with.
+    """
+    report = Report()
+    lock = threading.Lock()
+    by_size: Dict[Tuple[int, int], Dict[int, tuple]] = {}
+    links: Dict[Tuple[int, int], List[str]] = {}
+    for directory, entries in listing.walk(root):
+        for entry in entries:
+            if entry.is_symlink() or entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode) or st.st_size < min_size:
+                continue
+            report.files += 1
+            # Hash one path per inode: extra hard links share the same blocks
+            path = os.path.join(directory, entry.name)
+            inodes = by_size.setdefault((st.st_dev, st.st_size), {})
+            inodes.setdefault(st.st_ino, (path, st))
+            links.setdefault((st.st_dev, st.st_ino), []).append(path)
+    groups = [list(inodes.values()) for inodes in by_size.values() if len(inodes) > 1]
+
+    def hashed(item: tuple, index: int) -> Optional[str]:
+        path, st = item
+        digest = cache.lookup(st, index) if cache is not None else None
+        if digest is not None:
+            return digest
+        try:
+            digest = partial_hash(path, st.st_size) if index == 2 else full_hash(path)
+        except OSError as e:
+            with lock:
+                report.errors.append(f"{path}: {e.strerror}")
+            return None
+        with lock:
+            if index == 2:
+                report.hashed_partial += 1
+            else:
+                report.hashed_full += 1
+        if cache is not None:
+            cache.store(st, index, digest)
+        return digest
+
+    with ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 1) * 2)) as pool:
+        groups = _regroup(groups, lambda item: hashed(item, 2), pool)
+        # The partial hash of a small file already covers all of it
+        small = [g for g in groups if g[0][1].st_size <= 2 * PARTIAL_SIZE]
+        large = [g for g in groups if g[0][1].st_size > 2 * PARTIAL_SIZE]
+        groups = small + _regroup(large, lambda item: hashed(item, 3), pool)
+
+    if cache is not None:
+        report.cache_hits = cache.hits
+    report.groups = sorted(
+        ((g[0][1].st_size, sorted(sorted(links[st.st_dev, st.st_ino]) for _, st in g)) for g in groups),
+        key=lambda group: (-group[0] * (len(group[1]) - 1), group[1][0]))
+    for _, st in (item for g in groups for item in g):
+        for path in links[st.st_dev, st.st_ino]:
+            report.hashed[path] = _identity(st)
+    return report
+
+
+def _identity(st: os.stat_result) -> Tuple[int, int, int, int]:
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def link_duplicates(report: Report) -> Tuple[int, int, List[str]]:
+    """Replace every duplicate with a hard link to the first copy of its group.
+
+    Returns (paths linked, bytes freed, errors).  A path whose inode, size
+    or mtime differs from when it was hashed is left alone (the whole group
+    if it is the kept copy), and an inode only counts as freed once its
+    last link is replaced.  Each link is made under a temporary name and
+    renamed over the duplicate, so a failure never loses the file.
+    """
+    linked = freed = 0
+    errors: List[str] = []
+    for size, copies in report.groups:
+        keep = copies[0][0]
+        try:
+            unchanged = _identity(os.lstat(keep)) == report.hashed.get(keep)
+        except OSError as e:
+            errors.append(f"{keep}: {e.strerror}")
+            continue
+        if not unchanged:
+            errors.append(f"{keep}: changed since it was hashed, group skipped")
+            continue
+        for path in (path for copy in copies[1:] for path in copy):
+            tmp = f"{path}.hero-link-{os.getpid()}"
+            try:
+                st = os.lstat(path)
+                if _identity(st) != report.hashed.get(path):
+                    errors.append(f"{path}: changed since it was hashed, skipped")
+                    continue
+                os.link(keep, tmp)
+                os.replace(tmp, path)
+                linked += 1
+                if st.st_nlink == 1:
+                    freed += size
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror}")
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+    return linked, freed, errors
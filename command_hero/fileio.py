@@ -0,0 +1,221 @@
+"""Low-level file reading helpers shared by the text commands."""
+import codecs
+import errno
+import os
+import re
+import time
+from typing import BinaryIO, Callable, IO, Iterable, Iterator, Optional, Tuple
+
+# Block size used when scanning a file backwards from its end.
+TAIL_BLOCK_SIZE = 8192
+
+# Read size used by the streaming counters.
+CHUNK_SIZE = 1024 * 1024
+
+# UTF-8 continuation bytes; deleting them leaves one byte per character.
+_UTF8_CONTINUATION = bytes(range(0x80, 0xC0))
+_WHITESPACE = b" \t\n\r\x0b\x0c"
+
+# How often ``follow`` re-checks the file when nothing new was written.
+FOLLOW_INTERVAL = 0.25
+
+# Bytes handed to sendfile per call when copying to stdout.
+SENDFILE_CHUNK = 16 * 1024 * 1024
+
+# Output is collected up to this size before each write.
+WRITE_BATCH = 64 * 1024
+
+# cat -A: control characters as ^X, high bytes as M-x, tabs as ^I.
+_NONPRINTING = re.compile(rb"[^\x20-\x7e\n]")
+
+
+def _visible_byte(c: int) -> bytes:
+    prefix = b"M-" if c >= 0x80 else b""
+    c &= 0x7F
+    if c < 0x20:
+        return prefix + b"^" + bytes([c + 0x40])
+    if c == 0x7F:
+        return prefix + b"^?"
+    return prefix + bytes([c])
+
+
+_VISIBLE = [_visible_byte(c) for c in range(256)]
+
+# sendfile errors meaning "not from this kind of file"; fall back to read/write
+_SENDFILE_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.ESPIPE, errno.EOPNOTSUPP,
+                         errno.ENOTSOCK}
+
+
+def read_tail(f, n: int, block_size: int = TAIL_BLOCK_SIZE) -> bytes:
+    """Return the last ``n`` lines of a binary file object.
+
+    The file is read backwards in fixed-size blocks until enough newlines
+    have been seen, so the cost depends on ``n`` rather than the file size.
+    """
+    if n <= 0:
+        return b""
+    end = f.seek(0, os.SEEK_END)
+    pos = end
+    blocks = []
+    newlines = 0
+
+    # A trailing newline terminates the last line rather than starting a new one.
+    if end:
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            newlines -= 1
+
+    while pos > 0 and newlines < n:
+        step = min(block_size, pos)
+        pos -= step
+        f.seek(pos)
+        block = f.read(step)
+        blocks.append(block)
+        newlines += block.count(b"\n")
+
+    data = b"".join(reversed(blocks))
+    if newlines >= n:
+        # Drop everything up to the newline before the first wanted line.
+        cut = len(data)
+        for _ in range(n + (1 if data.endswith(b"\n") else 0)):
+            cut = data.rindex(b"\n", 0, cut)
+        data = data[cut + 1:]
+    return data
+
+
+def follow(path: str, offset: int, write: Callable[[str], None],
+           interval: float = FOLLOW_INTERVAL,
+           should_stop: Optional[Callable[[], bool]] = None) -> None:
+    """Stream bytes appended to ``path`` after ``offset`` until interrupted.
+
+    Only ``os.stat`` is called while the file is idle.  A changed inode means
+    the log was rotated: the old handle is drained and the new file is read
+    from the start.  A file that shrank was truncated and is re-read from 0.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    f = open(path, "rb")
+    try:
+        f.seek(offset)
+        inode = os.fstat(f.fileno()).st_ino
+        while should_stop is None or not should_stop():
+            chunk = f.read(64 * 1024)
+            if chunk:
+                write(decoder.decode(chunk))
+                continue
+
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                st = None  # Mid-rotation; wait for the new file to appear
+
+            if st is not None and st.st_ino != inode:
+                f.close()
+                f = open(path, "rb")
+                inode = os.fstat(f.fileno()).st_ino
+                continue
+            if st is not None and st.st_size < f.tell():
+                f.seek(0)
+                continue
+            time.sleep(interval)
+    finally:
+        f.close()
+
+
+def count(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Tuple[int, int, int, int]:
+    """Count ``(lines, words, chars, bytes)`` of a binary stream chunk by chunk.
+
+    Memory use is bounded by ``chunk_size``.  A word split across two chunks
+    is only counted once, and characters are counted as UTF-8 sequences
+    without decoding, so invalid data does not raise.
+    """
+    lines = words = chars = nbytes = 0
+    in_word = False
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        nbytes += len(chunk)
+        lines += chunk.count(b"\n")
+        chars += len(chunk.translate(None, _UTF8_CONTINUATION))
+        words += len(chunk.split())
+        if in_word and chunk[0] not in _WHITESPACE:
+            words -= 1  # The first word continues the last chunk's word
+        in_word = chunk[-1] not in _WHITESPACE
+    return lines, words, chars, nbytes
+
+
+def output_fd(stream: IO) -> Optional[int]:
+    """Flush a text stream and return its file descriptor, or None if it has none."""
+    stream.flush()
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def copy_to_fd(src: BinaryIO, dst_fd: int, chunk_size: int = CHUNK_SIZE) -> None:
+    """Copy an unbuffered binary file to ``dst_fd`` without holding it in memory.
+
+    Regular files go through ``os.sendfile`` so the data never enters user
+    space.  Sources sendfile refuses (pipes, some special files) are copied
+    through one reused buffer with ``readinto``.
+    """
+    try:
+        start = offset = src.tell()
+    except OSError:
+        start = None  # A pipe: sendfile can only read from files
+    if start is not None and hasattr(os, "sendfile"):
+        try:
+            while True:
+                sent = os.sendfile(dst_fd, src.fileno(), offset, SENDFILE_CHUNK)
+                if not sent:
+                    return
+                offset += sent
+        except OSError as e:
+            if offset != start or e.errno not in _SENDFILE_UNSUPPORTED:
+                raise
+
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while True:
+        n = src.readinto(buf)
+        if not n:
+            return
+        write_all(dst_fd, view[:n])
+
+
+def number_lines(lines: Iterable[bytes], numbers: Iterator[int]) -> Iterator[bytes]:
+    """Prefix lines with right-aligned numbers, like ``cat -n``.
+
+    ``numbers`` is shared between files so numbering runs on across them.
+    """
+    for line, n in zip(lines, numbers):
+        yield b"%6d\t" % n + line
+
+
+def show_nonprinting(lines: Iterable[bytes]) -> Iterator[bytes]:
+    """Make control characters visible and mark line ends with $, like ``cat -A``."""
+    for line in lines:
+        newline = line.endswith(b"\n")
+        body = _NONPRINTING.sub(lambda m: _VISIBLE[m.group()[0]], line[:-1] if newline else line)
+        yield body + b"$\n" if newline else body
+
+
+def batched(chunks: Iterable[bytes], size: int = WRITE_BATCH) -> Iterator[bytes]:
+    """Join small chunks into writes of about ``size`` bytes."""
+    pending = []
+    total = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        total += len(chunk)
+        if total >= size:
+            yield b"".join(pending)
+            pending, total = [], 0
+    if pending:
+        yield b"".join(pending)
@@ -0,0 +1,193 @@
+"""Pathname expansion for command arguments: braces, ``*``, ``?``, ``[...]`` and ``**``.
+
+A pattern is split into ``/``-separated components once and each component
+is compiled once (and cached): runs of literal components are joined and
+checked with a single ``lstat``, wildcard components become a compiled
+regex matched against one sorted directory listing, and ``**`` matches any
+number of directories.  Only directories that match a component are
+descended into, so ``src/*/test_*.py`` never looks inside ``docs``.
+
+Matches are yielded as they are found, sorted within each directory.  As
+in bash, ``*`` does not match a leading dot unless the pattern starts with
+one, and ``**`` neither enters hidden directories nor follows symlinks.
+"""
+import fnmatch
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# Characters that make a word a pattern.
+MAGIC = frozenset("*?[")
+
+_RANGE = re.compile(r"(-?\d+)\.\.(-?\d+)(?:\.\.(-?\d+))?|([A-Za-z])\.\.([A-Za-z])")
+
+# Compiled component kinds
+_LITERAL, _WILDCARD, _RECURSIVE = range(3)
+
+
+def has_magic(word: str) -> bool:
+    return not MAGIC.isdisjoint(word)
+
+
+def _brace_range(body: str) -> Optional[List[str]]:
+    """``1..5``, ``10..1..3`` or ``a..e``; None if ``body`` is not a range."""
+    m = _RANGE.fullmatch(body)
+    if m is None:
+        return None
+    if m.group(4):
+        first, last = ord(m.group(4)), ord(m.group(5))
+        step = 1 if last >= first else -1
+        return [chr(c) for c in range(first, last + step, step)]
+    first, last = int(m.group(1)), int(m.group(2))
+    step = abs(int(m.group(3) or 1)) or 1
+    if last < first:
+        step = -step
+    return [str(n) for n in range(first, last + (1 if step > 0 else -1), step)]
+
+
+def expand_braces(word: str) -> List[str]:
+    """Brace expansion as in bash: ``a{b,c}d`` gives abd acd, ``{1..3}`` gives 1 2 3.
+
+    Braces nest; a brace pair with neither a comma nor a range, such as
+    ``{}``, is left as it is.
+    """
+    start = 0
+    while True:
+        opening = word.find("{", start)
+        if opening < 0:
+            return [word]
+        depth = 0
+        closing = -1
+        commas: List[int] = []
+        for i in range(opening, len(word)):
+            c = word[i]
+            if c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+                if depth == 0:
+                    closing = i
+                    break
+            elif c == "," and depth == 1:
+                commas.append(i)
+        if closing < 0:
+            return [word]
+        if commas:
+            bounds = [opening] + commas + [closing]
+            alternatives = [word[a + 1:b] for a, b in zip(bounds, bounds[1:])]
+        else:
+            alternatives = _brace_range(word[opening + 1:closing])
+            if alternatives is None:
+                start = opening + 1
+                continue
+        prefix = word[:opening]
+        suffixes = expand_braces(word[closing + 1:])
+        return [prefix + expanded + suffix
+                for alternative in alternatives
+                for expanded in expand_braces(alternative)
+                for suffix in suffixes]
+
+
+@lru_cache(maxsize=256)
+def _compile_component(part: str) -> Tuple[int, object, bool]:
+    if part == "**":
+        return _RECURSIVE, None, False
+    if not has_magic(part):
+        return _LITERAL, part, False
+    return _WILDCARD, re.compile(fnmatch.translate(part)).match, part.startswith(".")
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str) -> Tuple[str, Tuple[Tuple[int, object, bool], ...], bool]:
+    """Split a pattern into ``(root, components, directories only)``.
+
+    Consecutive literal components are joined into one, and a trailing
+    ``**`` is read as ``**/*`` so that it matches everything below.
+    """
+    root = os.sep if pattern.startswith("/") else ""
+    parts = [part for part in pattern.split("/") if part]
+    if parts and parts[-1] == "**":
+        parts.append("*")
+    components: List[Tuple[int, object, bool]] = []
+    for part in parts:
+        if part == "**" and components and components[-1][0] == _RECURSIVE:
+            continue  # **/** is the same as **
+        kind, value, dotted = _compile_component(part)
+        if kind == _LITERAL and components and components[-1][0] == _LITERAL:
+            components[-1] = (_LITERAL, os.path.join(components[-1][1], value), False)
+        else:
+            components.append((kind, value, dotted))
+    return root, tuple(components), pattern.endswith("/")
+
+
+def _scandir_sorted(path: str) -> list:
+    with os.scandir(path) as it:
+        return sorted(it, key=lambda entry: entry.name)
+
+
+def iglob(pattern: str, listdir: Optional[Callable[[str], list]] = None) -> Iterator[str]:
+    """Lazily yield the existing paths matching ``pattern``.
+
+    ``listdir`` returns a directory's entries sorted by name; the shell
+    passes its shared directory cache, and by default ``os.scandir`` is
+    used directly.
+    """
+    listdir = listdir or _scandir_sorted
+    root, components, dirs_only = compile_pattern(pattern)
+    if not components:
+        return
+
+    def entries(base: str) -> list:
+        try:
+            return listdir(base or os.curdir)
+        except OSError:
+            return []
+
+    def match(base: str, index: int) -> Iterator[str]:
+        kind, value, dotted = components[index]
+        last = index == len(components) - 1
+        prefix = base if not base or base.endswith(os.sep) else base + os.sep
+        if kind == _LITERAL:
+            path = prefix + value
+            if last:
+                if os.path.isdir(path) if dirs_only else os.path.lexists(path):
+                    yield path
+            elif os.path.isdir(path):
+                yield from match(path, index + 1)
+        elif kind == _WILDCARD:
+            for entry in entries(base):
+                name = entry.name
+                if (name[0] == "." and not dotted) or not value(name):
+                    continue
+                if last:
+                    if not dirs_only or entry.is_dir():
+                        yield prefix + name
+                elif entry.is_dir():
+                    yield from match(prefix + name, index + 1)
+        else:
+            # ** matches no directory at all, then any directory below
+            yield from match(base, index + 1)
+            for entry in entries(base):
+                if entry.name[0] != "." and entry.is_dir(follow_symlinks=False):
+                    yield from match(prefix + entry.name, index)
+
+    for path in match(root, 0):
+        yield path + "/" if dirs_only else path
+
+
+def expand(word: str, listdir: Optional[Callable[[str], list]] = None) -> List[str]:
+    """Expand one unquoted word into arguments: braces first, then patterns.
+
+    The matches of each pattern are sorted as a whole, like bash sorts
+    them, and a pattern that matches nothing is kept as written (bash
+    without ``nullglob``).
+    """
+    words: List[str] = []
+    for alternative in expand_braces(word) if "{" in word else [word]:
+        if has_magic(alternative):
+            matches = sorted(iglob(alternative, listdir))
+            words.extend(matches or [alternative])
+        else:
+            words.append(alternative)
+    return words
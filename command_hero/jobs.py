@@ -0,0 +1,268 @@
+"""Background jobs for the shell (``cmd &``, ``jobs``, ``fg``, ``bg``, ``kill``).
+
+Each job runs on its own daemon thread with its stdout bound to a
+``JobOutput`` buffer, so its output is kept per job instead of being
+interleaved with the prompt.  External programs started by a job get their
+own process group, which keeps terminal Ctrl+C away from them and lets
+``kill %N`` signal the whole group.
+
+Threads cannot be killed, so cancelling a job is cooperative: once a job is
+cancelled its next write raises ``JobCancelled``, a BrokenPipeError, which
+built-ins already treat as "the reader went away" and stop on.
+"""
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Captured output beyond this many characters is dropped from the front.
+OUTPUT_LIMIT = 16 * 1024 * 1024
+
+# Signals that suspend a process group; absent on Windows.
+_STOP_SIGNALS = {getattr(signal, name) for name in ("SIGSTOP", "SIGTSTP", "SIGTTIN", "SIGTTOU")
+                 if hasattr(signal, name)}
+
+_local = threading.local()
+
+
+class JobCancelled(BrokenPipeError):
+    """Raised inside a job's thread when it writes after being cancelled."""
+
+
+def current() -> Optional["Job"]:
+    """The job the calling thread is running for, if any."""
+    return getattr(_local, "job", None)
+
+
+class Foreground:
+    """Cancel flag shared by the stages of a pipeline run in the foreground.
+
+    Ctrl+C only interrupts the main thread, so the pipeline sets this flag
+    for the stages running on other threads before waiting for them.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+
+    @contextmanager
+    def interrupts(self) -> Iterator[None]:
+        """Set the flag as soon as Ctrl+C arrives, then raise KeyboardInterrupt.
+
+        The interrupted stage may wait on the other stages while it unwinds
+        (a worker pool shutting down, say), so the flag can't wait for the
+        exception to reach the pipeline.
+        """
+        if (threading.current_thread() is not threading.main_thread()
+                or signal.getsignal(signal.SIGINT) is not signal.default_int_handler):
+            yield
+            return
+
+        def interrupt(signum, frame):
+            self.cancelled = True
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGINT, interrupt)
+        try:
+            yield
+        finally:
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+
+
+def _cancel_flag():
+    return current() or getattr(_local, "foreground", None)
+
+
+def stop_check() -> Optional[Callable[[], bool]]:
+    """A ``should_stop`` callback for long loops that write nothing for a while.
+
+    It reports whether the calling thread's job has been killed, or its
+    foreground pipeline interrupted, and can be polled from any thread, such
+    as an engine's worker pool.  With nothing to stop None is returned.
+    """
+    flag = _cancel_flag()
+    return None if flag is None else (lambda: flag.cancelled)
+
+
+def check_cancelled() -> None:
+    """Raise JobCancelled if the calling thread's job or pipeline has been stopped."""
+    flag = _cancel_flag()
+    if flag is not None and flag.cancelled:
+        raise JobCancelled(32, "job cancelled")
+
+
+@contextmanager
+def running_in(job: Optional["Job"], foreground: Optional[Foreground] = None) -> Iterator[None]:
+    previous = current(), getattr(_local, "foreground", None)
+    _local.job = job
+    _local.foreground = foreground
+    try:
+        yield
+    finally:
+        _local.job, _local.foreground = previous
+
+
+class JobOutput:
+    """Thread-safe text sink holding a job's output."""
+
+    def __init__(self, job: "Job"):
+        self._job = job
+        self._chunks: List[str] = []
+        self._size = 0
+        self.dropped = 0  # Chunks discarded to stay under OUTPUT_LIMIT
+        self.cond = threading.Condition()
+
+    def write(self, text: str) -> int:
+        if self._job.cancelled:
+            raise JobCancelled(32, "job cancelled")
+        if text:
+            with self.cond:
+                self._chunks.append(text)
+                self._size += len(text)
+                while self._size > OUTPUT_LIMIT and len(self._chunks) > 1:
+                    self._size -= len(self._chunks.pop(0))
+                    self.dropped += 1
+                self.cond.notify_all()
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+    def empty(self) -> bool:
+        with self.cond:
+            return not self._chunks
+
+    def chunks_since(self, position: int):
+        """Return (new chunks, new position) for an absolute chunk position."""
+        with self.cond:
+            start = max(0, position - self.dropped)
+            return self._chunks[start:], self.dropped + len(self._chunks)
+
+
+class Job:
+    """A command line running in the background."""
+
+    def __init__(self, job_id: int, command: str):
+        self.id = job_id
+        self.command = command
+        self.output = JobOutput(self)
+        self.status: Optional[int] = None
+        self.cancelled = False
+        self.stopped = False
+        self.pgids: List[int] = []
+        self.done = threading.Event()
+        self.reported = False
+
+    @property
+    def state(self) -> str:
+        if self.done.is_set():
+            return f"Done ({self.status})" if self.status else "Done"
+        return "Stopped" if self.stopped else "Running"
+
+    def add_process(self, pid: int) -> None:
+        """Remember a child that leads its own process group."""
+        self.pgids.append(pid)
+        if self.cancelled:
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def signal(self, sig: int) -> bool:
+        """Send ``sig`` to the job's processes; terminating signals also cancel it.
+
+        Signal 0 only checks that the job exists.  Threads can't be paused,
+        so stopping or continuing a job without processes does nothing and
+        returns False.
+        """
+        if sig == 0:
+            return True
+        if sig in _STOP_SIGNALS or sig == getattr(signal, "SIGCONT", None):
+            if not self.pgids:
+                return False
+            self.stopped = sig in _STOP_SIGNALS
+        else:
+            self.cancelled = True
+        for pgid in self.pgids:
+            try:
+                os.killpg(pgid, sig)
+            except OSError:
+                pass
+        return True
+
+    def follow(self, write: Callable[[str], None]) -> None:
+        """Write the job's output as it arrives until the job finishes."""
+        position = 0
+        while True:
+            chunks, position = self.output.chunks_since(position)
+            for chunk in chunks:
+                write(chunk)
+            if chunks:
+                continue
+            if self.done.is_set():
+                chunks, position = self.output.chunks_since(position)
+                if not chunks:
+                    return
+                continue
+            with self.output.cond:
+                self.output.cond.wait(0.1)
+
+
+class JobTable:
+    """Numbered background jobs and the threads that run them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jobs: Dict[int, Job] = {}
+
+    def _run(self, job: Job, fn: Callable[[Job], int]) -> None:
+        try:
+            with running_in(job):
+                job.status = fn(job)
+        except BaseException:
+            job.status = 1
+        finally:
+            job.done.set()
+            with job.output.cond:
+                job.output.cond.notify_all()
+
+    def start(self, command: str, fn: Callable[[Job], int]) -> Job:
+        """Run ``fn(job)`` on a new thread and return the new job.
+
+        Every job gets a thread of its own, so one that is waiting (``sleep``,
+        ``tail -f``) never holds up the jobs started after it.
+        """
+        with self._lock:
+            job_id = max(self.jobs, default=0) + 1
+            job = Job(job_id, command)
+            self.jobs[job_id] = job
+        threading.Thread(target=self._run, args=(job, fn), name=f"hero-job-{job_id}",
+                         daemon=True).start()
+        return job
+
+    def get(self, spec: Optional[str]) -> Optional[Job]:
+        """Resolve ``%N``, ``N``, ``%%``/``%+`` or None (the latest job)."""
+        with self._lock:
+            if not self.jobs:
+                return None
+            if spec in (None, "%", "%%", "%+"):
+                return self.jobs[max(self.jobs)]
+            spec = spec.lstrip("%")
+            return self.jobs.get(int(spec)) if spec.isdigit() else None
+
+    def remove(self, job: Job) -> None:
+        with self._lock:
+            self.jobs.pop(job.id, None)
+
+    def finished(self) -> List[Job]:
+        """Jobs that have completed, oldest first."""
+        with self._lock:
+            return [j for _, j in sorted(self.jobs.items()) if j.done.is_set()]
+
+    def cancel_all(self) -> None:
+        for job in list(self.jobs.values()):
+            if not job.done.is_set():
+                job.signal(signal.SIGTERM)
@@ -0,0 +1,61 @@
+"""Deferred imports and command lookup to keep shell startup fast.
+
+Most sessions touch only a handful of commands, so modules that only some
+commands need (the search and sort engines, ``subprocess``, ``difflib``...)
+are bound to ``LazyModule`` placeholders and imported on first attribute
+access.  ``python cli.py --startup-profile`` shows what is still loaded at
+startup.
+"""
+import importlib
+import sys
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator
+
+
+class LazyModule:
+    """Stand-in for a module that is imported when first used."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self._module
+        if module is None:
+            # import_module holds the per-module import lock, so threads
+            # racing on first use all get the same, fully loaded module.
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def module(name: str) -> Any:
+    """Return ``name`` if it is already imported, else a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+class MethodTable(Mapping):
+    """Read-only mapping from names to ``owner`` methods, bound on first lookup."""
+
+    def __init__(self, owner: Any, methods: Dict[str, str]):
+        self._owner = owner
+        self._methods = methods
+        self._bound: Dict[str, Callable] = {}
+
+    def __getitem__(self, name: str) -> Callable:
+        fn = self._bound.get(name)
+        if fn is None:
+            fn = self._bound[name] = getattr(self._owner, self._methods[name])
+        return fn
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._methods
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._methods)
+
+    def __len__(self) -> int:
+        return len(self._methods)
@@ -0,0 +1,221 @@
+"""Tokenizer for hero command lines."""
+import re
+from typing import Callable, List, Optional, Tuple
+
+
+class Operator(str):
+    """A control operator (such as ``|`` or ``&``) that appeared unquoted on the line."""
+
+
+# Longest operators first so that multi-character operators win.
+OPERATORS = ("2>&1", "2>>", "2>", "&&", "||", ">>", ">", "|", "&", ";")
+
+# Operators that end a pipeline within a list.
+LIST_OPERATORS = ("&&", "||", "&", ";")
+
+# Operators that redirect a command's output; all but 2>&1 take a file name.
+REDIRECTIONS = (">", ">>", "2>", "2>>", "2>&1")
+
+_WHITESPACE = " \t\n"
+
+# $?, ${NAME} and $NAME
+_VARIABLE = re.compile(r"\?|\{([A-Za-z_][A-Za-z0-9_]*)\}|([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def _match_operator(line: str, pos: int, in_word: bool) -> str:
+    for op in OPERATORS:
+        # Like sh, "2>" only means stderr as a word of its own: "a2>f" is "a2 > f"
+        if line.startswith(op, pos) and not (in_word and op[0] == "2"):
+            return op
+    return ""
+
+
+class Word(str):
+    """A word as written on the line, before variable expansion.
+    
+    The string value is the word with ``$`` references left in place;
+    ``parts`` holds ``(text, is_variable)`` pairs for ``expand`` and
+    ``quoted`` records whether any part of the word was quoted.
+    """
+
+    def __new__(cls, parts: List[Tuple[str, bool]], quoted: bool):
+        word = super().__new__(cls, "".join("$" + t if is_var else t for t, is_var in parts))
+        word.parts = tuple(parts)
+        word.quoted = quoted
+        return word
+
+    def expand(self, lookup: Callable[[str], str]) -> str:
+        return "".join(lookup(t) if is_var else t for t, is_var in self.parts)
+
+
+def expand(words: List[str], lookup: Callable[[str], str]) -> List[str]:
+    """Expand variables in ``words``; unquoted words that become empty are dropped."""
+    result = []
+    for word in words:
+        if isinstance(word, Word):
+            text = word.expand(lookup)
+            if text or word.quoted:
+                result.append(text)
+        else:
+            result.append(word)
+    return result
+
+
+def _variable(line: str, i: int):
+    """Parse the variable reference starting at ``line[i] == '$'``.
+    
+    Returns ``(name, next_index)``, or ``(None, i + 1)`` for a ``$`` that
+    does not start a reference and is kept literally.
+    """
+    m = _VARIABLE.match(line, i + 1)
+    if m is None:
+        return None, i + 1
+    return m.group(1) or m.group(2) or "?", m.end()
+
+
+def tokenize(line: str, lookup: Optional[Callable[[str], str]] = None) -> List[str]:
+    """Split a line into Word and Operator tokens.
+    
+    Quoting follows the POSIX rules used by ``shlex.split``; operators are
+    only recognised outside of quotes, so ``grep '|' file`` stays one word.
+    ``$NAME``, ``${NAME}`` and ``$?`` outside single quotes are recorded as
+    variable parts of the Word and resolved by ``expand``, normally just
+    before the command runs so that ``$?`` sees the previous command; when
+    ``lookup`` is given the words are expanded straight away. An unquoted
+    ``#`` at the start of a word comments out the rest of the line.
+    """
+    tokens: List[str] = []
+    parts: List[Tuple[str, bool]] = []
+    in_word = False
+    quoted = False
+    i, n = 0, len(line)
+
+    def end_word():
+        if in_word:
+            tokens.append(Word(parts, quoted))
+
+    while i < n:
+        ch = line[i]
+
+        if ch in _WHITESPACE:
+            end_word()
+            parts, in_word, quoted = [], False, False
+            i += 1
+            continue
+
+        op = _match_operator(line, i, in_word)
+        if op:
+            end_word()
+            parts, in_word, quoted = [], False, False
+            tokens.append(Operator(op))
+            i += len(op)
+            continue
+
+        if ch == "#" and not in_word:
+            break
+
+        in_word = True
+        if ch == "$":
+            name, i = _variable(line, i)
+            parts.append((name, True) if name else ("$", False))
+        elif ch == "'":
+            quoted = True
+            end = line.find("'", i + 1)
+            if end < 0:
+                raise ValueError("No closing quotation")
+            parts.append((line[i + 1:end], False))
+            i = end + 1
+        elif ch == '"':
+            quoted = True
+            i += 1
+            while True:
+                if i >= n:
+                    raise ValueError("No closing quotation")
+                ch = line[i]
+                if ch == '"':
+                    i += 1
+                    break
+                if ch == "\\" and i + 1 < n and line[i + 1] in '"\\$`\n':
+                    parts.append((line[i + 1], False))
+                    i += 2
+                    continue
+                if ch == "$":
+                    name, i = _variable(line, i)
+                    parts.append((name, True) if name else ("$", False))
+                    continue
+                parts.append((ch, False))
+                i += 1
+        elif ch == "\\":
+            if i + 1 >= n:
+                raise ValueError("No escaped character")
+            quoted = True  # An escaped character is never a glob or brace
+            parts.append((line[i + 1], False))
+            i += 2
+        else:
+            parts.append((ch, False))
+            i += 1
+
+    end_word()
+    return expand(tokens, lookup) if lookup is not None else tokens
+
+
+def split_list(tokens: List[str]) -> List[Tuple[List[str], str]]:
+    """Split tokens into (pipeline tokens, terminator) pairs.
+    
+    The terminator is the operator that followed the pipeline: ``&&`` or
+    ``||`` chain it to the next one, ``&`` runs it in the background, ``;``
+    and ``""`` (end of line) just end it.
+    """
+    items: List[Tuple[List[str], str]] = []
+    current: List[str] = []
+    for tok in tokens:
+        if isinstance(tok, Operator) and tok in LIST_OPERATORS:
+            if not current:
+                raise ValueError(f"syntax error near unexpected token '{tok}'")
+            items.append((current, tok))
+            current = []
+        else:
+            current.append(tok)
+    if current:
+        items.append((current, ""))
+    elif items and items[-1][1] in ("&&", "||"):
+        raise ValueError(f"syntax error: line ends with '{items[-1][1]}'")
+    return items
+
+
+def split_redirects(tokens: List[str]) -> Tuple[List[str], List[Tuple[str, Optional[str]]]]:
+    """Separate a stage's redirections from its words.
+    
+    Returns ``(words, redirects)`` where each redirect is ``(operator,
+    target word)``, in the order written; ``2>&1`` has no target.
+    """
+    words: List[str] = []
+    redirects: List[Tuple[str, Optional[str]]] = []
+    it = iter(tokens)
+    for tok in it:
+        if isinstance(tok, Operator) and tok in REDIRECTIONS:
+            if tok == "2>&1":
+                redirects.append((tok, None))
+                continue
+            target = next(it, None)
+            if target is None or isinstance(target, Operator):
+                raise ValueError(f"syntax error near unexpected token '{target or 'newline'}'")
+            redirects.append((tok, target))
+        else:
+            words.append(tok)
+    return words, redirects
+
+
+def split_pipeline(tokens: List[str]) -> List[List[str]]:
+    """Split tokens on ``|`` into a list of argv lists."""
+    stages: List[List[str]] = [[]]
+    for tok in tokens:
+        if isinstance(tok, Operator) and tok == "|":
+            if not stages[-1]:
+                raise ValueError("syntax error near unexpected token '|'")
+            stages.append([])
+        else:
+            stages[-1].append(tok)
+    if not stages[-1] and len(stages) > 1:
+        raise ValueError("syntax error: pipeline ends with '|'")
+    return [s for s in stages if s]
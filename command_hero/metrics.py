@@ -0,0 +1,146 @@
+"""Command latency statistics and resource usage (``time`` and ``stats``).
+
+Latencies go into fixed log2 buckets (bucket ``i`` holds durations from
+2**i to 2**(i+1) microseconds), so every command costs a constant 40 ints
+however long the session runs.  Percentiles are read from the buckets and
+are accurate to within a factor of two, which is enough to tell a 2 ms
+command from a 200 ms one.
+"""
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+BUCKETS = 40
+
+
+def format_duration(seconds: float) -> str:
+    """Compact human duration: 850us, 12.3ms, 1.20s."""
+    if seconds < 0.001:
+        return f"{seconds * 1e6:.0f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+class Histogram:
+    """Latency distribution of one command."""
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        micros = int(seconds * 1e6)
+        self.buckets[min(max(micros, 1).bit_length() - 1, BUCKETS - 1)] += 1
+        self.count += 1
+        self.failures += failed
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @staticmethod
+    def bucket_range(i: int) -> Tuple[float, float]:
+        """Lower and upper bound of bucket ``i`` in seconds."""
+        return (2 ** i) / 1e6, (2 ** (i + 1)) / 1e6
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the ``p``-th percentile (0-100)."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(self.bucket_range(i)[1], self.max)
+        return self.max
+
+    def copy(self) -> "Histogram":
+        other = Histogram()
+        other.buckets = list(self.buckets)
+        other.count, other.failures = self.count, self.failures
+        other.total, other.max = self.total, self.max
+        return other
+
+
+class CommandStats:
+    """Per-command histograms, updated from pipeline and job threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands: Dict[str, Histogram] = {}
+
+    def record(self, name: str, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            hist = self._commands.get(name)
+            if hist is None:
+                hist = self._commands[name] = Histogram()
+            hist.record(seconds, failed)
+
+    def snapshot(self) -> Dict[str, Histogram]:
+        with self._lock:
+            return {name: hist.copy() for name, hist in self._commands.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._commands.clear()
+
+
+def _reset_peak_rss() -> bool:
+    """Reset this process's peak RSS (Linux 4.0+); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_kb(who: str = "self") -> Optional[int]:
+    """Peak RSS in KB of this process ("self") or its reaped children."""
+    if who == "self":
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    return usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+
+
+class Stopwatch:
+    """Wall time, CPU time and peak memory of the code run inside ``with``.
+
+    CPU time covers the whole shell process plus children it waited for
+    (external programs), like the shell's own ``time``.  Peak memory is the
+    shell's high-water mark, reset at the start where the kernel allows it,
+    or the peak of an external program if one ran and was larger.
+    """
+
+    def __enter__(self) -> "Stopwatch":
+        _reset_peak_rss()
+        self._children_peak = _peak_rss_kb("children")
+        self._times = os.times()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.real = time.perf_counter() - self._start
+        end = os.times()
+        self.user = (end.user - self._times.user) + (end.children_user - self._times.children_user)
+        self.sys = (end.system - self._times.system) + (end.children_system - self._times.children_system)
+        peaks: List[int] = [p for p in (_peak_rss_kb("self"),) if p is not None]
+        children_peak = _peak_rss_kb("children")
+        if children_peak is not None and children_peak != self._children_peak:
+            peaks.append(children_peak)
+        self.peak_rss_kb = max(peaks) if peaks else None
@@ -0,0 +1,126 @@
+"""Hash table of executables on ``$PATH``, like bash's ``hash`` built-in.
+
+Every ``$PATH`` directory is scanned once with ``os.scandir`` into a dict
+from command name to the full paths providing it, in ``$PATH`` order, so a
+lookup is a dict access instead of a probe of every directory.  The table
+is rebuilt when ``$PATH`` itself changes; individual directories are
+rescanned when their mtime changes, which is checked on a lookup miss or
+when the last check is older than ``REVALIDATE_INTERVAL`` seconds.
+"""
+import os
+import stat
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+REVALIDATE_INTERVAL = 2.0
+
+
+def _scan(directory: str) -> List[str]:
+    """Names of the executable regular files in ``directory``."""
+    names = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode) and st.st_mode & 0o111:
+                    names.append(entry.name)
+    except OSError:
+        pass
+    return names
+
+
+class CommandHash:
+    """Cached mapping from command names to executables on ``$PATH``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._dirs: List[Tuple[str, Optional[int], List[str]]] = []
+        self._table: Dict[str, List[str]] = {}
+        self._checked = 0.0
+        self.hits: Dict[str, int] = {}
+
+    def clear(self) -> None:
+        """Forget everything (``hash -r``); the next lookup rescans $PATH."""
+        with self._lock:
+            self._path = None
+            self._dirs = []
+            self._table = {}
+            self.hits = {}
+
+    def _mtime(self, directory: str) -> Optional[int]:
+        try:
+            return os.stat(directory or ".").st_mtime_ns
+        except OSError:
+            return None
+
+    def _rebuild_table(self) -> None:
+        table: Dict[str, List[str]] = {}
+        for directory, _, names in self._dirs:
+            for name in names:
+                table.setdefault(name, []).append(os.path.join(directory, name))
+        self._table = table
+
+    def _refresh(self, force: bool = False) -> None:
+        """Rescan $PATH if it changed, or directories whose mtime changed."""
+        path = os.environ.get("PATH", "")
+        now = time.monotonic()
+        if path != self._path:
+            self._path = path
+            dirs = []
+            seen = set()
+            for directory in path.split(os.pathsep):
+                if directory in seen:
+                    continue
+                seen.add(directory)
+                dirs.append((directory, self._mtime(directory), _scan(directory or ".")))
+            self._dirs = dirs
+            self.hits = {}
+            self._rebuild_table()
+        elif force or now - self._checked >= REVALIDATE_INTERVAL:
+            changed = False
+            for i, (directory, mtime, _) in enumerate(self._dirs):
+                current = self._mtime(directory)
+                if current != mtime:
+                    self._dirs[i] = (directory, current, _scan(directory or "."))
+                    changed = True
+            if changed:
+                self._rebuild_table()
+        else:
+            return
+        self._checked = now
+
+    def lookup_all(self, name: str) -> List[str]:
+        """Every executable called ``name`` on $PATH, in search order."""
+        if os.sep in name:
+            return [name] if os.path.isfile(name) and os.access(name, os.X_OK) else []
+        with self._lock:
+            self._refresh()
+            paths = self._table.get(name)
+            if not paths:
+                self._refresh(force=True)
+                paths = self._table.get(name)
+            if paths:
+                self.hits[name] = self.hits.get(name, 0) + 1
+            return list(paths or [])
+
+    def lookup(self, name: str) -> Optional[str]:
+        """The executable that running ``name`` would use, or None."""
+        paths = self.lookup_all(name)
+        return paths[0] if paths else None
+
+    def names(self, prefix: str = "") -> List[str]:
+        """All command names on $PATH starting with ``prefix``."""
+        with self._lock:
+            self._refresh()
+            return [name for name in self._table if name.startswith(prefix)]
+
+    def remembered(self) -> List[Tuple[str, int, str]]:
+        """(name, hits, path) for every command looked up so far."""
+        with self._lock:
+            return [(name, hits, self._table[name][0])
+                    for name, hits in sorted(self.hits.items()) if name in self._table]
@@ -0,0 +1,183 @@
+"""Persistent filename index behind ``find --index`` and ``updatedb``.
+
+The index for a directory tree is a sorted, newline-separated list of
+relative paths (directories carry a trailing ``/``) that is memory-mapped
+at query time, so a query is a single regex scan over the file in C.
+Next to it a small JSON file records every directory's mtime; ``refresh``
+only lists directories whose mtime changed and reuses the stored entries
+for the rest, which costs one ``stat`` per directory instead of a full walk.
+"""
+import fnmatch
+import hashlib
+import json
+import mmap
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import search
+
+INDEX_DIR = "~/.hero_index"
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+def is_glob(pattern: str) -> bool:
+    return bool(_GLOB_CHARS.search(pattern))
+
+
+def name_matches(name: str, pattern: str) -> bool:
+    """Match a file name the way ``find`` does: glob if wildcards, else substring."""
+    if is_glob(pattern):
+        return fnmatch.fnmatchcase(name, pattern)
+    return pattern in name
+
+
+def _literal_hint(pattern: str) -> str:
+    """Longest wildcard-free run of a glob, used to prefilter candidates."""
+    if not is_glob(pattern):
+        return pattern
+    runs = re.split(r"\[[^\]]*\]?|[*?]", pattern)
+    return max(runs, key=len)
+
+
+class PathIndex:
+    """Filename index for one directory tree."""
+
+    def __init__(self, root: str, index_dir: str = INDEX_DIR):
+        self.root = os.path.abspath(root)
+        digest = hashlib.sha1(self.root.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        base = os.path.join(os.path.expanduser(index_dir), digest)
+        self.paths_file = base + ".paths"
+        self.meta_file = base + ".json"
+
+    @classmethod
+    def covering(cls, path: str, index_dir: str = INDEX_DIR) -> Optional["PathIndex"]:
+        """Return the index of ``path`` or of its nearest indexed ancestor."""
+        current = os.path.abspath(path)
+        while True:
+            index = cls(current, index_dir)
+            if index.exists():
+                return index
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None
+            current = parent
+
+    def exists(self) -> bool:
+        return os.path.exists(self.paths_file) and os.path.exists(self.meta_file)
+
+    def _load(self) -> Tuple[Dict[str, int], Dict[str, List[str]]]:
+        """Return stored directory mtimes and the entries of each directory."""
+        try:
+            with open(self.meta_file, "r", encoding="utf-8") as f:
+                mtimes = json.load(f).get("dirs", {})
+            with open(self.paths_file, "r", encoding="utf-8", errors="surrogateescape") as f:
+                lines = f.read().splitlines()
+        except (OSError, ValueError):
+            return {}, {}
+        children: Dict[str, List[str]] = defaultdict(list)
+        for line in lines:
+            parent = line[:line.rstrip("/").rfind("/") + 1]
+            children[parent].append(line)
+        return mtimes, children
+
+    def refresh(self) -> Tuple[int, int]:
+        """Bring the index up to date; return (paths indexed, dirs rescanned)."""
+        old_mtimes, old_children = self._load()
+        mtimes: Dict[str, int] = {}
+        paths: List[str] = []
+        rescanned = 0
+        stack = [""]
+
+        while stack:
+            rel = stack.pop()
+            full = os.path.join(self.root, rel) if rel else self.root
+            try:
+                mtime = os.stat(full).st_mtime_ns
+            except OSError:
+                continue
+            mtimes[rel] = mtime
+
+            if old_mtimes.get(rel) == mtime:
+                entries = old_children.get(rel, [])
+            else:
+                rescanned += 1
+                entries = []
+                try:
+                    with os.scandir(full) as it:
+                        for entry in it:
+                            if "\n" in entry.name:
+                                continue  # Can't be stored in a line-based index
+                            try:
+                                is_dir = entry.is_dir(follow_symlinks=False)
+                            except OSError:
+                                is_dir = False
+                            entries.append(rel + entry.name + ("/" if is_dir else ""))
+                except OSError:
+                    pass
+
+            paths.extend(entries)
+            stack.extend(e for e in entries if e.endswith("/"))
+
+        paths.sort()
+        os.makedirs(os.path.dirname(self.paths_file), exist_ok=True)
+        self._write(self.paths_file, ("\n".join(paths) + "\n" if paths else "").encode(
+            "utf-8", "surrogateescape"))
+        self._write(self.meta_file, json.dumps(
+            {"root": self.root, "dirs": mtimes}, separators=(",", ":")).encode("utf-8"))
+        return len(paths), rescanned
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def query(self, pattern: str, regex: bool = False, under: Optional[str] = None,
+              base: Optional[str] = None) -> Iterator[str]:
+        """Yield indexed paths (relative to the root) that match ``pattern``.
+
+        Name patterns are matched against the last path component; a literal
+        part of the pattern is located with one C-level scan of the mapped
+        index and only those candidate lines are checked in Python.
+        ``under`` restricts results to one subdirectory of the root.
+        ``regex`` patterns are matched against the path below ``under``
+        joined onto ``base``, without a directory's trailing slash: the path
+        a walk started at ``base`` would report.
+        """
+        prefix = ""
+        if under is not None:
+            rel = os.path.relpath(os.path.abspath(under), self.root)
+            prefix = "" if rel == "." else rel.replace(os.sep, "/") + "/"
+
+        if regex:
+            path_matcher = re.compile(pattern)
+            # Only the lines under the prefix can be picked out in C
+            matcher = re.compile(b"^" + re.escape(prefix.encode("utf-8", "surrogateescape")),
+                                 re.MULTILINE)
+        else:
+            matcher = re.compile(re.escape(_literal_hint(pattern).encode("utf-8")))
+
+        with open(self.paths_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for _, raw in search.scan(buf, matcher):
+                    line = raw.decode("utf-8", "surrogateescape")
+                    if not line.startswith(prefix):
+                        continue
+                    if regex:
+                        path = line[len(prefix):].rstrip("/").replace("/", os.sep)
+                        if not path_matcher.search(path if base is None else os.path.join(base, path)):
+                            continue
+                    else:
+                        name = line.rstrip("/").rsplit("/", 1)[-1]
+                        if not name_matches(name, pattern):
+                            continue
+                    yield line
+            finally:
+                buf.close()
@@ -0,0 +1,73 @@
+"""Spawning external programs for the shell.
+
+Programs are started with ``os.posix_spawn`` where available, which avoids
+copying the interpreter's address space the way ``fork`` does.  Pipes made
+by ``os.pipe`` are non-inheritable (PEP 446), so the child only receives
+the descriptors explicitly mapped onto its stdin, stdout and stderr.
+"""
+import os
+import signal
+import subprocess
+from typing import Dict, List, Optional
+
+# Popen objects for platforms without posix_spawn, so wait() can reap them.
+_popen_children: Dict[int, subprocess.Popen] = {}
+
+
+def exit_status(status: int) -> int:
+    """Turn a ``waitpid`` status into a shell exit code (128+N for signals)."""
+    if os.WIFSIGNALED(status):
+        return 128 + os.WTERMSIG(status)
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    return 1
+
+
+def spawn(path: str, argv: List[str], stdin_fd: Optional[int] = None,
+          stdout_fd: Optional[int] = None, env: Optional[Dict[str, str]] = None,
+          new_group: bool = False, stderr_fd: Optional[int] = None) -> int:
+    """Start ``path`` and return its pid; ``None`` fds are inherited.
+    
+    With ``new_group`` the child leads its own process group, so Ctrl+C at
+    the terminal does not reach it and the group can be signalled as a unit.
+    """
+    env = dict(os.environ) if env is None else env
+    if hasattr(os, "posix_spawn"):
+        actions = []
+        if stdin_fd is not None and stdin_fd != 0:
+            actions.append((os.POSIX_SPAWN_DUP2, stdin_fd, 0))
+        if stdout_fd is not None and stdout_fd != 1:
+            actions.append((os.POSIX_SPAWN_DUP2, stdout_fd, 1))
+        if stderr_fd is not None and stderr_fd != 2:
+            actions.append((os.POSIX_SPAWN_DUP2, stderr_fd, 2))
+        # Python ignores SIGPIPE, and ignored signals survive exec; restore the
+        # default so a child writing into a closed pipe stops like it would in sh.
+        kwargs = {"setpgroup": 0} if new_group else {}
+        return os.posix_spawn(path, argv, env, file_actions=actions,
+                              setsigdef=(signal.SIGPIPE,), **kwargs)
+
+    proc = subprocess.Popen(argv, executable=path, stdin=stdin_fd, stdout=stdout_fd,
+                            stderr=stderr_fd, env=env, close_fds=True, restore_signals=True,
+                            start_new_session=new_group)
+    _popen_children[proc.pid] = proc
+    return proc.pid
+
+
+def wait(pid: int) -> int:
+    """Wait for ``pid`` and return its exit code.
+
+    Ctrl+C reaches the child through the terminal's process group, so a
+    KeyboardInterrupt here just means we keep waiting for the child to exit.
+    """
+    proc = _popen_children.pop(pid, None)
+    while True:
+        try:
+            if proc is not None:
+                return proc.wait()
+            _, status = os.waitpid(pid, 0)
+            return exit_status(status)
+        except KeyboardInterrupt:
+            continue
+        except ChildProcessError:
+            return 0
+
@@ -0,0 +1,330 @@
+"""Byte-level search engine behind the ``grep`` built-in."""
+import itertools
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+from . import decompress
+
+# Files at least this large are scanned through mmap instead of read().
+MMAP_THRESHOLD = 1024 * 1024
+
+# Total bytes above which files are searched in worker processes, since the
+# regex engine holds the GIL and threads would only overlap I/O.
+PROCESS_POOL_THRESHOLD = 64 * 1024 * 1024
+
+# How much of a file is inspected for NUL bytes to decide it is binary.
+BINARY_SNIFF = 8192
+
+# Decompressed data is searched in blocks of about this size.
+STREAM_BLOCK = 1024 * 1024
+
+# ``search_files`` splits files into segments of about this size, so a
+# worker never sends back more than one segment's matches at a time.
+SEGMENT_SIZE = 1024 * 1024
+
+# What ``search_files`` reports per file: the matching lines, how many
+# lines match (grep -c) or whether any line matches (grep -l).
+LINES, COUNT, LIST = "lines", "count", "list"
+
+Match = Tuple[int, bytes]
+
+
+class BinaryFile(Exception):
+    """Raised when a file that looks binary contains a match."""
+
+
+def compile_patterns(patterns: List[str], regex: bool = False,
+                     ignore_case: bool = False) -> Pattern:
+    """Compile one or more patterns into a single bytes regex."""
+    parts = [p if regex else re.escape(p) for p in patterns]
+    source = "|".join(f"(?:{p})" for p in parts) if len(parts) > 1 else parts[0]
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    return re.compile(source.encode("utf-8"), flags)
+
+
+def _count_newlines(buf, start: int, end: int) -> int:
+    """Count newlines in ``buf[start:end]`` without copying a large mmap slice."""
+    if isinstance(buf, bytes):
+        return buf.count(b"\n", start, end)
+    total = 0
+    step = 1024 * 1024
+    for offset in range(start, end, step):
+        total += buf[offset:min(offset + step, end)].count(b"\n")
+    return total
+
+
+def scan(buf, matcher: Pattern, start: int = 0, end: Optional[int] = None) -> Iterator[Match]:
+    """Yield ``(line_number, line)`` for every line of ``buf`` that matches.
+
+    The regex runs over the whole buffer in C; line numbers are recovered by
+    counting newlines between matches, and only matching lines are sliced out.
+    ``start`` and ``end`` limit the search to the whole lines between them,
+    numbered from 1 at ``start``.
+    """
+    size = len(buf) if end is None else end
+    lineno = 1
+    counted = start
+    pos = start
+    while pos <= size:
+        m = matcher.search(buf, pos, size)
+        if m is None or (m.start() == size and size > start and buf[size - 1:size] == b"\n"):
+            return
+        line_start = max(buf.rfind(b"\n", start, m.start()) + 1, start)
+        line_end = buf.find(b"\n", m.start(), size)
+        if line_end < 0:
+            line_end = size
+        lineno += _count_newlines(buf, counted, line_start)
+        counted = line_start
+        yield lineno, bytes(buf[line_start:line_end])
+        pos = line_end + 1
+
+
+def count_lines(buf, matcher: Pattern, start: int = 0, end: Optional[int] = None) -> int:
+    """Count the lines of ``buf`` that match, like ``scan`` without slicing them out."""
+    end = len(buf) if end is None else end
+    count = 0
+    pos = start
+    while pos < end:
+        m = matcher.search(buf, pos, end)
+        if m is None:
+            break
+        count += 1
+        pos = buf.find(b"\n", m.start(), end) + 1
+        if not pos:
+            break
+    return count
+
+
+def scan_stream(f: BinaryIO, matcher: Pattern, block_size: int = STREAM_BLOCK) -> Iterator[Match]:
+    """``scan`` a stream that can't be mapped, one block of whole lines at a time."""
+    lineno = 0
+    carry = b""
+    while True:
+        chunk = f.read(block_size)
+        if not chunk:
+            break
+        block = carry + chunk
+        cut = block.rfind(b"\n") + 1
+        if not cut:
+            carry = block  # One long line; keep reading until it ends
+            continue
+        block, carry = block[:cut], block[cut:]
+        for i, line in scan(block, matcher):
+            yield lineno + i, line
+        lineno += block.count(b"\n")
+    if carry:
+        for i, line in scan(carry, matcher):
+            yield lineno + i, line
+
+
+def _refuse_binary(matches: Iterator[Match], path: str, binary: bool) -> Iterator[Match]:
+    for match in matches:
+        if binary:
+            raise BinaryFile(path)
+        yield match
+
+
+def _iter_stream_matches(f: BinaryIO, path: str, matcher: Pattern,
+                         allow_binary: bool) -> Iterator[Match]:
+    binary = not allow_binary and b"\0" in f.peek(BINARY_SNIFF)[:BINARY_SNIFF]
+    return _refuse_binary(scan_stream(f, matcher), path, binary)
+
+
+def iter_file_matches(path: str, matcher: Pattern, allow_binary: bool = False,
+                      decompress_input: bool = True) -> Iterator[Match]:
+    """Yield matching lines of a file.
+
+    Unless ``allow_binary`` is set, BinaryFile is raised on the first match
+    in a file that looks binary instead of yielding raw binary "lines".
+    Compressed files are searched as they are decompressed, unless
+    ``decompress_input`` is false.
+    """
+    with decompress.open_input(path, decompress_input) as f:
+        if decompress.is_compressed(f):
+            yield from _iter_stream_matches(f, path, matcher, allow_binary)
+            return
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        if size >= MMAP_THRESHOLD:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = f.read()
+        try:
+            binary = not allow_binary and b"\0" in buf[:BINARY_SNIFF]
+            yield from _refuse_binary(scan(buf, matcher), path, binary)
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+def _summarize(matches: Iterable[Match], mode: str):
+    if mode == COUNT:
+        return sum(1 for _ in matches)
+    if mode == LIST:
+        return any(True for _ in matches)
+    return list(matches)
+
+
+def _line_start(buf, offset: int) -> int:
+    """Start of the first line that begins at or after ``offset``."""
+    if offset <= 0:
+        return 0
+    if offset >= len(buf):
+        return len(buf)
+    return buf.find(b"\n", offset - 1) + 1 or len(buf)
+
+
+def search_segment(path: str, matcher: Pattern, index: int, segments: int, mode: str = LINES,
+                   allow_binary: bool = False, decompress_input: bool = True):
+    """Search segment ``index`` of ``segments`` of a file, for use in a worker pool.
+
+    Returns ``(newlines, result)``: the number of lines in the segment, and
+    its matches as ``(line_number, line)`` pairs numbered within the segment
+    (LINES), how many there are (COUNT) or whether there are any (LIST).
+    Compressed files can't be split: segment 0 counts or lists the whole
+    stream, and for LINES the result is None and the caller streams it.
+    """
+    with decompress.open_input(path, decompress_input) as f:
+        if decompress.is_compressed(f):
+            if mode == LINES:
+                return 0, None
+            if index:
+                return 0, _summarize((), mode)
+            return 0, _summarize(_iter_stream_matches(f, path, matcher, allow_binary), mode)
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0, _summarize((), mode)
+        if size >= MMAP_THRESHOLD:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = f.read()
+        try:
+            start = _line_start(buf, index * SEGMENT_SIZE)
+            end = size if index == segments - 1 else _line_start(buf, (index + 1) * SEGMENT_SIZE)
+            if start >= end:
+                return 0, _summarize((), mode)
+            binary = not allow_binary and b"\0" in buf[:BINARY_SNIFF]
+            if mode == COUNT:
+                count = count_lines(buf, matcher, start, end)
+                if count and binary:
+                    raise BinaryFile(path)
+                return 0, count
+            newlines = _count_newlines(buf, start, end) if mode == LINES else 0
+            return newlines, _summarize(
+                _refuse_binary(scan(buf, matcher, start, end), path, binary), mode)
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+def walk_files(paths: Iterable[str], recursive: bool) -> Iterator[str]:
+    """Expand directories into the regular files below them."""
+    for path in paths:
+        if recursive and os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def make_executor(files: List[str]) -> Executor:
+    """Pick a thread pool for I/O-bound searches and processes for big ones."""
+    total = 0
+    for path in files:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    workers = os.cpu_count() or 1
+    if total >= PROCESS_POOL_THRESHOLD and workers > 1:
+        # "spawn" avoids forking a process that has pipeline threads running.
+        return ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=min(32, workers + 4))
+
+
+def _segment_count(path: str) -> int:
+    try:
+        return max(1, -(-os.path.getsize(path) // SEGMENT_SIZE))
+    except OSError:
+        return 1  # The worker reports the error
+
+
+def _file_lines(path: str, results: Iterator, matcher: Pattern, allow_binary: bool,
+                decompress_input: bool) -> Iterator[Match]:
+    offset = 0
+    for newlines, matches in results:
+        if matches is None:  # Compressed; stream it here instead
+            yield from iter_file_matches(path, matcher, allow_binary, decompress_input)
+            return
+        for i, line in matches:
+            yield offset + i, line
+        offset += newlines
+
+
+def search_files(files: List[str], matcher: Pattern, mode: str = LINES,
+                 allow_binary: bool = False, decompress_input: bool = True):
+    """Search files in parallel, yielding ``(path, result, error)`` in order.
+
+    For LINES, ``result`` iterates over the file's ``(line_number, line)``
+    pairs and raises any OSError or BinaryFile itself; it must be used up
+    before the next file is asked for.  For COUNT and LIST it is the number
+    of matching lines or whether there are any, and ``error`` is the
+    exception raised while searching, if any.
+
+    Files are searched a segment at a time and only a bounded window of
+    segments is queued ahead of the consumer, so memory stays flat however
+    many lines match, and a caller that stops early (``grep x *.log | head``)
+    does not search the rest.
+    """
+    pool = make_executor(files)
+    window = 4 * (os.cpu_count() or 1)
+    tasks = ((n, path, index, segments)
+             for n, path in enumerate(files)
+             for segments in (_segment_count(path),)
+             for index in range(segments))
+    pending = deque()
+
+    def fill() -> None:
+        for n, path, index, segments in itertools.islice(tasks, window - len(pending)):
+            pending.append((n, pool.submit(search_segment, path, matcher, index, segments, mode,
+                                           allow_binary, decompress_input)))
+
+    def results(n: int) -> Iterator:
+        while pending and pending[0][0] == n:
+            future = pending.popleft()[1]
+            fill()
+            yield future.result()
+
+    try:
+        fill()
+        while pending:
+            n = pending[0][0]
+            path = files[n]
+            if mode == LINES:
+                yield path, _file_lines(path, results(n), matcher, allow_binary,
+                                        decompress_input), None
+            else:
+                result = error = None
+                try:
+                    if mode == COUNT:
+                        result = sum(count for _, count in results(n))
+                    else:
+                        result = any(found for _, found in results(n))
+                except (BinaryFile, OSError) as e:
+                    error = e
+                yield path, result, error
+            while pending and pending[0][0] == n:  # Segments the consumer didn't need
+                pending.popleft()[1].cancel()
+                fill()
+    finally:
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
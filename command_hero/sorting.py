@@ -0,0 +1,169 @@
+"""External merge sort used by the ``sort`` built-in.
+
+Input is cut into runs that fit in a memory budget.  Each run is sorted
+(in worker processes when several cores are available) and spilled to a
+temporary file, then the runs are k-way merged with ``heapq.merge``.  Input
+that fits in the budget is sorted in memory without touching the disk.
+"""
+import heapq
+import os
+import re
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Iterable, Iterator, List, Optional
+
+# Default memory budget for buffered lines, overridable with ``sort -S``.
+DEFAULT_BUFFER_SIZE = 64 * 1024 * 1024
+
+# Rough per-line cost of a str object on top of its characters.
+LINE_OVERHEAD = 56
+
+# Maximum number of runs merged at once; more runs are merged in passes.
+MAX_MERGE_FAN_IN = 128
+
+# Input lines read between polls of ``should_stop``.
+STOP_CHECK_LINES = 65536
+
+_NUMBER = re.compile(r"\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+))")
+_SIZE_SUFFIXES = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """Parse a buffer size such as ``512K``, ``100M`` or ``2G``."""
+    text = text.strip().upper().rstrip("B")
+    suffix = text[-1:] if text[-1:] in _SIZE_SUFFIXES else ""
+    number = text[:-1] if suffix else text
+    return int(float(number) * _SIZE_SUFFIXES[suffix])
+
+
+class SortKey:
+    """Picklable key function for ``-n``, ``-k`` and ``-t``."""
+
+    def __init__(self, numeric: bool = False, start_field: Optional[int] = None,
+                 end_field: Optional[int] = None, separator: Optional[str] = None):
+        self.numeric = numeric
+        self.start_field = start_field
+        self.end_field = end_field
+        self.separator = separator
+
+    def __call__(self, line: str):
+        if self.start_field is not None:
+            fields = line.split(self.separator)
+            picked = fields[self.start_field - 1:self.end_field]
+            line = (self.separator or " ").join(picked)
+        if self.numeric:
+            m = _NUMBER.match(line)
+            return float(m.group(1)) if m else 0.0
+        return line
+
+
+def _sort_run(lines: List[str], key: Optional[Callable], reverse: bool, path: str) -> str:
+    """Sort one run and write it to ``path``."""
+    lines.sort(key=key, reverse=reverse)
+    with open(path, "w", encoding="utf-8", errors="surrogateescape") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+    return path
+
+
+def _read_run(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            yield line[:-1]
+
+
+def _merge(paths: List[str], key, reverse: bool) -> Iterator[str]:
+    return heapq.merge(*(_read_run(p) for p in paths), key=key, reverse=reverse)
+
+
+def _unique(lines: Iterator[str], key) -> Iterator[str]:
+    previous = object()
+    for line in lines:
+        k = key(line) if key else line
+        if k != previous:
+            yield line
+            previous = k
+
+
+def sort_lines(lines: Iterable[str], key: Optional[Callable] = None,
+               reverse: bool = False, unique: bool = False,
+               buffer_size: int = DEFAULT_BUFFER_SIZE,
+               should_stop: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+    """Yield ``lines`` (without trailing newlines) in sorted order.
+
+    ``should_stop`` is polled while input is read and runs are merged; once
+    it is true nothing more is yielded and the temporary runs are removed.
+    """
+    workers = os.cpu_count() or 1
+    # Runs sorted concurrently share the budget between them.
+    run_budget = max(1, buffer_size // workers)
+    tmpdir: Optional[str] = None
+    pool: Optional[ProcessPoolExecutor] = None
+    pending: deque = deque()
+    runs: List[str] = []
+    buf: List[str] = []
+    used = 0
+
+    def spill():
+        nonlocal tmpdir, pool
+        if tmpdir is None:
+            tmpdir = tempfile.mkdtemp(prefix="hero-sort-")
+            if workers > 1:
+                pool = ProcessPoolExecutor(max_workers=workers,
+                                           mp_context=get_context("spawn"))
+        path = os.path.join(tmpdir, f"run{len(runs) + len(pending)}")
+        if pool is None:
+            runs.append(_sort_run(buf, key, reverse, path))
+            return
+        while len(pending) >= workers:
+            runs.append(pending.popleft().result())
+        pending.append(pool.submit(_sort_run, buf, key, reverse, path))
+
+    try:
+        for count, line in enumerate(lines, 1):
+            buf.append(line)
+            used += len(line) + LINE_OVERHEAD
+            if should_stop is not None and not count % STOP_CHECK_LINES and should_stop():
+                return
+            if used >= run_budget:
+                spill()
+                buf, used = [], 0
+
+        if tmpdir is None:
+            buf.sort(key=key, reverse=reverse)
+            merged: Iterator[str] = iter(buf)
+        else:
+            if buf:
+                spill()
+                buf = []
+            while pending:
+                runs.append(pending.popleft().result())
+            # Merge in passes so the number of open files stays bounded.
+            passes = 0
+            while len(runs) > MAX_MERGE_FAN_IN:
+                if should_stop is not None and should_stop():
+                    return
+                group, runs = runs[:MAX_MERGE_FAN_IN], runs[MAX_MERGE_FAN_IN:]
+                passes += 1
+                path = os.path.join(tmpdir, f"merge{passes}")
+                with open(path, "w", encoding="utf-8", errors="surrogateescape") as f:
+                    for line in _merge(group, key, reverse):
+                        f.write(line)
+                        f.write("\n")
+                for old in group:
+                    os.remove(old)
+                runs.append(path)
+            merged = _merge(runs, key, reverse)
+
+        yield from (_unique(merged, key) if unique else merged)
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
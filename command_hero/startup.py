@@ -0,0 +1,70 @@
+"""Startup measurements for ``cli.py --startup-profile`` and the budget test.
+
+Everything is measured in a fresh interpreter, since a warm process has
+already paid for its imports.  "Cold start" here is the time to import
+``command_hero`` and build a non-interactive CommandHero, which is the
+shell's own share of running ``cli.py -c ...``.
+"""
+import os
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+# Cold start budget in milliseconds, checked by tests/test_startup.py.
+STARTUP_BUDGET_MS = 40.0
+
+_START = "from command_hero import CommandHero; CommandHero(interactive=False)"
+
+_TIMED = ("import time; t = time.perf_counter(); " + _START +
+          "; print((time.perf_counter() - t) * 1000)")
+
+_MODULES = "import sys; " + _START + "; print('\\n'.join(sorted(sys.modules)))"
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    """Run the current interpreter with the package importable."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    return subprocess.run([sys.executable, *args], env=env, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+def cold_start_ms(runs: int = 5) -> float:
+    """Best of ``runs`` cold starts, in milliseconds."""
+    return min(float(_python("-c", _TIMED).stdout) for _ in range(runs))
+
+
+def startup_modules() -> List[str]:
+    """Names of all modules loaded once the shell has started."""
+    return _python("-c", _MODULES).stdout.split()
+
+
+def import_times() -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every import made at startup.
+
+    Parsed from ``python -X importtime`` and sorted by cumulative time.
+    """
+    times = []
+    for line in _python("-X", "importtime", "-c", _START).stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = [f.strip() for f in line[len("import time:"):].split("|")]
+        if fields[0].isdigit():
+            times.append((fields[2], int(fields[0]), int(fields[1])))
+    times.sort(key=lambda t: t[2], reverse=True)
+    return times
+
+
+def report(total: Optional[float] = None, top: int = 20) -> str:
+    """Human-readable startup profile: total, budget and slowest imports."""
+    if total is None:
+        total = cold_start_ms()
+    verdict = "ok" if total <= STARTUP_BUDGET_MS else "OVER BUDGET"
+    lines = [f"cold start: {total:.1f} ms (budget {STARTUP_BUDGET_MS:.0f} ms, {verdict})",
+             f"modules loaded: {len(startup_modules())}",
+             "",
+             f"{'self ms':>8} {'cumul ms':>9}  module"]
+    for name, self_us, cumulative_us in import_times()[:top]:
+        lines.append(f"{self_us / 1000:8.1f} {cumulative_us / 1000:9.1f}  {name}")
+    return "\n".join(lines)
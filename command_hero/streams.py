@@ -0,0 +1,183 @@
+"""Per-thread standard streams used to connect built-ins together.
+
+Built-ins write with plain ``print()`` and read piped input from
+``piped_stdin()``.  While a pipeline runs, ``sys.stdout``, ``sys.stderr``
+and ``sys.stdin`` are replaced by proxies that forward to whatever stream is
+bound to the calling thread, so every stage can run on its own thread with
+its own pipe or redirected file.
+"""
+import io
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+# Size of the userspace buffer in front of each pipe end.
+PIPE_BUFFER = 64 * 1024
+
+# Output to a redirected file is written out in batches of this size.
+FILE_BUFFER = 256 * 1024
+
+# Color and cursor control sequences, dropped from output to a file.
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+
+class _ThreadStream:
+    """File-like proxy that forwards to the stream bound to the current thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._fallback: Optional[IO] = None
+
+    def current(self) -> Optional[IO]:
+        return getattr(self._local, "stream", None) or self._fallback
+
+    def bound(self) -> Optional[IO]:
+        return getattr(self._local, "stream", None)
+
+    def _bind(self, stream: Optional[IO]) -> Optional[IO]:
+        previous = getattr(self._local, "stream", None)
+        self._local.stream = stream
+        return previous
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
+    def __iter__(self):
+        return iter(self.current())
+
+
+stdout = _ThreadStream()
+stderr = _ThreadStream()
+stdin = _ThreadStream()
+
+_install_lock = threading.Lock()
+_install_count = 0
+
+
+@contextmanager
+def installed() -> Iterator[None]:
+    """Swap the thread-aware proxies into ``sys`` for the duration of the block."""
+    global _install_count
+    with _install_lock:
+        if _install_count == 0:
+            stdout._fallback, sys.stdout = sys.stdout, stdout
+            stderr._fallback, sys.stderr = sys.stderr, stderr
+            stdin._fallback, sys.stdin = sys.stdin, stdin
+        _install_count += 1
+    try:
+        yield
+    finally:
+        with _install_lock:
+            _install_count -= 1
+            if _install_count == 0:
+                # The fallbacks stay set: another thread (a background job
+                # finishing, say) may still hold the proxy it read from sys.
+                sys.stdout = stdout._fallback
+                sys.stderr = stderr._fallback
+                sys.stdin = stdin._fallback
+
+
+@contextmanager
+def bound(stdin_stream: Optional[IO] = None, stdout_stream: Optional[IO] = None,
+          stderr_stream: Optional[IO] = None) -> Iterator[None]:
+    """Bind streams to the current thread; ``None`` keeps the inherited one."""
+    with installed():
+        prev_in = stdin._bind(stdin_stream) if stdin_stream is not None else None
+        prev_out = stdout._bind(stdout_stream) if stdout_stream is not None else None
+        prev_err = stderr._bind(stderr_stream) if stderr_stream is not None else None
+        try:
+            yield
+        finally:
+            if stderr_stream is not None:
+                stderr._bind(prev_err)
+            if stdout_stream is not None:
+                stdout._bind(prev_out)
+            if stdin_stream is not None:
+                stdin._bind(prev_in)
+
+
+def current_stdout() -> IO:
+    """The stream the current thread's output really goes to, not the proxy."""
+    return stdout.current() if sys.stdout is stdout else sys.stdout
+
+
+def piped_stdin() -> Optional[IO]:
+    """Return the input stream piped into the current command, if any."""
+    if sys.stdin is not stdin:
+        return None
+    return stdin.bound()
+
+
+def open_pipe():
+    """Create a (reader, writer) pair of text streams over an OS pipe."""
+    r, w = os.pipe()
+    reader = io.open(r, "r", encoding="utf-8", errors="replace", newline="")
+    writer = io.open(w, "w", encoding="utf-8", errors="replace", newline="",
+                     buffering=PIPE_BUFFER)
+    return reader, writer
+
+
+class FileWriter:
+    """Text stream for ``>``, ``>>`` and ``2>`` targets.
+
+    Text is encoded into one large buffer that is written out in batches,
+    instead of a system call per ``print()``; color codes are dropped
+    unless the target is a terminal.  ``fileno()`` is offered so that
+    ``cat`` and external programs can write to the file directly once the
+    buffer has been flushed.
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        flags = (os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC)
+                 | getattr(os, "O_CLOEXEC", 0))
+        self.name = path
+        self._fd = os.open(path, flags, 0o666)
+        self._tty = os.isatty(self._fd)
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        data = text if self._tty or "\x1b" not in text else _ANSI_ESCAPE.sub("", text)
+        with self._lock:
+            self._buffer += data.encode("utf-8", errors="replace")
+            if len(self._buffer) >= FILE_BUFFER:
+                self._drain()
+        return len(text)
+
+    def _drain(self) -> None:
+        while self._buffer:
+            del self._buffer[:os.write(self._fd, self._buffer)]
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._buffer:
+                self._drain()
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def isatty(self) -> bool:
+        return self._tty
+
+    def writable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        try:
+            self.flush()
+        finally:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def close_quietly(stream: IO) -> None:
+    """Close a pipe end, ignoring errors from a reader that already went away."""
+    try:
+        stream.close()
+    except (BrokenPipeError, OSError, ValueError):
+        pass
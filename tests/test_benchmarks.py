@@ -0,0 +1,29 @@
+"""Checks for the benchmark harness itself, on the tiny preset."""
+import copy
+
+from benchmarks import harness, workloads
+
+
+def test_run_and_compare(tmp_path):
+    paths = workloads.ensure(str(tmp_path / "tiny"), "tiny", log=lambda msg: None)
+    current = harness.run(paths, ["wc", "tail"], repeat=1, log=lambda msg: None)
+
+    for name in ("wc", "tail"):
+        result = current["results"][name]
+        assert result["wall"] > 0
+        assert result["rss_kb"] > 0
+
+    assert harness.compare(current, current) == []
+
+    slower = copy.deepcopy(current)
+    slower["results"]["wc"]["wall"] += 1.0
+    regressions = harness.compare(slower, current, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("wc: wall")
+
+
+def test_workloads_are_reused(tmp_path):
+    workdir = str(tmp_path / "tiny")
+    workloads.ensure(workdir, "tiny", log=lambda msg: None)
+    generated = []
+    workloads.ensure(workdir, "tiny", log=generated.append)
+    assert generated == []
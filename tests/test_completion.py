@@ -0,0 +1,42 @@
+"""Tests for tab completion in command_hero/core.py."""
+import sys
+import types
+
+import pytest
+
+from command_hero import CommandHero
+
+
+@pytest.fixture
+def hero(tmp_path, monkeypatch):
+    for path in ("src/pkg/a.py", "src/b.py", "setup.py", ".hidden"):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HERO_TEST_VAR", "1")
+    return CommandHero(interactive=False)
+
+
+def test_commands_paths_and_variables(hero):
+    assert {"cat", "cd", "cp"} <= set(hero._complete("", "c"))
+    assert "grep" in hero._complete("cat f | ", "gr")
+    assert hero._complete("cat ", "s") == ["setup.py", "src/"]
+    assert hero._complete("cat ", "src/p") == ["src/pkg/"]
+    assert hero._complete("cat ", "") == ["setup.py", "src/"]
+    assert hero._complete("cat ", ".h") == [".hidden"]
+    assert hero._complete("echo ", "$HERO_TEST") == ["$HERO_TEST_VAR"]
+
+
+def test_candidates_are_computed_once_per_completion(hero, monkeypatch):
+    line = "cat s"
+    monkeypatch.setitem(sys.modules, "readline", types.SimpleNamespace(
+        get_line_buffer=lambda: line, get_begidx=lambda: 4))
+    calls = []
+    complete = hero._complete
+    monkeypatch.setattr(hero, "_complete", lambda *a: calls.append(a) or complete(*a))
+
+    assert [hero._completer("s", state) for state in range(3)] == ["setup.py", "src/", None]
+    assert len(calls) == 1
+    line = "cat sr"
+    assert hero._completer("sr", 0) == "src/"
+    assert len(calls) == 2
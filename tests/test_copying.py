@@ -0,0 +1,72 @@
+"""Tests for the copy engine in command_hero/copying.py."""
+import os
+
+import pytest
+
+from command_hero import CommandHero, copying
+
+
+@pytest.fixture
+def data(tmp_path):
+    path = tmp_path / "data"
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    return path
+
+
+@pytest.mark.parametrize("methods", ["default", "sendfile", "loop"])
+def test_copy_data_through_each_method(data, tmp_path, monkeypatch, methods):
+    if methods != "default":
+        monkeypatch.setattr(copying, "_clone", lambda src_fd, dst_fd: False)
+        kept = [copying._sendfile] if methods == "sendfile" else []
+        monkeypatch.setattr(copying, "_KERNEL_METHODS",
+                            [m for m in copying._KERNEL_METHODS if m in kept])
+    monkeypatch.setattr(copying, "CHUNK_SIZE", 1024 * 1024)
+    reported = []
+    target = tmp_path / "copy"
+    assert copying.copy_file(str(data), str(target), progress=reported.append) == \
+        data.stat().st_size
+    assert target.read_bytes() == data.read_bytes()
+    assert sum(reported) == data.stat().st_size
+    assert target.stat().st_mtime_ns == data.stat().st_mtime_ns
+
+
+def test_copy_tree_in_parallel(tmp_path, monkeypatch):
+    monkeypatch.setattr(copying, "LARGE_FILE", 1000)
+    src = tmp_path / "src"
+    for i in range(40):
+        path = src / f"d{i % 4}" / f"f{i}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes([i]) * (i * 50))
+    (src / "d0" / "link").symlink_to("f0")
+    (src / "d1").chmod(0o555)
+    try:
+        result = copying.copy([(str(src), str(tmp_path / "dst"))], workers=4)
+        assert result.errors == [] and result.files == 40
+        for path in src.rglob("*"):
+            copy = tmp_path / "dst" / path.relative_to(src)
+            if path.is_symlink():
+                assert os.readlink(copy) == "f0"
+            elif path.is_file():
+                assert copy.read_bytes() == path.read_bytes()
+        assert (tmp_path / "dst" / "d1").stat().st_mode & 0o777 == 0o555
+
+        again = copying.copy([(str(src), str(tmp_path / "dst"))], update=True)
+        assert again.files == 0 and again.skipped == 40
+    finally:
+        (src / "d1").chmod(0o755)
+        (tmp_path / "dst" / "d1").chmod(0o755)
+
+
+def test_cp_checks_its_sources(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "f").write_text("x")
+    hero = CommandHero(interactive=False)
+
+    assert hero.run_line("cp missing out") == 1
+    assert "cp: missing: No such file or directory" in capsys.readouterr().err
+    assert hero.run_line("cp dir out") == 1
+    assert "omitting directory 'dir'" in capsys.readouterr().err
+    assert not (tmp_path / "out").exists()
+    assert hero.run_line("cp -r dir out") == 0
+    assert (tmp_path / "out" / "f").read_text() == "x"
@@ -0,0 +1,77 @@
+"""Tests for transparent decompression in command_hero/decompress.py."""
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from command_hero import CommandHero, decompress
+
+TEXT = b"".join(b"line %d\n" % i for i in range(2000))
+
+FORMATS = {"gzip": gzip.compress, "bz2": bz2.compress, "xz": lzma.compress}
+
+
+@pytest.fixture
+def archives(tmp_path):
+    paths = {"plain": tmp_path / "plain.log"}
+    paths["plain"].write_bytes(TEXT)
+    for name, compress in FORMATS.items():
+        # Named .log on purpose: the format is told by magic bytes, not the suffix
+        paths[name] = tmp_path / f"{name}.log"
+        paths[name].write_bytes(compress(TEXT))
+    return paths
+
+
+def test_formats_are_detected_and_read(archives):
+    for name, path in archives.items():
+        with decompress.open_input(str(path)) as f:
+            assert decompress.is_compressed(f) == (name != "plain")
+            assert getattr(f.raw, "format", "plain") == name
+            assert f.read() == TEXT, name
+        with decompress.open_input(str(path), decompress=False) as f:
+            assert not decompress.is_compressed(f)
+            assert f.read() == path.read_bytes()
+
+
+def test_corrupt_archives_raise_corrupt_archive(tmp_path):
+    path = tmp_path / "cut.gz"
+    path.write_bytes(gzip.compress(TEXT)[:200])
+    with decompress.open_input(str(path)) as f:
+        with pytest.raises(decompress.CorruptArchive) as raised:
+            f.read()
+    assert "corrupt gzip data" in str(raised.value)
+
+
+def test_open_many_keeps_order_and_reports_errors(archives, tmp_path):
+    paths = [str(p) for p in archives.values()] + ["-", str(tmp_path / "missing")]
+    seen = []
+    for path, f, error in decompress.open_many(paths, read_ahead=2):
+        if f is not None:
+            with f:
+                assert f.read() == TEXT
+        seen.append((path, f is None, type(error).__name__ if error else None))
+    assert seen == [(p, False, None) for p in paths[:4]] + \
+        [("-", True, None), (paths[-1], True, "FileNotFoundError")]
+
+
+def test_open_many_closes_files_it_read_ahead(archives):
+    many = decompress.open_many([str(archives[name]) for name in FORMATS], read_ahead=2)
+    path, f, _ = next(many)
+    f.close()
+    many.close()
+
+
+def test_commands_read_archives(archives, monkeypatch, capsys):
+    monkeypatch.chdir(archives["plain"].parent)
+    hero = CommandHero(interactive=False)
+    for command, expected in [("cat gzip.log", TEXT.decode()),
+                              ("head bz2.log 2", "line 0\nline 1\n"),
+                              ("tail xz.log 1", "line 1999\n"),
+                              ("grep -c 'line 1999' xz.log", "xz.log:1\n"),
+                              ("wc -l gzip.log", "2000 gzip.log\n")]:
+        hero.run_line(command)
+        out = capsys.readouterr().out
+        assert out.split() == expected.split(), command
+    hero.run_line("wc -c -z gzip.log")
+    assert capsys.readouterr().out.split()[0] == str(archives["gzip"].stat().st_size)
@@ -0,0 +1,81 @@
+"""Tests for the deletion engine in command_hero/deleting.py."""
+import os
+
+import pytest
+
+from command_hero import deleting
+
+
+def make_tree(root, width=3, depth=3):
+    os.makedirs(root)
+    files = dirs = 0
+    pending = [(root, 0)]
+    while pending:
+        path, level = pending.pop()
+        for i in range(width):
+            with open(os.path.join(path, f"f{i}"), "wb") as f:
+                f.write(b"x" * (i + 1))
+            files += 1
+        if level < depth:
+            for i in range(width):
+                sub = os.path.join(path, f"d{i}")
+                os.mkdir(sub)
+                dirs += 1
+                pending.append((sub, level + 1))
+    return files, dirs + 1
+
+
+def test_removes_trees_and_files(tmp_path):
+    files, dirs = make_tree(str(tmp_path / "tree"))
+    (tmp_path / "loose").write_text("x")
+    result = deleting.remove([str(tmp_path / "tree"), str(tmp_path / "loose")], workers=4)
+    assert result.errors == []
+    assert (result.files, result.dirs) == (files + 1, dirs)
+    assert os.listdir(tmp_path) == []
+
+
+def test_dry_run_counts_without_removing(tmp_path):
+    files, dirs = make_tree(str(tmp_path / "tree"), width=2, depth=4)
+    result = deleting.remove([str(tmp_path / "tree")], dry_run=True, workers=4)
+    assert (result.files, result.dirs) == (files, dirs)
+    assert result.bytes == files // 2 * (1 + 2)
+    assert os.path.isdir(tmp_path / "tree" / "d0" / "d1")
+
+
+def test_symlinks_inside_the_tree_are_not_followed(tmp_path):
+    outside = tmp_path / "outside"
+    (outside / "sub").mkdir(parents=True)
+    (outside / "sub" / "keep").write_text("x")
+    (tmp_path / "tree" / "a").mkdir(parents=True)
+    os.symlink(str(outside), str(tmp_path / "tree" / "a" / "dirlink"))
+    os.symlink(str(outside / "sub" / "keep"), str(tmp_path / "tree" / "filelink"))
+
+    result = deleting.remove([str(tmp_path / "tree")])
+    assert result.errors == []
+    assert not os.path.lexists(tmp_path / "tree")
+    assert (outside / "sub" / "keep").exists()
+
+
+@pytest.mark.skipif(not deleting._FD_BASED, reason="needs dir_fd support")
+def test_parent_swapped_for_a_symlink_is_not_followed(tmp_path, monkeypatch):
+    outside = tmp_path / "outside"
+    (outside / "b").mkdir(parents=True)
+    (outside / "b" / "keep").write_text("x")
+    tree = tmp_path / "tree"
+    (tree / "a" / "b").mkdir(parents=True)
+    (tree / "a" / "b" / "victim").write_text("x")
+
+    clear_dir = deleting._clear_dir
+
+    def swap_after_listing(fd, path, result):
+        subdirs = clear_dir(fd, path, result)
+        if path == str(tree / "a"):
+            # a is listed; now point its name at a directory outside the tree
+            os.rename(str(tree / "a"), str(tmp_path / "moved"))
+            os.symlink(str(outside), str(tree / "a"))
+        return subdirs
+
+    monkeypatch.setattr(deleting, "_clear_dir", swap_after_listing)
+    deleting.remove([str(tree)], workers=1)
+    assert (outside / "b" / "keep").exists()
+    assert not (tmp_path / "moved" / "b").exists()
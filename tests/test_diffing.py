@@ -0,0 +1,90 @@
+"""Tests for the line diff engine in command_hero/diffing.py."""
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from command_hero import diffing
+
+
+def random_pair(rng: random.Random):
+    """Two related files: random edits to lines drawn from a small vocabulary."""
+    vocabulary = [f"line {i}\n".encode() for i in range(rng.choice([3, 20, 500]))]
+    a = [rng.choice(vocabulary) for _ in range(rng.randint(0, 300))]
+    b = list(a)
+    for _ in range(rng.randint(0, 30)):
+        pos = rng.randint(0, len(b))
+        op = rng.random()
+        if op < 0.4:
+            b[pos:pos] = [rng.choice(vocabulary) for _ in range(rng.randint(1, 5))]
+        elif op < 0.8:
+            del b[pos:pos + rng.randint(1, 5)]
+        else:
+            b[pos:pos + 1] = [f"new {rng.random()}\n".encode()]
+    if b and rng.random() < 0.2:
+        b[-1] = b[-1].rstrip(b"\n")  # No newline at end of file
+    return a, b
+
+
+def check_blocks(a, b, blocks):
+    i = j = 0
+    for bi, bj, n in blocks:
+        assert n > 0
+        assert bi >= i and bj >= j, "blocks overlap or go backwards"
+        assert a[bi:bi + n] == b[bj:bj + n]
+        i, j = bi + n, bj + n
+    assert i <= len(a) and j <= len(b)
+
+
+def test_matching_blocks_are_valid():
+    rng = random.Random(1)
+    for _ in range(300):
+        a, b = random_pair(rng)
+        ia, ib = diffing.intern(a, b)
+        check_blocks(a, b, diffing.matching_blocks(ia, ib))
+        # A tiny edit budget must still give a correct, if longer, diff
+        check_blocks(a, b, diffing.matching_blocks(ia, ib, max_cost=2))
+
+
+def test_identical_and_disjoint_inputs():
+    a = [b"x\n", b"y\n"]
+    assert diffing.matching_blocks(*diffing.intern(a, list(a))) == [(0, 0, 2)]
+    assert diffing.matching_blocks(*diffing.intern(a, [b"z\n"])) == []
+    assert diffing.count_changes([], 2, 1) == (1, 2)
+
+
+@pytest.mark.skipif(shutil.which("patch") is None, reason="patch(1) is not installed")
+def test_unified_output_applies_with_patch(tmp_path):
+    rng = random.Random(2)
+    old, new, out = tmp_path / "old", tmp_path / "new", tmp_path / "out"
+    for case in range(60):
+        a, b = random_pair(rng)
+        if a and not a[-1].endswith(b"\n"):
+            a[-1] += b"\n"
+        old.write_bytes(b"".join(a))
+        ia, ib = diffing.intern(a, b)
+        context = rng.choice([0, 1, 3])
+        hunks = list(diffing.unified(a, b, diffing.matching_blocks(ia, ib), context))
+        if not hunks:
+            assert a == b
+            continue
+        diff = "--- old\n+++ new\n" + "".join(line + "\n" for line in hunks)
+        (tmp_path / "d.patch").write_text(diff)
+        subprocess.run(["patch", "-s", "-o", str(out), str(old), str(tmp_path / "d.patch")],
+                       check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        assert out.read_bytes() == b"".join(b), f"case {case}:\n{diff}"
+
+
+def test_trees_compare_contents_not_timestamps(tmp_path):
+    for side in ("a", "b"):
+        (tmp_path / side).mkdir()
+    (tmp_path / "a" / "f").write_text("one\n")
+    (tmp_path / "b" / "f").write_text("two\n")
+    (tmp_path / "a" / "same").write_text("same\n")
+    (tmp_path / "b" / "same").write_text("same\n")
+    for path in tmp_path.glob("*/*"):
+        os.utime(path, ns=(10**18, 10**18))
+    assert list(diffing.compare_trees(str(tmp_path / "a"), str(tmp_path / "b"))) == \
+        [("differ", str(tmp_path / "a" / "f"), str(tmp_path / "b" / "f"))]
@@ -0,0 +1,75 @@
+"""Tests for the shared directory listing cache in command_hero/dircache.py."""
+import os
+
+from command_hero import dircache
+
+PAST = 1_000_000_000 * 10 ** 9
+
+
+def settle(directory, offset=0):
+    """Give a directory an old mtime, so its listing is trusted."""
+    os.utime(directory, ns=(PAST + offset, PAST + offset))
+
+
+def names(entries):
+    return [entry.name for entry in entries]
+
+
+def test_listings_are_revalidated_by_mtime(tmp_path):
+    (tmp_path / "b").write_text("")
+    (tmp_path / "a").write_text("")
+    cache = dircache.DirCache()
+
+    assert names(cache.listdir(str(tmp_path))) == ["a", "b"]
+    cache.listdir(str(tmp_path))
+    assert cache.misses == 2, "a listing within the racy window must not be trusted"
+
+    settle(tmp_path)
+    cache.listdir(str(tmp_path))
+    assert names(cache.listdir(str(tmp_path))) == ["a", "b"]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    (tmp_path / "c").write_text("")
+    settle(tmp_path, 1)
+    assert names(cache.listdir(str(tmp_path))) == ["a", "b", "c"]
+    (tmp_path / "a").unlink()
+    settle(tmp_path, 2)
+    assert names(cache.listdir(os.path.join(str(tmp_path), "."))) == ["b", "c"]
+
+
+def test_stat_results_expire(tmp_path):
+    (tmp_path / "f").write_text("x")
+    settle(tmp_path)
+    cache = dircache.DirCache(stat_ttl=60)
+    entry, = cache.listdir(str(tmp_path))
+    assert entry.stat().st_size == 1
+    (tmp_path / "f").write_text("longer")  # Rewritten in place: the directory is unchanged
+    assert entry.stat().st_size == 1
+    cache.stat_ttl = 0
+    assert entry.stat().st_size == 6
+
+
+def test_least_recently_used_directories_are_dropped(tmp_path):
+    for name in ("d1", "d2", "d3"):
+        for i in range(3):
+            (tmp_path / name / str(i)).parent.mkdir(exist_ok=True)
+            (tmp_path / name / str(i)).write_text("")
+        settle(tmp_path / name)
+    cache = dircache.DirCache(max_entries=7)
+    for name in ("d1", "d2", "d1", "d3"):
+        cache.listdir(str(tmp_path / name))
+    assert cache.evictions == 1
+    cache.listdir(str(tmp_path / "d1"))
+    assert cache.stats()["hits"] == 2
+    cache.listdir(str(tmp_path / "d2"))
+    assert cache.stats()["entries"] <= 7
+
+
+def test_walk_is_top_down_and_sorted(tmp_path):
+    for path in ("b/x", "a/y/z", "c"):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("")
+    os.symlink(str(tmp_path / "a"), str(tmp_path / "link"))
+    walked = [(os.path.relpath(d, str(tmp_path)), names(e))
+              for d, e in dircache.DirCache().walk(str(tmp_path))]
+    assert walked == [(".", ["a", "b", "c", "link"]), ("a", ["y"]), ("a/y", ["z"]), ("b", ["x"])]
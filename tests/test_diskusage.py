@@ -0,0 +1,42 @@
+"""Tests for the du engine in command_hero/diskusage.py."""
+import os
+
+from command_hero import diskusage
+
+
+def test_sizes_follow_files_that_grow_in_place(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "f").write_bytes(b"x" * 10)
+    (tmp_path / "g").write_bytes(b"y" * 5)
+    root = str(tmp_path)
+    assert diskusage.directory_sizes(root)[root] == 15
+
+    with open(tmp_path / "sub" / "f", "ab") as f:
+        f.write(b"x" * 1000)
+    totals = diskusage.directory_sizes(root)
+    assert totals[root] == 1015
+    assert totals[os.path.join(root, "sub")] == 1010
+
+
+def test_cache_rescans_only_changed_directories(tmp_path):
+    tree = tmp_path / "tree"
+    (tree / "a").mkdir(parents=True)
+    (tree / "b").mkdir()
+    (tree / "a" / "f").write_bytes(b"x" * 10)
+    cache_path = str(tmp_path / "cache")
+    root = str(tree)
+
+    cache = diskusage.DiskUsageCache(cache_path).load()
+    assert diskusage.directory_sizes(root, cache)[root] == 10
+    cache.save()
+
+    (tree / "b" / "new").write_bytes(b"y" * 7)
+    cache = diskusage.DiskUsageCache(cache_path).load()
+    assert diskusage.directory_sizes(root, cache)[root] == 17
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_should_stop_ends_the_scan(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    totals = diskusage.directory_sizes(str(tmp_path), should_stop=lambda: True)
+    assert totals == {str(tmp_path): 0}
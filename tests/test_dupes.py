@@ -0,0 +1,48 @@
+"""Tests for the duplicate finder in command_hero/dupes.py."""
+import os
+
+from command_hero import dircache, dupes
+
+
+def make_tree(tmp_path):
+    body = os.urandom(3 * dupes.PARTIAL_SIZE)
+    for name in ("a", "b", "c"):
+        (tmp_path / name).write_bytes(body)
+    (tmp_path / "other").write_bytes(body[:-1] + b"!")
+    return str(tmp_path)
+
+
+def test_finds_and_links_duplicates(tmp_path):
+    root = make_tree(tmp_path)
+    report = dupes.find_duplicates(root, dircache.DirCache(), workers=2)
+    assert [[c[0] for c in copies] for _, copies in report.groups] == \
+        [[os.path.join(root, name) for name in ("a", "b", "c")]]
+
+    linked, freed, errors = dupes.link_duplicates(report)
+    assert (linked, freed, errors) == (2, 2 * 3 * dupes.PARTIAL_SIZE, [])
+    assert os.stat(tmp_path / "a").st_ino == os.stat(tmp_path / "c").st_ino
+    assert os.stat(tmp_path / "a").st_ino != os.stat(tmp_path / "other").st_ino
+
+
+def test_files_changed_after_hashing_are_not_linked(tmp_path):
+    root = make_tree(tmp_path)
+    report = dupes.find_duplicates(root, dircache.DirCache(), workers=2)
+
+    # Same size, different contents and mtime: a size check alone misses it
+    with open(tmp_path / "b", "r+b") as f:
+        f.write(b"changed")
+    os.utime(tmp_path / "b", ns=(0, 12345))
+    linked, _, errors = dupes.link_duplicates(report)
+    assert linked == 1
+    assert os.stat(tmp_path / "b").st_ino != os.stat(tmp_path / "a").st_ino
+    assert errors == [f"{os.path.join(root, 'b')}: changed since it was hashed, skipped"]
+
+
+
+def test_replaced_kept_copy_skips_its_group(tmp_path):
+    root = make_tree(tmp_path)
+    report = dupes.find_duplicates(root, dircache.DirCache(), workers=2)
+    os.rename(tmp_path / "other", tmp_path / "a")
+    linked, _, errors = dupes.link_duplicates(report)
+    assert linked == 0
+    assert errors == [f"{os.path.join(root, 'a')}: changed since it was hashed, group skipped"]
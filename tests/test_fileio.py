@@ -0,0 +1,112 @@
+"""Tests for the file reading helpers in command_hero/fileio.py."""
+import io
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from command_hero import CommandHero, fileio
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+
+
+def test_count_agrees_with_whole_file_counts():
+    rng = random.Random(2)
+    pieces = ["word", " ", "\n", "\t", "héllo", "日本", "  \n", "x"]
+    for _ in range(100):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+        data = text.encode("utf-8")
+        want = (data.count(b"\n"), len(data.split()), len(text), len(data))
+        for chunk_size in (1, 2, 3, 7, 1024):
+            assert fileio.count(io.BytesIO(data), chunk_size) == want, (text, chunk_size)
+
+
+def test_count_survives_invalid_utf8():
+    assert fileio.count(io.BytesIO(b"\xff\xfe a\n\x80"), 2) == (1, 3, 5, 6)
+
+
+def test_wc_columns_and_totals(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a").write_text("one two\nthree\n")
+    (tmp_path / "b").write_text("é\n")
+    hero = CommandHero(interactive=False)
+    hero.run_line("wc a b")
+    assert [line.split() for line in capsys.readouterr().out.splitlines()] == \
+        [["2", "3", "14", "a"], ["1", "1", "2", "b"], ["3", "4", "16", "total"]]
+    hero.run_line("wc -l -c b")
+    assert capsys.readouterr().out.split() == ["1", "3", "b"]
+
+
+def test_read_tail():
+    rng = random.Random(4)
+    for _ in range(100):
+        lines = [b"x" * rng.randint(0, 20) + b"\n" for _ in range(rng.randint(0, 30))]
+        data = b"".join(lines)
+        if data and rng.random() < 0.3:
+            data = data[:-1]  # No newline at the end
+        n = rng.randint(0, 35)
+        want = b"".join(data.splitlines(keepends=True)[-n:]) if n else b""
+        assert fileio.read_tail(io.BytesIO(data), n, block_size=rng.randint(1, 16)) == want
+
+
+def test_follow_survives_rotation_and_truncation(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("old\n")
+    out = []
+    stop = threading.Event()
+    follower = threading.Thread(target=fileio.follow,
+                                args=(str(log), log.stat().st_size, out.append, 0.01, stop.is_set))
+    follower.start()
+
+    def wait_for(text):
+        deadline = time.monotonic() + 5
+        while "".join(out) != text and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert "".join(out) == text
+
+    try:
+        with open(log, "a") as f:
+            f.write("one\n")
+        wait_for("one\n")
+        with open(log, "a") as f:
+            f.write("two\n")
+        log.rename(tmp_path / "app.log.1")  # Rotated: the rest of the old file, then the new one
+        log.write_text("three\n")
+        wait_for("one\ntwo\nthree\n")
+        log.write_text("")  # Truncated in place
+        time.sleep(0.05)
+        with open(log, "a") as f:
+            f.write("four\n")
+        wait_for("one\ntwo\nthree\nfour\n")
+    finally:
+        stop.set()
+        follower.join(5)
+    assert not follower.is_alive()
+
+
+def test_show_nonprinting_matches_cat_A():
+    lines = [b"a\tb\x01\x7f\n", b"\xc3\xa9\r\n", b"end"]
+    assert list(fileio.show_nonprinting(lines)) == \
+        [b"a^Ib^A^?$\n", b"M-CM-)^M$\n", b"end"]
+
+
+def test_cat_numbers_across_files_and_streams_raw_bytes(tmp_path):
+    (tmp_path / "a").write_bytes(b"one\n\xff\x00\n")
+    (tmp_path / "b").write_bytes(b"two")
+    dump = subprocess.run([sys.executable, CLI, "-c", "cat a b"], cwd=str(tmp_path),
+                          stdout=subprocess.PIPE, timeout=60).stdout
+    assert dump == b"one\n\xff\x00\ntwo"
+    numbered = subprocess.run([sys.executable, CLI, "-c", "cat -n -A a b"], cwd=str(tmp_path),
+                              stdout=subprocess.PIPE, timeout=60).stdout
+    assert numbered == b"     1\tone$\n     2\tM-^?^@$\n     3\ttwo"
+
+
+def test_cat_into_captured_output(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a").write_text("x\ty\n")
+    hero = CommandHero(interactive=False)
+    hero.run_line("cat -n a")
+    hero.run_line("cat -A a")
+    assert capsys.readouterr().out == "     1\tx\ty\nx^Iy$\n"
@@ -0,0 +1,62 @@
+"""Tests for pathname expansion in command_hero/globbing.py."""
+
+import pytest
+
+from command_hero import CommandHero, dircache, globbing
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    for path in ("a.txt", "b.txt", "c.log", ".hidden.txt", "src/x.py", "src/pkg/y.py",
+                 "src/pkg/deep/z.py", "src/.cache/w.py", "docs/readme.md"):
+        full = tmp_path / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text("")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_braces():
+    assert globbing.expand_braces("a{b,c}d") == ["abd", "acd"]
+    assert globbing.expand_braces("{a,b{1,2}}x") == ["ax", "b1x", "b2x"]
+    assert globbing.expand_braces("{1..3}") == ["1", "2", "3"]
+    assert globbing.expand_braces("{5..1..2}") == ["5", "3", "1"]
+    assert globbing.expand_braces("{a..c}") == ["a", "b", "c"]
+    assert globbing.expand_braces("{}") == ["{}"]
+    assert globbing.expand_braces("{x}{a,b}") == ["{x}a", "{x}b"]
+    assert globbing.expand_braces("{a,b") == ["{a,b"]
+
+
+def test_wildcards(tree):
+    assert globbing.expand("*.txt") == ["a.txt", "b.txt"]
+    assert globbing.expand(".*.txt") == [".hidden.txt"]
+    assert globbing.expand("?.[lt][ox][gt]") == ["a.txt", "b.txt", "c.log"]
+    assert globbing.expand("*/") == ["docs/", "src/"]
+    assert globbing.expand("src/*/*.py") == ["src/pkg/y.py"]
+    assert globbing.expand("*.{txt,log}") == ["a.txt", "b.txt", "c.log"]
+
+
+def test_recursive(tree):
+    assert globbing.expand("**/*.py") == \
+        ["src/pkg/deep/z.py", "src/pkg/y.py", "src/x.py"]
+    assert globbing.expand("src/**/z.py") == ["src/pkg/deep/z.py"]
+    assert globbing.expand("docs/**") == ["docs/readme.md"]
+    assert globbing.expand(str(tree / "src" / "**" / "y.py")) == [str(tree / "src/pkg/y.py")]
+
+
+def test_no_match_stays_literal(tree):
+    assert globbing.expand("*.none") == ["*.none"]
+    assert globbing.expand("{a,zz}.txt") == ["a.txt", "zz.txt"]
+    assert globbing.expand("plain") == ["plain"]
+
+
+def test_shared_listing_cache(tree):
+    cache = dircache.DirCache()
+    assert globbing.expand("**/*.py", cache.listdir) == globbing.expand("**/*.py")
+
+
+def test_quoted_words_are_not_expanded(tree, capsys):
+    hero = CommandHero(interactive=False)
+    hero.run_script(["echo *.txt '*.txt' \\*.txt \"{a,b}\" {a,b}",
+                     "set -f", "echo *.txt {a,b}"], "-c")
+    assert capsys.readouterr().out == "a.txt b.txt *.txt *.txt {a,b} a b\n*.txt {a,b}\n"
@@ -0,0 +1,43 @@
+"""Tests for background jobs in command_hero/jobs.py and the kill built-in."""
+import shutil
+
+import pytest
+
+from command_hero import CommandHero
+
+
+@pytest.fixture
+def hero(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "f").write_text("x\n")
+    shell = CommandHero(interactive=False)
+    yield shell
+    shell._jobs.cancel_all()
+
+
+def test_kill_0_and_stop_on_a_thread_job(hero, capsys):
+    hero.run_line("tail -f f &")
+    job = hero._jobs.get("%1")
+    assert hero.run_line("kill -0 %1") == 0
+    assert not job.cancelled
+    assert hero.run_line("kill -STOP %1") == 1
+    assert "no processes to stop" in capsys.readouterr().err
+    assert job.state == "Running"
+    assert hero.run_line("kill %1") == 0
+    assert job.done.wait(5)
+
+
+@pytest.mark.skipif(shutil.which("sleep") is None, reason="needs sleep(1)")
+def test_stop_and_continue_a_process_job(hero):
+    hero.run_line("sleep 30 &")
+    job = hero._jobs.get("%1")
+    for _ in range(100):
+        if job.pgids:
+            break
+        job.done.wait(0.05)
+    assert hero.run_line("kill -STOP %1") == 0
+    assert job.state == "Stopped"
+    assert hero.run_line("kill -CONT %1") == 0
+    assert job.state == "Running"
+    assert hero.run_line("kill %1") == 0
+    assert job.done.wait(5)
@@ -0,0 +1,67 @@
+"""Tests for the command line tokenizer in command_hero/lexer.py."""
+import random
+import shlex
+
+import pytest
+
+from command_hero import lexer
+
+
+def words(line, env=None):
+    return lexer.tokenize(line, (env or {}).get)
+
+
+def test_quoting_matches_shlex():
+    rng = random.Random(4)
+    pieces = ["a", "b c", "'x y'", '"q r"', '"a\\"b"', "\\ ", "\\\\", "''", '""', "'|'", '";"']
+    for _ in range(500):
+        line = "".join(rng.choice(pieces + [" "]) for _ in range(rng.randint(0, 8)))
+        assert words(line) == shlex.split(line, comments=False), line
+
+
+def test_operators_split_words_unless_quoted():
+    tokens = lexer.tokenize("cat a|grep 'x|y' && echo \"&&\";ls&")
+    assert tokens == ["cat", "a", "|", "grep", "x|y", "&&", "echo", "&&", ";", "ls", "&"]
+    assert [isinstance(t, lexer.Operator) for t in tokens] == \
+        [False, False, True, False, False, True, False, False, True, False, True]
+
+
+def test_redirections():
+    tokens = lexer.tokenize("cmd a2>f 2>err >>log 2>&1")
+    assert tokens == ["cmd", "a2", ">", "f", "2>", "err", ">>", "log", "2>&1"]
+    argv, redirects = lexer.split_redirects(tokens)
+    assert argv == ["cmd", "a2"]
+    assert redirects == [(">", "f"), ("2>", "err"), (">>", "log"), ("2>&1", None)]
+    with pytest.raises(ValueError):
+        lexer.split_redirects(lexer.tokenize("cmd >"))
+
+
+def test_variables_and_comments():
+    env = {"HOME": "/h", "EMPTY": "", "?": "1"}
+    assert words("echo $HOME ${HOME}x '$HOME' \"$HOME\" $?", env) == \
+        ["echo", "/h", "/hx", "$HOME", "/h", "1"]
+    assert words("echo $EMPTY \"$EMPTY\" $ 5$", env) == ["echo", "", "$", "5$"]
+    assert words("echo a#b # comment", env) == ["echo", "a#b"]
+
+
+def test_escapes_mark_words_quoted():
+    tokens = lexer.tokenize("ls \\*.txt *.txt '*'")
+    assert [t.quoted for t in tokens] == [False, True, False, True]
+
+
+def test_lists_and_pipelines():
+    tokens = lexer.tokenize("a | b && c || d ; e &")
+    items = lexer.split_list(tokens)
+    assert [(pipeline, op) for pipeline, op in items] == \
+        [(["a", "|", "b"], "&&"), (["c"], "||"), (["d"], ";"), (["e"], "&")]
+    assert lexer.split_pipeline(items[0][0]) == [["a"], ["b"]]
+
+    for bad in ("&& a", "a &&", "a ; ; b"):
+        with pytest.raises(ValueError):
+            lexer.split_list(lexer.tokenize(bad))
+    for bad in ("| a", "a |", "a | | b"):
+        with pytest.raises(ValueError):
+            lexer.split_pipeline(lexer.tokenize(bad))
+    for bad in ("echo 'open", 'echo "open', "echo \\"):
+        with pytest.raises(ValueError):
+            lexer.tokenize(bad)
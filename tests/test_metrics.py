@@ -0,0 +1,58 @@
+"""Tests for command statistics and timing in command_hero/metrics.py."""
+import re
+
+from command_hero import CommandHero, metrics
+
+ANSI = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def test_histogram_percentiles_within_a_factor_of_two():
+    hist = metrics.Histogram()
+    for ms in range(1, 101):
+        hist.record(ms / 1000, failed=ms % 10 == 0)
+    assert hist.count == 100 and hist.failures == 10
+    assert abs(hist.total - 5.05) < 1e-9 and hist.max == 0.1
+    assert 0.050 <= hist.percentile(50) <= 0.100
+    assert 0.099 <= hist.percentile(99) <= 0.1
+    assert metrics.Histogram().percentile(50) == 0.0
+    hist.record(10 ** 9)  # Beyond the last bucket
+    assert hist.buckets[-1] == 1
+
+
+def test_format_duration():
+    assert [metrics.format_duration(s) for s in (0.00085, 0.0123, 1.2)] == \
+        ["850us", "12.3ms", "1.20s"]
+
+
+def test_stopwatch_measures_cpu_and_memory():
+    with metrics.Stopwatch() as watch:
+        data = bytearray(32 * 1024 * 1024)
+        sum(range(200000))
+    del data
+    assert watch.real > 0 and watch.user + watch.sys > 0
+    assert watch.peak_rss_kb is None or watch.peak_rss_kb >= 32 * 1024
+
+
+def test_time_and_stats_commands(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "f").write_text("a\nb\n")
+    hero = CommandHero(interactive=False)
+    assert hero.run_line("time wc f") == 0
+    captured = capsys.readouterr()
+    assert captured.out.split() == ["2", "2", "4", "f"]
+    assert [line.split()[0] for line in captured.err.split("\n")[1:5]] == \
+        ["real", "user", "sys", "peak"]
+
+    hero.run_line("cat missing")
+    hero.run_line("cat f")
+    capsys.readouterr()
+    hero.run_line("stats")
+    out = ANSI.sub("", capsys.readouterr().out)
+    rows = {line.split()[0]: line.split() for line in out.splitlines()[1:]}
+    assert rows["cat"][1:3] == ["2", "1"] and rows["wc"][1:3] == ["1", "0"]
+    hero.run_line("stats cat")
+    assert "cat: 2 calls, 1 failed" in ANSI.sub("", capsys.readouterr().out)
+    hero.run_line("stats -r")
+    capsys.readouterr()
+    hero.run_line("stats")
+    assert "stats" in capsys.readouterr().out  # Only the stats call itself is left
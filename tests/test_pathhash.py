@@ -0,0 +1,65 @@
+"""Tests for the $PATH command table in command_hero/pathhash.py."""
+import os
+
+import pytest
+
+from command_hero import CommandHero, pathhash
+
+
+def make_tool(directory, name, executable=True):
+    path = directory / name
+    path.write_text("#!/bin/sh\n")
+    path.chmod(0o755 if executable else 0o644)
+    return str(path)
+
+
+@pytest.fixture
+def bins(tmp_path, monkeypatch):
+    first, second = tmp_path / "bin1", tmp_path / "bin2"
+    first.mkdir()
+    second.mkdir()
+    monkeypatch.setenv("PATH", os.pathsep.join([str(first), str(second)]))
+    return first, second
+
+
+def test_lookup_follows_path_order_and_changes(bins, monkeypatch):
+    first, second = bins
+    tool2 = make_tool(second, "tool")
+    make_tool(first, "notes", executable=False)
+    table = pathhash.CommandHash()
+    assert table.lookup("tool") == tool2
+    assert table.lookup("notes") is None
+
+    tool1 = make_tool(first, "tool")  # Shadows bin2/tool once the directory is rescanned
+    monkeypatch.setattr(pathhash, "REVALIDATE_INTERVAL", 0)
+    assert table.lookup_all("tool") == [tool1, tool2]
+    fresh = make_tool(second, "fresh")
+    assert table.lookup("fresh") == fresh
+
+    monkeypatch.setenv("PATH", str(second))
+    assert table.lookup("tool") == tool2
+    assert table.names("fr") == ["fresh"]
+
+
+def test_new_commands_are_found_on_a_miss(bins):
+    first, _ = bins
+    table = pathhash.CommandHash()
+    assert table.lookup("later") is None
+    later = make_tool(first, "later")
+    assert table.lookup("later") == later
+
+
+def test_hash_builtin(bins, capsys):
+    first, _ = bins
+    tool = make_tool(first, "tool")
+    hero = CommandHero(interactive=False)
+    hero.run_line("hash tool")
+    hero.run_line("hash tool")
+    capsys.readouterr()
+    hero.run_line("hash")
+    assert capsys.readouterr().out.splitlines()[1].split() == ["2", tool]
+    assert hero.run_line("hash missing") == 1
+    hero.run_line("hash -r")
+    capsys.readouterr()
+    hero.run_line("hash")
+    assert capsys.readouterr().out == "hash: hash table empty\n"
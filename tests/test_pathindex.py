@@ -0,0 +1,30 @@
+"""Tests for the find index in command_hero/pathindex.py."""
+import pytest
+
+from command_hero import CommandHero
+
+
+@pytest.fixture
+def hero(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    tree = tmp_path / "tree"
+    for path in ("a.py", "src/b.py", "src/pkg/c.py", "src/pkg/data.txt", "docs/src.md"):
+        full = tree / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text("")
+    monkeypatch.chdir(tree)
+    shell = CommandHero(interactive=False)
+    shell.run_line("updatedb .")
+    return shell
+
+
+@pytest.mark.parametrize("args", ["--regex '^\\./src'", "--regex 'pkg$'", "--regex '\\.py$' src",
+                                  "--regex '^src/pkg/' src", "'*.py'", "pkg src"])
+def test_index_finds_what_a_walk_finds(hero, capsys, args):
+    capsys.readouterr()
+    hero.run_line(f"find {args}")
+    walked = capsys.readouterr().out
+    hero.run_line(f"find --index {args}")
+    indexed = capsys.readouterr().out
+    assert walked
+    assert sorted(indexed.splitlines()) == sorted(walked.splitlines())
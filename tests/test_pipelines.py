@@ -0,0 +1,81 @@
+"""End-to-end checks of commands and pipelines, run through cli.py -c."""
+import os
+import signal
+import subprocess
+import sys
+import time
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+
+
+def hero(command: str, cwd: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, CLI, "-c", command], cwd=cwd,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, timeout=60)
+
+
+def test_stages_stop_quietly_when_downstream_exits(tmp_path):
+    (tmp_path / "big.log").write_text("".join(f"{i}\n" for i in range(300000)))
+    for command in ("cat big.log | grep 7 | head 20",
+                    "head big.log 100000 | head 1",
+                    "tail big.log 100000 | head 1",
+                    "find log . | head 1"):
+        result = hero(command, str(tmp_path))
+        assert result.stderr == "", command
+        assert result.stdout, command
+
+
+def test_background_jobs_do_not_queue(tmp_path):
+    start = time.perf_counter()
+    result = hero("\n".join(["sleep 0.5 &"] * 6 + ["wait"]), str(tmp_path))
+    assert result.returncode == 0
+    assert time.perf_counter() - start < 2.5
+
+
+def test_ctrl_c_stops_every_stage(tmp_path):
+    (tmp_path / "f").write_text("hello\n")
+    for command in ("tail -f f", "tail -f f | grep h", "tail -f f | cat | wc"):
+        child = subprocess.Popen([sys.executable, CLI, "-c", command], cwd=str(tmp_path),
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        time.sleep(1)
+        child.send_signal(signal.SIGINT)
+        child.communicate(timeout=10)
+        assert child.returncode == 130, command
+
+
+def test_every_operand_is_used(tmp_path):
+    (tmp_path / "a.log").write_text("a1\na2\n")
+    (tmp_path / "b.log").write_text("b1\nb2\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c").write_text("c")
+
+    assert hero("ls *.log", str(tmp_path)).stdout == "a.log\nb.log\n"
+    assert hero("ls sub a.log", str(tmp_path)).stdout == "a.log\n\nsub:\nc\n"
+    assert hero("head *.log 1", str(tmp_path)).stdout == "==> a.log <==\na1\n\n==> b.log <==\nb1\n"
+    assert hero("tail *.log 1", str(tmp_path)).stdout == "==> a.log <==\na2\n\n==> b.log <==\nb2\n"
+    assert [line.split("\t")[1] for line in hero("du *", str(tmp_path)).stdout.splitlines()] == \
+        ["a.log", "b.log", "sub"]
+
+
+def test_ls_reports_errors_on_stderr(tmp_path):
+    (tmp_path / "a.log").write_text("12345")
+    result = hero("ls -l a.log missing", str(tmp_path))
+    assert result.returncode == 1
+    assert "missing: No such file or directory" in result.stderr
+    fields = result.stdout.split()
+    assert fields[0].startswith("-rw") and fields[1] == "5" and fields[-1] == "a.log"
+
+
+def test_lists_and_pipelines(tmp_path):
+    (tmp_path / "f").write_text("apple\nbanana\ncherry\n")
+    assert hero("cat f | grep an | wc", str(tmp_path)).stdout.split() == ["1", "1", "7"]
+    assert hero("grep zzz f && echo yes || echo no; echo $?", str(tmp_path)).stdout == "no\n0\n"
+    assert hero("sort -r f | head 1 > out; cat out", str(tmp_path)).stdout == "cherry\n"
+
+
+def test_grep_colors_only_a_terminal(tmp_path):
+    (tmp_path / "a").write_text("x1\n")
+    (tmp_path / "b").write_text("x2\n")
+    for command in ("grep x a b", "grep x a b | cat", "grep -c x a b", "grep -l x a b | sort"):
+        assert "\x1b" not in hero(command, str(tmp_path)).stdout, command
+    assert hero("grep x a b | cat", str(tmp_path)).stdout == "a:1:x1\nb:1:x2\n"
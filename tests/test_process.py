@@ -0,0 +1,53 @@
+"""Tests for spawning external programs in command_hero/process.py."""
+import os
+import shutil
+import sys
+
+import pytest
+
+from command_hero import CommandHero, process
+
+SH = shutil.which("sh")
+pytestmark = pytest.mark.skipif(SH is None, reason="needs sh")
+
+
+def test_exit_status_and_signals():
+    assert process.wait(process.spawn(SH, ["sh", "-c", "exit 3"])) == 3
+    assert process.wait(process.spawn(SH, ["sh", "-c", "kill -TERM $$"])) == 128 + 15
+
+
+def test_descriptors_are_mapped_and_others_are_not_inherited(tmp_path):
+    r, w = os.pipe()
+    leaked_r, leaked_w = os.pipe()
+    err = os.open(tmp_path / "err", os.O_WRONLY | os.O_CREAT)
+    try:
+        pid = process.spawn(SH, ["sh", "-c", "echo out; echo err >&2; ls /proc/self/fd"],
+                            stdout_fd=w, stderr_fd=err, new_group=True)
+        os.close(w)
+        assert process.wait(pid) == 0
+        with os.fdopen(r) as out:
+            lines = out.read().split()
+    finally:
+        for fd in (leaked_r, leaked_w, err):
+            os.close(fd)
+    assert lines[0] == "out"
+    assert (tmp_path / "err").read_text() == "err\n"
+    if sys.platform.startswith("linux"):
+        assert str(leaked_w) not in lines[1:]
+
+
+def test_children_die_of_sigpipe(tmp_path):
+    r, w = os.pipe()
+    os.close(r)
+    try:
+        pid = process.spawn(SH, ["sh", "-c", "while :; do echo y; done"], stdout_fd=w)
+    finally:
+        os.close(w)
+    assert process.wait(pid) == 128 + 13
+
+
+def test_status_variable(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    hero = CommandHero(interactive=False)
+    hero.run_script(["sh -c 'exit 4'", "echo $?", "cat missing; echo $?", "echo $?"])
+    assert capsys.readouterr().out == "4\n1\n0\n"
@@ -0,0 +1,124 @@
+"""Tests for the grep engine in command_hero/search.py."""
+import gzip
+import io
+import os
+import random
+
+import pytest
+
+from command_hero import search
+
+
+@pytest.fixture
+def segmented(monkeypatch):
+    monkeypatch.setattr(search, "SEGMENT_SIZE", 64)
+
+
+@pytest.fixture
+def log(tmp_path):
+    rng = random.Random(5)
+    lines = [f"{i} {rng.choice(['error', 'ok', 'warn', ''])}" for i in range(500)]
+    path = tmp_path / "app.log"
+    path.write_text("\n".join(lines))  # No trailing newline
+    return str(path), lines
+
+
+def expected(lines, word):
+    return [(i, line.encode()) for i, line in enumerate(lines, start=1) if word in line]
+
+
+def test_segments_number_lines_across_the_whole_file(segmented, log, tmp_path):
+    path, lines = log
+    other = tmp_path / "other.log"
+    other.write_text("error\n")
+    matcher = search.compile_patterns(["error"])
+    results = [(p, list(matches), error)
+               for p, matches, error in search.search_files([path, str(other)], matcher)]
+    assert results == [(path, expected(lines, "error"), None),
+                       (str(other), [(1, b"error")], None)]
+
+
+def test_counts_and_lists_in_the_workers(segmented, log, tmp_path):
+    path, lines = log
+    empty = tmp_path / "empty"
+    empty.write_text("")
+    files = [path, str(empty), str(tmp_path / "missing")]
+    matcher = search.compile_patterns(["warn", "^1"], regex=True)
+    want = sum(1 for line in lines if "warn" in line or line.startswith("1"))
+
+    counts = list(search.search_files(files, matcher, search.COUNT))
+    assert counts[:2] == [(path, want, None), (str(empty), 0, None)]
+    assert isinstance(counts[2][2], FileNotFoundError)
+    listed = list(search.search_files(files, matcher, search.LIST))
+    assert [found for _, found, _ in listed[:2]] == [True, False]
+
+
+def test_compressed_files_are_searched_decompressed(segmented, log, tmp_path):
+    path, lines = log
+    archive = tmp_path / "app.log.gz"
+    archive.write_bytes(gzip.compress(open(path, "rb").read()))
+    files = [str(archive), path]
+    matcher = search.compile_patterns(["ok"])
+    want = expected(lines, "ok")
+
+    assert [list(m) for _, m, _ in search.search_files(files, matcher)] == [want, want]
+    assert [n for _, n, _ in search.search_files(files, matcher, search.COUNT)] == \
+        [len(want)] * 2
+    raw = list(search.search_files(files, matcher, search.COUNT, decompress_input=False))
+    assert raw[0][1] < len(want)
+
+
+def test_binary_files_report_a_match_instead_of_lines(segmented, tmp_path):
+    binary = tmp_path / "blob"
+    binary.write_bytes(b"\0\1\2\n" * 40 + b"needle\n")
+    matcher = search.compile_patterns(["needle"])
+    with pytest.raises(search.BinaryFile):
+        list(search.iter_file_matches(str(binary), matcher))
+    for _, matches, _ in search.search_files([str(binary)], matcher):
+        with pytest.raises(search.BinaryFile):
+            list(matches)
+    assert list(search.search_files([str(binary)], matcher, search.COUNT, allow_binary=True)) == \
+        [(str(binary), 1, None)]
+
+
+def test_count_lines_agrees_with_scan():
+    buf = b"a-a\n\nba\na\n\nxyz"
+    for pattern in ["a", "^", "$", "a|z", "a\nb"]:
+        matcher = search.compile_patterns([pattern], regex=True)
+        assert search.count_lines(buf, matcher) == len(list(search.scan(buf, matcher))), pattern
+
+
+def naive(data: bytes, pattern: bytes):
+    lines = data.split(b"\n")
+    if data.endswith(b"\n"):
+        lines.pop()
+    return [(i, line) for i, line in enumerate(lines, start=1) if pattern in line]
+
+
+def test_scan_and_scan_stream_match_a_line_by_line_search():
+    rng = random.Random(11)
+    for _ in range(50):
+        data = b"".join(rng.choice([b"ab", b"x", b"\n", b"abc\n", b"\n\n"])
+                        for _ in range(rng.randint(0, 200)))
+        matcher = search.compile_patterns(["ab"])
+        want = naive(data, b"ab")
+        assert list(search.scan(data, matcher)) == want
+        stream = io.BufferedReader(io.BytesIO(data))
+        assert list(search.scan_stream(stream, matcher, block_size=rng.randint(1, 16))) == want
+
+
+def test_compile_patterns():
+    literal = search.compile_patterns(["a.c", "X+"], ignore_case=True)
+    assert [line for _, line in search.scan(b"abc\na.c\nxx+\nX\n", literal)] == [b"a.c", b"xx+"]
+    regex = search.compile_patterns(["^a.c$", "^[0-9]+$"], regex=True)
+    assert [line for _, line in search.scan(b"abc\nabcd\n12\n1a\n", regex)] == [b"abc", b"12"]
+
+
+def test_walk_files(tmp_path):
+    for path in ("b/2", "b/1", "a", "b/c/3"):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("")
+    root = str(tmp_path)
+    assert [os.path.relpath(p, root) for p in search.walk_files([root], recursive=True)] == \
+        ["a", "b/1", "b/2", "b/c/3"]
+    assert list(search.walk_files([root], recursive=False)) == [root]
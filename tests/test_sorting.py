@@ -0,0 +1,78 @@
+"""Tests for the external merge sort in command_hero/sorting.py."""
+import os
+import random
+import tempfile
+
+import pytest
+
+from command_hero import CommandHero, sorting
+
+
+@pytest.fixture
+def lines():
+    rng = random.Random(3)
+    return [f"{rng.randint(-500, 500)} {rng.choice('abcde')}{rng.random():.6f}"
+            for _ in range(5000)]
+
+
+@pytest.fixture(autouse=True)
+def private_tmpdir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    yield
+    assert os.listdir(tmp_path) == [], "temporary runs were left behind"
+
+
+def test_spills_and_merges_in_passes(lines, monkeypatch):
+    monkeypatch.setattr(sorting, "MAX_MERGE_FAN_IN", 3)
+    budget = sorting.parse_size("4K")
+    assert list(sorting.sort_lines(iter(lines), buffer_size=budget)) == sorted(lines)
+
+
+def test_runs_sorted_in_worker_processes(lines, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    key = sorting.SortKey(start_field=2, separator=" ")
+    assert list(sorting.sort_lines(iter(lines), key=key, buffer_size=16384)) == \
+        sorted(lines, key=key)
+
+
+def test_keys_reverse_and_unique_with_spills(lines):
+    key = sorting.SortKey(numeric=True, start_field=1, end_field=1)
+    result = list(sorting.sort_lines(iter(lines), key=key, reverse=True, buffer_size=4096))
+    assert result == sorted(lines, key=key, reverse=True)
+
+    unique = list(sorting.sort_lines(iter(lines), key=key, unique=True, buffer_size=4096))
+    numbers = [key(line) for line in unique]
+    assert numbers == sorted(set(key(line) for line in lines))
+
+
+def test_in_memory_sort_matches_spilled_sort(lines):
+    assert list(sorting.sort_lines(iter(lines))) == \
+        list(sorting.sort_lines(iter(lines), buffer_size=2048))
+
+
+def test_should_stop_ends_the_sort(lines):
+    stop = iter([False] + [True] * 10)
+    many = lines * (sorting.STOP_CHECK_LINES // len(lines) + 2)
+    result = sorting.sort_lines(iter(many), buffer_size=4096, should_stop=lambda: next(stop))
+    assert list(result) == []
+
+
+def test_parse_size():
+    assert sorting.parse_size("512K") == 512 * 1024
+    assert sorting.parse_size("1.5M") == 3 * 512 * 1024
+    assert sorting.parse_size("2g") == 2 * 1024 ** 3
+    assert sorting.parse_size("100") == 100
+
+
+def test_key_modifiers(tmp_path_factory, monkeypatch, capsys):
+    work = tmp_path_factory.mktemp("keys")
+    monkeypatch.chdir(work)
+    (work / "f").write_text("b 10\na 9\nc 100\n")
+    hero = CommandHero(interactive=False)
+    for command, expected in [("sort -k2 f", "b 10\nc 100\na 9\n"),
+                              ("sort -k2n f", "a 9\nb 10\nc 100\n"),
+                              ("sort -k2,2nr f", "c 100\nb 10\na 9\n"),
+                              ("sort -n -k1r f", "c 100\nb 10\na 9\n")]:
+        assert hero.run_line(command) == 0
+        assert capsys.readouterr().out == expected, command
+    assert hero.run_line("sort -k2x f") == 1
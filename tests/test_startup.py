@@ -0,0 +1,60 @@
+"""Startup budget regression tests; see command_hero/startup.py."""
+import compileall
+import os
+import subprocess
+import sys
+
+from command_hero import startup
+
+# Modules that only some commands need and must not load at startup.
+LAZY_MODULES = {
+    "readline",
+    "subprocess",
+    "difflib",
+    "shutil",
+    "datetime",
+    "pathlib",
+    "concurrent.futures",
+    "multiprocessing",
+    "command_hero.search",
+    "command_hero.sorting",
+    "command_hero.pathindex",
+    "command_hero.diskusage",
+    "command_hero.jobs",
+    "command_hero.copying",
+    "command_hero.diffing",
+    "command_hero.dircache",
+    "command_hero.deleting",
+    "command_hero.dupes",
+    "command_hero.decompress",
+    "command_hero.globbing",
+    "gzip",
+    "bz2",
+    "lzma",
+}
+
+
+def setup_module(module):
+    # Measure with cached bytecode, as users run it, even under
+    # PYTHONDONTWRITEBYTECODE.
+    compileall.compile_dir(os.path.dirname(startup.__file__), quiet=1)
+
+
+def test_heavy_modules_load_lazily():
+    loaded = set(startup.startup_modules())
+    assert not LAZY_MODULES & loaded
+
+
+def test_cold_start_within_budget():
+    elapsed = startup.cold_start_ms(runs=5)
+    assert elapsed <= startup.STARTUP_BUDGET_MS, startup.report(elapsed)
+
+
+def test_profile_report_into_a_closed_pipe():
+    cli = os.path.join(os.path.dirname(os.path.dirname(startup.__file__)), "cli.py")
+    child = subprocess.Popen([sys.executable, cli, "--startup-profile"],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    child.stdout.close()  # As | head does once it has its lines
+    assert child.wait(timeout=60) == 141
+    assert child.stderr.read() == b""
+    child.stderr.close()